@@ -257,6 +257,14 @@ if __name__ == "__main__":
             f.write(line + "\n")
     print(f"Batch file saved to {bat_file}")
 
+    # Alternatively, run all of today's options in one process (main.py --mode supervisor)
+    supervisor_bat_file = "run_supervisor.bat"
+    with open(supervisor_bat_file, "w", encoding="utf-8") as f:
+        f.write("@echo off\n")
+        f.write("chcp 65001\n")
+        f.write(f'start cmd /k "python main.py --mode supervisor --today_running ""{df_today_running_file}"""\n')
+    print(f"Batch file saved to {supervisor_bat_file}")
+
     # Optionally print DataFrames for debugging
     print("All MDAPI Option Data:")
     print(df_all)
@@ -0,0 +1,300 @@
+# async_main.py
+#
+# asyncio entry point, an alternative to main.py taking the same arguments. The fetch, processing, signal,
+# net worth, config sync and result stages run as coroutines on one event loop instead of seven threads; the
+# historical download, the merge and the per-tick pricing are offloaded to executors.
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import jdatetime
+import pandas as pd
+
+from async_trading_api import AsyncTradingAPI
+from channels import tick_handoff
+from config import get_config
+from config_syncing import sync_config_files
+from data_merging import merge_historical_and_live_data
+from data_processing import TickProcessor
+from error_counters import ErrorCounters
+from historical_data import historical_data_thread
+from latency import latency_file_path
+from market_feed import Tick
+from main import parse_arguments, configure, create_rolling_state, RESULT_COLUMNS
+from result_handling import log_result, results_excel_filename
+from scheduler import Scheduler
+from signals import buy, sell, cancel_all_orders
+from state_store import signal_counts, advance_signal_counts
+
+import warnings
+
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+
+async def wait_or_stop(stop, timeout):
+    """
+    Sleeps for timeout seconds, returning early when stop is set.
+    """
+    try:
+        await asyncio.wait_for(stop.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+def put_latest(queue, item):
+    """
+    Puts an item on a bounded asyncio.Queue, dropping the oldest item when it is full (like deque(maxlen=...)).
+    """
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+
+async def fetch_book(api, ticker):
+    """
+    Fetches an order book and returns it with its time.monotonic() receive time.
+    """
+    data = await api.fetch_order_book(ticker)
+    return data, time.monotonic()
+
+
+async def fetch_loop(api, data_queue, tick_arrived, counters, stop):
+    """
+    Fetches the underlying and option order books every SLEEP_INTERVAL seconds on a Scheduler, both requests
+    concurrently. A book not received within FETCH_TIMEOUT seconds is cancelled and counts as missing for the tick.
+    """
+    config = get_config()
+    scheduler = Scheduler(config.SLEEP_INTERVAL)
+    while True:
+        delay, slot_time = scheduler.next_slot()
+        await wait_or_stop(stop, delay)
+        if stop.is_set():
+            break
+        fetch_started = time.monotonic()
+        now = jdatetime.datetime.fromtimestamp(slot_time)
+        current_date = now.strftime("%Y-%m-%d")
+        current_time = now.strftime("%H:%M:%S")
+
+        try:
+            legs = [asyncio.ensure_future(fetch_book(api, ticker))
+                    for ticker in (config.UNDERLYING_TICKER, config.OPTION_TICKER)]
+            _, pending = await asyncio.wait(legs, timeout=config.FETCH_TIMEOUT)
+            for leg in pending:
+                leg.cancel()
+            (underlying_data, underlying_received), (option_data, option_received) = [
+                (None, None) if leg in pending or leg.exception() is not None else leg.result() for leg in legs
+            ]
+            if underlying_data is None and option_data is None:
+                print("Fetched data is null")
+            else:
+                tick = Tick(current_date, current_time, underlying_data, option_data, underlying_received,
+                            option_received, fetch_started)
+                tick.queued = time.monotonic()
+                data_queue.append(tick)
+                tick_arrived.set()
+        except Exception as e:
+            counters.try_except_counter += 1
+            print(f"ERROR: Exception in fetch_loop: {e}")
+    scheduler.report("fetch_loop")
+    print("INFO: fetch_loop is shutting down gracefully.")
+
+
+async def processing_loop(processor, executor, data_queue, tick_arrived, signal_queue, result_queue, stop):
+    """
+    Prices every fetched tick on the executor and hands the result to the signal and result stages.
+    """
+    loop = asyncio.get_running_loop()
+    latency = processor.counters.latency
+    latency_path = latency_file_path(processor.config.OPTION_TICKER)
+    while not stop.is_set():
+        await tick_arrived.wait()
+        tick_arrived.clear()
+        while data_queue:
+            tick = data_queue.popleft()
+            tick.dequeued = time.monotonic()
+            result = await loop.run_in_executor(executor, processor.process, *tick)
+            tick.processed = time.monotonic()
+            latency.record_tick(tick)
+            latency.maybe_dump(latency_path, processor.config.LATENCY_DUMP_INTERVAL)
+            if processor.expired:
+                print("WARNING: Expiration date reached or passed.")
+                stop.set()
+                return
+            if result is None:
+                continue
+            result_queue.put_nowait(result)
+            put_latest(signal_queue, {"Time": result["Time"], "signal": result["signal"], "tick": tick})
+
+
+async def signal_loop(signal_queue, counters):
+    """
+    Executes the signals. Order placement is rare and goes through the blocking TradingAPI on the default executor.
+    """
+    loop = asyncio.get_running_loop()
+    last_signal = None
+    while True:
+        signal_data = await signal_queue.get()
+        picked_up = time.monotonic()
+        signal = signal_data.get("signal")
+
+        ordered = True
+        if signal == 'buy':
+            await loop.run_in_executor(None, buy)
+        elif signal == 'sell':
+            await loop.run_in_executor(None, sell)
+        elif signal == 'hold' and last_signal != 'hold':
+            await loop.run_in_executor(None, cancel_all_orders)
+        else:
+            ordered = False
+        last_signal = signal
+        if ordered:
+            counters.latency.record_order(signal_data["tick"], picked_up, time.monotonic())
+
+
+async def result_loop(result_queue, rows):
+    """
+    Logs every result and collects it for the output workbook.
+    """
+    while True:
+        result = await result_queue.get()
+        rows.append(result)
+        log_result(result)
+
+
+async def net_worth_loop(api, stop):
+    """
+    Updates config.NET_WORTH and config.VOLUME every second.
+    """
+    config = get_config()
+    print("[Net Worth Monitor] Started monitoring net worth balance.")
+    while not stop.is_set():
+        try:
+            net_worth, vol = await api.get_net_worth_balance()
+            if net_worth is not None:
+                config.NET_WORTH = net_worth
+                config.VOLUME = vol
+        except Exception as e:
+            print(f"[Net Worth Monitor] ERROR: Failed to fetch net worth balance: {e}")
+        await wait_or_stop(stop, 1)
+    print("[Net Worth Monitor] Stopped monitoring net worth balance.")
+
+
+async def config_sync_loop(stop):
+    """
+    Syncs TRADE_DIRECTION and CURRENT_DELTA with the risk files every second. The file reads and writes run on the
+    default executor so they never block the event loop.
+    """
+    config = get_config()
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        await loop.run_in_executor(None, sync_config_files, config)
+        await wait_or_stop(stop, 1)
+
+
+async def clock_loop(stop):
+    """
+    Sets stop once the trading session is over.
+    """
+    config = get_config()
+    while not stop.is_set():
+        if jdatetime.datetime.now().time() > config.VALID_TIME_END:
+            print("INFO: Current time has passed VALID_TIME_END, initiating graceful shutdown.")
+            stop.set()
+            break
+        await wait_or_stop(stop, 1)
+
+
+async def run():
+    config = get_config()
+    loop = asyncio.get_running_loop()
+    counters = ErrorCounters()
+    # Pricing state is not thread-safe, so the merge and all ticks run on one worker, in order.
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pricing")
+
+    rolling_vols, price_diff_window, snapshotter, restored_state, resume_after = create_rolling_state(config)
+
+    data_queue = tick_handoff(config)
+    tick_arrived = asyncio.Event()
+    result_queue = asyncio.Queue()
+    signal_queue = asyncio.Queue(maxsize=config.MAX_SIZE)
+    stop = asyncio.Event()
+    thread_stop = Event()  # for the historical download running on a worker thread
+    rows = []
+    data = pd.DataFrame(columns=RESULT_COLUMNS)
+    processor = None
+    tasks = []
+
+    async with AsyncTradingAPI() as api:
+        try:
+            tasks = [
+                asyncio.create_task(fetch_loop(api, data_queue, tick_arrived, counters, stop)),
+                asyncio.create_task(net_worth_loop(api, stop)),
+                asyncio.create_task(config_sync_loop(stop)),
+                asyncio.create_task(clock_loop(stop)),
+            ]
+
+            if config.USE_HISTORICAL:
+                historical_data_container = {}
+                await loop.run_in_executor(None, historical_data_thread, Event(), historical_data_container,
+                                           thread_stop)
+                merged = await loop.run_in_executor(
+                    executor, merge_historical_and_live_data, data_queue, historical_data_container,
+                    RESULT_COLUMNS, rolling_vols, price_diff_window, Event(), counters, resume_after, None,
+                    signal_counts(restored_state)
+                )
+                if merged is not None:
+                    data, under_negative_one_count, over_positive_one_count = merged
+                    advance_signal_counts(restored_state, under_negative_one_count, over_positive_one_count)
+                data_queue.clear()
+                print("INFO: Cleared data_queue to start fresh after historical data is ready.")
+
+            processor = TickProcessor(counters, rolling_vols, price_diff_window, snapshotter, restored_state)
+            tasks += [
+                asyncio.create_task(processing_loop(processor, executor, data_queue, tick_arrived, signal_queue,
+                                                    result_queue, stop)),
+                asyncio.create_task(signal_loop(signal_queue, counters)),
+                asyncio.create_task(result_loop(result_queue, rows)),
+            ]
+            await stop.wait()
+        except asyncio.CancelledError:
+            print("INFO: Processing stopped by user, initiating graceful shutdown.")
+        finally:
+            stop.set()
+            thread_stop.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            if processor is not None:
+                await loop.run_in_executor(executor, processor.close)
+            executor.shutdown(wait=True)
+            counters.dropped_tick_counter = data_queue.dropped
+            if config.LATENCY_DUMP_INTERVAL:
+                counters.latency.dump(latency_file_path(config.OPTION_TICKER))
+
+            if rows:
+                data = pd.concat([data, pd.DataFrame(rows)], ignore_index=True)
+            os.makedirs("exels", exist_ok=True)
+            data.to_excel(results_excel_filename(), index=False)
+            print("INFO: Data saved to Excel.")
+            counters.report()
+            print("INFO: Program terminated gracefully.")
+
+
+def main():
+    args = parse_arguments()
+    if args.mode in ('supervisor', 'pool'):
+        print(f"ERROR: {args.mode} mode is only available in main.py.")
+        return
+    configure(args)
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# async_trading_api.py
+
+import asyncio
+import json
+from typing import Optional, List
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError:  # only needed by the asyncio runtime (async_main.py)
+    aiohttp = None
+
+from config import get_config
+from trading_api import (parse_order_book, parse_open_orders, parse_net_worth_balance, parse_net_worth_balances,
+                         order_payload, find_open_order, parse_portfolio_options, parse_portfolio_balances,
+                         parse_total_balance)
+
+
+class AsyncTradingAPI:
+    """
+    asyncio counterpart of TradingAPI with the same methods, as coroutines.
+
+    One aiohttp session (and its keep-alive connection pool) is shared by all requests. At most
+    ASYNC_HOST_CONCURRENCY requests run against one host at a time; further calls wait for a free slot, so a
+    process can poll many order books concurrently without flooding a host or starting a thread per request. Every
+    call has a deadline (ASYNC_CALL_DEADLINE seconds by default, including the wait for a slot and the retries)
+    after which it gives up and returns None like a failed request. Responses are parsed by the same helpers as
+    TradingAPI, so both clients return identical values. Use it as an async context manager, or call close() when
+    done.
+    """
+
+    def __init__(self):
+        if aiohttp is None:
+            raise ImportError("AsyncTradingAPI requires aiohttp (pip install aiohttp).")
+        config = get_config()
+        self.base_url = config.BASE_URL
+        self.market_url = config.MARKET_URL
+        self.headers = config.HEADERS
+        self.max_retries = config.MAX_RETRIES
+        self.option_ticker = config.OPTION_TICKER
+        self.mdapi_url = config.MDAPI_URL
+        self.host_concurrency = config.ASYNC_HOST_CONCURRENCY
+        self.deadline = config.ASYNC_CALL_DEADLINE
+        self._session = None
+        self._host_semaphores = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            config = get_config()
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.host_concurrency)
+            timeout = aiohttp.ClientTimeout(sock_connect=config.HTTP_CONNECT_TIMEOUT,
+                                            sock_read=config.HTTP_READ_TIMEOUT)
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout)
+        return self._session
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.host_concurrency)
+        return semaphore
+
+    async def close(self):
+        """
+        Closes the HTTP session.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _make_request(self, method: str, url: str, data: Optional[dict] = None,
+                            deadline: Optional[float] = None) -> Optional[dict]:
+        """
+        Makes an HTTP request with retries on failure, giving up after the deadline.
+
+        Args:
+            method (str): HTTP method ('GET' or 'POST').
+            url (str): The API endpoint URL.
+            data (Optional[dict]): The payload for POST requests.
+            deadline (Optional[float]): Seconds the call may take in total, ASYNC_CALL_DEADLINE by default.
+
+        Returns:
+            Optional[dict]: The JSON response if successful, else None.
+        """
+        if method.upper() not in ('GET', 'POST'):
+            print(f"ERROR: Unsupported HTTP method: {method}")
+            return None
+
+        deadline = self.deadline if deadline is None else deadline
+        try:
+            return await asyncio.wait_for(self._request_with_retries(method.upper(), url, data), deadline)
+        except asyncio.TimeoutError:
+            print(f"ERROR: Deadline of {deadline} s passed for {url}.")
+            return None
+
+    async def _request_with_retries(self, method: str, url: str, data: Optional[dict]) -> Optional[dict]:
+        config = get_config()
+        session = self._get_session()
+        semaphore = self._host_semaphore(url)
+        payload = json.dumps(data) if method == 'POST' else None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with semaphore:
+                    async with session.request(method, url, data=payload) as response:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"WARNING: Attempt {attempt} failed for {url}: {e}")
+                await asyncio.sleep(config.SLEEP_INTERVAL)
+        print(f"ERROR: Max retries reached for {url}.")
+        return None
+
+    async def fetch_order_book(self, ticker: str, deadline: Optional[float] = None) -> Optional[List[float]]:
+        """
+        Retrieves the current order book for a specific ticker.
+
+        Args:
+            ticker (str): The ISIN ticker symbol.
+            deadline (Optional[float]): Seconds the call may take, ASYNC_CALL_DEADLINE by default.
+
+        Returns:
+            Optional[List[float]]: A list containing [sell_volume, sell_price, buy_price, buy_volume].
+        """
+        url = f"{self.market_url}/Queue/BestLimitWithSize?isin={ticker}"
+        response = await self._make_request('GET', url, deadline=deadline)
+        return parse_order_book(response, ticker)
+
+    async def fetch_order_books(self, tickers: List[str], deadline: Optional[float] = None) -> dict:
+        """
+        Retrieves the order books of several tickers concurrently.
+
+        Args:
+            tickers (List[str]): The ISIN ticker symbols.
+            deadline (Optional[float]): Seconds each call may take, ASYNC_CALL_DEADLINE by default.
+
+        Returns:
+            dict: The fetch_order_book result per ticker, None for a book that failed or missed the deadline.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        books = await asyncio.gather(*(self.fetch_order_book(ticker, deadline) for ticker in tickers))
+        return dict(zip(tickers, books))
+
+    async def place_order(self, ticker: str, price: float, quantity: int, side: str,
+                          deadline: Optional[float] = None) -> Optional[dict]:
+        """
+        Sends a new order to the trading API, as TradingAPI.place_order.
+        """
+        url = f"{self.base_url}/orders/NewOrder"
+        response = await self._make_request('POST', url, order_payload(ticker, price, quantity, side), deadline)
+        if response:
+            print(f"INFO: Placed {side} order for {ticker} at price {price} and volume {quantity}.")
+        else:
+            print(f"ERROR: Failed to place {side} order for {ticker}.")
+        return response
+
+    async def modify_order(self, price: float, order_id: int, volume: int, ticker: str, side: str,
+                           deadline: Optional[float] = None) -> Optional[dict]:
+        """
+        Modifies an existing order, as TradingAPI.modify_order.
+        """
+        url = f"{self.base_url}/orders/EditOrder"
+        response = await self._make_request('POST', url, order_payload(ticker, price, volume, side, order_id),
+                                            deadline)
+        if response:
+            print(f"INFO: Modified {side} order {order_id} for {ticker} to price {price} and volume {volume}.")
+        else:
+            print(f"ERROR: Failed to modify {side} order {order_id} for {ticker}.")
+        return response
+
+    async def fetch_open_orders(self, deadline: Optional[float] = None) -> Optional[List[dict]]:
+        """
+        Retrieves all open orders and returns only the necessary fields, as TradingAPI.fetch_open_orders.
+        """
+        url = f"{self.base_url}/orders/GetOpenOrders"
+        response = await self._make_request('GET', url, deadline=deadline)
+        return parse_open_orders(response)
+
+    async def _place_or_modify(self, ticker: str, price: float, quantity: int, side: str) -> None:
+        order = find_open_order(await self.fetch_open_orders(), ticker, side)
+        if order is None:
+            await self.place_order(ticker, price, quantity, side)
+        elif price != order['price'] or quantity != order['remainedVolume']:
+            await self.modify_order(price, order['serialNumber'], quantity, ticker, side)
+        else:
+            print(f"INFO: {side.capitalize()} order for {ticker} already at desired price and quantity.")
+
+    async def buy(self, ticker: str, price: float, quantity: int) -> None:
+        """
+        Places or modifies a buy order for the specified ticker, as TradingAPI.buy.
+        """
+        await self._place_or_modify(ticker, price, quantity, 'buy')
+
+    async def sell(self, ticker: str, price: float, quantity: int) -> None:
+        """
+        Places or modifies a sell order for the specified ticker, as TradingAPI.sell.
+        """
+        await self._place_or_modify(ticker, price, quantity, 'sell')
+
+    async def cancel_orders(self, serial_numbers: List[int], deadline: Optional[float] = None) -> Optional[dict]:
+        """
+        Cancels orders given their serial numbers, as TradingAPI.cancel_orders.
+        """
+        url = f"{self.base_url}/orders/CancelOrders"
+        response = await self._make_request('POST', url, {"serialNumbers": serial_numbers}, deadline)
+        if response:
+            print(f"INFO: Cancelled orders with serial numbers: {serial_numbers}")
+        else:
+            print(f"ERROR: Failed to cancel orders with serial numbers: {serial_numbers}")
+        return response
+
+    async def get_net_worth_balance(self, deadline: Optional[float] = None) -> Optional[tuple[float, float]]:
+        """
+        Retrieves the net worth and volume of the configured OPTION_TICKER, as TradingAPI.get_net_worth_balance.
+        """
+        url = f"{self.base_url}/positions/options/Portfolio"
+        response = await self._make_request('GET', url, deadline=deadline)
+        return parse_net_worth_balance(response, self.option_ticker)
+
+    async def get_net_worth_balances(self, option_tickers: List[str],
+                                     deadline: Optional[float] = None) -> Optional[dict]:
+        """
+        Retrieves the net worth and volume of several options with a single portfolio request, as
+        TradingAPI.get_net_worth_balances.
+        """
+        url = f"{self.base_url}/positions/options/Portfolio"
+        response = await self._make_request('GET', url, deadline=deadline)
+        return parse_net_worth_balances(response, option_tickers)
+
+    async def get_option_details_from_mdpapi(self, option_id: str, deadline: Optional[float] = None) -> Optional[dict]:
+        """
+        Fetches details of a specific trading option, as TradingAPI.get_option_details_from_mdpapi.
+        """
+        url = f"https://mdpapi.pikadbazar.ir/api/v1/optionDetail/{option_id}/same"
+        return await self._make_request('GET', url, deadline=deadline)
+
+    async def get_portfolio_options_df(self, deadline: Optional[float] = None):
+        """
+        The option positions of the portfolio as a DataFrame, as TradingAPI.get_portfolio_options_df.
+        """
+        url = f"{self.base_url}/positions/options/Portfolio"
+        return parse_portfolio_options(await self._make_request('GET', url, deadline=deadline))
+
+    async def portfo_analyse(self, deadline: Optional[float] = None):
+        """
+        The ISIN and netWorthBalance of every position as a DataFrame, as TradingAPI.portfo_analyse.
+        """
+        url = f"{self.base_url}/positions/options/Portfolio"
+        return parse_portfolio_balances(await self._make_request('GET', url, deadline=deadline))
+
+    async def calculate_total_balance(self, deadline: Optional[float] = None) -> Optional[float]:
+        """
+        Sum of the portfolio's netWorthBalance and the trading book's 'remain', as
+        TradingAPI.calculate_total_balance. Both requests are made concurrently.
+        """
+        portfolio_response, tradingbook_response = await asyncio.gather(
+            self._make_request('GET', f"{self.base_url}/positions/options/Portfolio", deadline=deadline),
+            self._make_request('GET', f"{self.base_url}/tradingbook/GetLastTradingBook", deadline=deadline),
+        )
+        return parse_total_balance(portfolio_response, tradingbook_response)
@@ -0,0 +1,109 @@
+# channels.py
+
+from collections import deque
+from threading import Condition
+
+# Longest time a blocked consumer goes without re-checking its stop_event.
+STOP_CHECK_INTERVAL = 0.5  # seconds
+
+
+class TickQueue:
+    """
+    Blocking hand-off queue between the worker threads.
+
+    It keeps the deque API the threads already use (append, popleft, len, truthiness, indexing, clear; with
+    maxlen the oldest item is dropped when full), and adds get(), which blocks until an item arrives instead of
+    polling. Consumers therefore wake as soon as the producer appends and use no CPU while idle. close() wakes
+    every blocked consumer, so shutdown through stop_event does not wait for a timeout. Items dropped because the
+    queue was full are counted in dropped.
+    """
+
+    def __init__(self, maxlen=None):
+        """
+        Args:
+            maxlen (int, optional): Capacity; the oldest item is dropped when a full queue is appended to.
+        """
+        self._items = deque(maxlen=maxlen)
+        self._condition = Condition()
+        self.closed = False
+        self.dropped = 0
+
+    @property
+    def maxlen(self):
+        return self._items.maxlen
+
+    def append(self, item):
+        """
+        Add an item and wake one waiting consumer.
+        """
+        with self._condition:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify()
+
+    def popleft(self):
+        """
+        Remove and return the oldest item without blocking. Raises IndexError if the queue is empty.
+        """
+        with self._condition:
+            return self._items.popleft()
+
+    def get(self, timeout=STOP_CHECK_INTERVAL):
+        """
+        Remove and return the oldest item, waiting for one if the queue is empty.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait, None to wait until an item arrives or
+                the queue is closed.
+
+        Returns:
+            The item, or None if the wait timed out or the queue was closed while empty.
+        """
+        with self._condition:
+            if not self._items and not self.closed:
+                self._condition.wait_for(lambda: self._items or self.closed, timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        """
+        Wake all waiting consumers; get() returns the remaining items and then None without waiting.
+        """
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def clear(self):
+        with self._condition:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __getitem__(self, index):
+        with self._condition:
+            return self._items[index]
+
+    def __repr__(self):
+        return (f"TickQueue(maxlen={self.maxlen}, size={len(self._items)}, dropped={self.dropped}, "
+                f"closed={self.closed})")
+
+
+def tick_handoff(config):
+    """
+    Data queue between the fetcher and the processing thread, as selected by config.TICK_HANDOFF.
+
+    'latest' holds only the newest tick: a tick that arrives before the previous one was taken replaces it, so
+    after a slow tick the processor continues with current prices instead of working through a backlog. 'queue'
+    keeps up to MAX_SIZE ticks in order and drops the oldest. Either way the lost ticks are counted in dropped.
+    """
+    if config.TICK_HANDOFF == 'latest':
+        return TickQueue(maxlen=1)
+    if config.TICK_HANDOFF != 'queue':
+        print(f"WARNING: Unknown TICK_HANDOFF {config.TICK_HANDOFF!r}, using 'queue'.")
+    return TickQueue(maxlen=config.MAX_SIZE)
@@ -25,9 +25,33 @@ class BaseConfig:
     VALID_TIME_START = pd.to_datetime("09:15:00").time()
     VALID_TIME_END = pd.to_datetime("12:30:00").time()
     MAX_RETRIES = 3
+    # HTTP: one keep-alive session per host (see trading_api.get_session) with up to HTTP_POOL_SIZE open
+    # connections, or FETCH_WORKERS if that is larger; further concurrent requests wait for a free connection. A
+    # request fails after HTTP_CONNECT_TIMEOUT seconds without a connection or HTTP_READ_TIMEOUT seconds without
+    # data, and is retried up to MAX_RETRIES times.
+    HTTP_POOL_SIZE = 10
+    HTTP_CONNECT_TIMEOUT = 3.05  # seconds
+    HTTP_READ_TIMEOUT = 5  # seconds
+    # AsyncTradingAPI (async_main.py): at most ASYNC_HOST_CONCURRENCY concurrent requests per host, and a call
+    # gives up after ASYNC_CALL_DEADLINE seconds including retries unless it is given its own deadline.
+    ASYNC_HOST_CONCURRENCY = 32
+    ASYNC_CALL_DEADLINE = 10  # seconds
     SLEEP_INTERVAL = 1  # seconds
+    # The order books of a tick are fetched concurrently; a book not received within FETCH_TIMEOUT seconds counts
+    # as missing for that tick. FETCH_WORKERS request threads serve all the underlyings of a supervisor or worker
+    # pool, which share one fetcher.
+    FETCH_TIMEOUT = 0.8  # seconds
+    FETCH_WORKERS = 16
     MAX_SIZE = 10
+    # Hand-off of fetched ticks to processing: 'latest' keeps only the newest tick (ticks the processor could not
+    # keep up with are coalesced), 'queue' keeps up to MAX_SIZE ticks and drops the oldest. See channels.py.
+    TICK_HANDOFF = 'latest'
     SMOOTHING_PARAM = 3600
+    # Estimated volatility: 'sma' (SMOOTHING_PARAM past implied vols), 'ema' or 'ewma_variance' (alpha =
+    # SMOOTHING_PARAM if it is in (0, 1], else 2 / (SMOOTHING_PARAM + 1)), or 'smile': the volatility smile of the
+    # underlying's option chain in supervisor and worker-pool mode, an EMA like 'ema' where there is no smile
+    # value; see volatility_estimators.py
+    VOLATILITY_ESTIMATOR = 'sma'
     WINDOW_SIZE = 3600
     Z_THRESHOLD = 1.5
     BUY_PRICE_OFFSET = 0
@@ -45,6 +69,52 @@ class BaseConfig:
     CURRENT_DELTA = None
     AVG_DELTA_BORDER = 0.08
 
+    # Time to expiration: 'calendar' uses whole calendar days / 365, 'trading' uses TSE trading days and the
+    # remaining fraction of today's session / TRADING_DAYS_PER_YEAR.
+    TIME_TO_EXPIRATION_MODE = 'calendar'
+    TRADING_DAYS_PER_YEAR = 240
+    TRADING_WEEKDAYS = (5, 6, 0, 1, 2)  # Gregorian weekday() numbers: Saturday to Wednesday
+    TRADING_HOLIDAYS = []  # Jalali dates (YYYY-MM-DD) on which the market is closed
+    TRADING_SESSION_START = pd.to_datetime("09:00:00").time()
+    TRADING_SESSION_END = pd.to_datetime("12:30:00").time()
+
+    # Volatility smile fitted per underlying by option_chain.OptionChain (VOLATILITY_ESTIMATOR = 'smile').
+    SMILE_DEGREE = 2  # polynomial degree in ln(K / F) / sqrt(T)
+    SMILE_HALF_LIFE = 600  # ticks after which an observation's weight halves
+
+    # Implied volatility of batches (vectorized warm-up, option chains): 'exact' uses pricing.implied_volatility_batch,
+    # 'lookup' the precomputed iv_lookup table with an exact fallback whenever the last relative Newton step exceeds
+    # IV_LOOKUP_TOLERANCE. Single prices are always solved with py_vollib.
+    IV_METHOD = 'exact'
+    IV_LOOKUP_TOLERANCE = 1e-4
+
+    # Rolling-state snapshots: the windows, signal counters and last processed timestamp are written to
+    # state_files/ every STATE_SNAPSHOT_INTERVAL seconds and at shutdown. On restart the snapshot is restored and
+    # only the gap since its timestamp is backfilled from historical data.
+    USE_STATE_SNAPSHOT = True
+    STATE_SNAPSHOT_INTERVAL = 60  # seconds
+
+    # Historical warm-up: True computes the merge's historical replay as whole-column operations, False replays
+    # it row by row through the live processing steps (reference path, same output).
+    VECTORIZED_WARMUP = True
+
+    # Z-score statistics of the price difference window: 'mean_std' uses the rolling mean and standard deviation,
+    # 'median_mad' the rolling median and 1.4826 * MAD, which a single bad print in the book cannot distort.
+    Z_SCORE_MODE = 'mean_std'
+
+    # Shadow signals: every window size is evaluated with every threshold next to WINDOW_SIZE / Z_THRESHOLD and
+    # recorded to exels/, never traded. An empty list disables the shadow engine, e.g. [600, 1800, 3600].
+    SHADOW_WINDOW_SIZES = []
+    SHADOW_Z_THRESHOLDS = [1.0, 1.5, 2.0]
+
+    # Per-stage tick latency histograms (see latency.py) are written to latency_files/ every LATENCY_DUMP_INTERVAL
+    # seconds while running; 0 disables the files, the summary is still printed at shutdown.
+    LATENCY_DUMP_INTERVAL = 10  # seconds
+
+    # Process pool mode (main.py --mode pool): instruments are sharded over this many pricing processes; None uses
+    # one per CPU core.
+    POOL_WORKERS = None
+
 
 class the_config(BaseConfig):
     UNDERLYING_NAME = ""
@@ -69,6 +139,27 @@ class the_config(BaseConfig):
         cls.CALL_PUT = call_put
         cls.CAN_TRADE_IN_SAME_DIRECTION = can_trade_in_same_direction
 
+    @classmethod
+    def for_instrument(cls, underlying_name, underlying_ticker, option_name, option_ticker, expiration_date,
+                       strike_price, call_put, can_trade_in_same_direction):
+        """
+        Creates a separate config for one instrument of supervisor mode.
+
+        Unlike set_values, the instrument fields are set on the instance, and so are the values updated while
+        running (NET_WORTH, VOLUME, TRADE_DIRECTION, CURRENT_DELTA, HISTORICAL_DATA_START_DATE) once assigned, so
+        the instruments of one process do not overwrite each other. All other settings are read from the class.
+        """
+        config = cls()
+        config.UNDERLYING_NAME = underlying_name
+        config.UNDERLYING_TICKER = underlying_ticker
+        config.OPTION_NAME = option_name
+        config.OPTION_TICKER = option_ticker
+        config.EXPIRATION_DATE = expiration_date
+        config.STRIKE_PRICE = strike_price
+        config.CALL_PUT = call_put
+        config.CAN_TRADE_IN_SAME_DIRECTION = can_trade_in_same_direction
+        return config
+
 
 _config_instance = None
 
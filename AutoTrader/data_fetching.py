@@ -1,31 +1,26 @@
-import time
-import jdatetime
-from helpers import fetch_data
+from market_feed import UnderlyingFeed
 from config import get_config
+from scheduler import Scheduler
 
 
-def data_fetching_thread(api, data_queue, counters, stop_event):
+def data_fetching_thread(api, data_queue, counters, stop_event, config=None):
     """
-    Thread function for data fetching.
+    Thread function for data fetching. config defaults to the process config (see the_config.for_instrument).
+    Ticks are fetched on a Scheduler every SLEEP_INTERVAL seconds, labelled with their slot's time.
     """
-    config = get_config()
+    config = get_config() if config is None else config
 
-    try:
-        while not stop_event.is_set():
-            start_time = time.time()
-            now = jdatetime.datetime.now()
-            current_date = now.strftime("%Y-%m-%d")
-            current_time = now.strftime("%H:%M:%S")
-
-            underlying_data, option_data = fetch_data(api, config.UNDERLYING_TICKER, config.OPTION_TICKER)
-            if underlying_data is None and option_data is None:
-                print("Fetched data is null")
-            else:
-                data_queue.append((current_date, current_time, underlying_data, option_data))
+    # Both books are fetched concurrently within FETCH_TIMEOUT and queued as a Tick with their receive times
+    feed = UnderlyingFeed(api, config.UNDERLYING_TICKER)
+    feed.subscribe(config.OPTION_TICKER, data_queue)
+    scheduler = Scheduler(config.SLEEP_INTERVAL)
 
-            elapsed_time = time.time() - start_time
-            sleep_time = max(0, config.SLEEP_INTERVAL - elapsed_time)
-            time.sleep(sleep_time)
+    try:
+        while True:
+            slot_time = scheduler.wait(stop_event)
+            if slot_time is None:
+                break
+            feed.fetch(slot_time)
     except Exception as e:
         counters.try_except_counter += 1
         print(f"ERROR: Exception in data_fetching_thread: {e}")
@@ -33,4 +28,6 @@ def data_fetching_thread(api, data_queue, counters, stop_event):
         traceback.print_exc()
         # If exception occurs, the thread ends here and finally will execute
     finally:
+        scheduler.report("data_fetching_thread")
+        feed.fetcher.close()
         print("INFO: data_fetching_thread is shutting down gracefully.")
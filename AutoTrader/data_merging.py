@@ -6,19 +6,24 @@ import numpy as np
 from helpers import (
     validate_time_and_data, calculate_time_to_expiration,
     calculate_implied_volatility, calculate_estimated_volatility,
-    calculate_black_scholes_price, validate_time_and_data_preprocess,
-    calculate_delta, update_signal  # Added Delta import
+    calculate_black_scholes_greeks, validate_time_and_data_preprocess,
+    update_signal
 )
-from signals import process_price_difference
+from signals import process_price_difference, generate_signals
+from pricing import implied_volatility_batch, black_scholes_greeks_batch, IV_OK
+from iv_lookup import implied_volatility_lookup
+from trading_calendar import time_to_expiration_array
+from rolling_window import RobustRollingWindow
+from volatility_estimators import VolatilityEstimator
 from config import get_config
 
 
 def merge_historical_and_live_data(
         data_queue, historical_data_container, columns,
         rolling_vols, price_diff_window, processing_ready_event,
-        counters
+        counters, resume_after=None, config=None, start_counts=(0, 0)
 ):
-    config = get_config()
+    config = get_config() if config is None else config
     """
     Merges historical data with live data and initializes rolling variables.
     Then applies the same processing steps (implied_vol, estimated_vol,
@@ -29,13 +34,19 @@ def merge_historical_and_live_data(
     - data_queue: Deque or list of tuples (current_date_jalali, current_time, underlying_data, option_data).
     - historical_data_container: Dictionary containing historical data under 'data' key.
     - columns: List of column names to ensure alignment.
-    - rolling_vols: List to store rolling implied volatilities.
-    - price_diff_window: List to store rolling price differences.
+    - rolling_vols: VolatilityEstimator (or RollingWindow/deque for an SMA) fed with the implied volatilities.
+    - price_diff_window: RollingWindow (or deque) to store rolling price differences.
     - processing_ready_event: Event to signal that processing can start.
     - counters: Dictionary or similar structure for tracking counts and other metrics.
+    - resume_after: Optional "YYYY-MM-DD HH:MM:SS" timestamp of a restored state snapshot. Historical rows at or
+      before it are already reflected in the restored windows and are dropped, so only the gap is backfilled.
+    - config: Optional instrument config (see the_config.for_instrument), defaults to the process config.
+    - start_counts: (under_negative_one_count, over_positive_one_count) to continue from, e.g. the counts of the
+      restored snapshot.
 
     Returns:
-    A pandas DataFrame containing fully processed historical and live data.
+    A pandas DataFrame containing fully processed historical and live data, and the final
+    under_negative_one_count and over_positive_one_count; None if there is no historical data.
     """
 
     if 'data' not in historical_data_container:
@@ -52,6 +63,12 @@ def merge_historical_and_live_data(
     # Reorder columns
     historical_data = historical_data[columns]
 
+    # Drop the rows a restored state snapshot already covers
+    if resume_after is not None and not historical_data.empty:
+        historical_datetimes = historical_data["Date"].astype(str) + " " + historical_data["Time"].astype(str)
+        historical_data = historical_data[historical_datetimes > resume_after]
+        print(f"INFO: Backfilling {len(historical_data)} historical rows after snapshot {resume_after}.")
+
     # Wait until we have at least one live data point
     while not data_queue:
         print("INFO: Waiting for first data point from data_queue to compare timestamps...")
@@ -84,82 +101,17 @@ def merge_historical_and_live_data(
         # But let's proceed with just the live data in that case.
         pass
 
-    # Initialize counters for signals
-    under_negative_one_count = 0
-    over_positive_one_count = 0
-
     # Process historical data first
-    processed_rows = []
-    for idx, row in historical_data.iterrows():
-        current_date_jalali = row["Date"]
-        current_time = row["Time"]
-        avg_price_underlying = row["avg_price_underlying"]
-        avg_price_option = row["avg_price_option"]
-
-        # Validate data
-        is_valid = validate_time_and_data_preprocess(
-            current_time, avg_price_underlying, avg_price_option, counters
-        )
-        if not is_valid:
-            continue
-
-        time_to_expiration = calculate_time_to_expiration(current_date_jalali, config.EXPIRATION_DATE)
-        if time_to_expiration <= 0:
-            continue
-
-        implied_vol = calculate_implied_volatility(
-            avg_price_option, avg_price_underlying, time_to_expiration, config.STRIKE_PRICE,
-            config.RISK_FREE_RATE, config.CALL_PUT, counters
-        )
-
-        # Estimated volatility
-        estimated_vol = calculate_estimated_volatility(implied_vol, rolling_vols)
-
-        # Black-Scholes price
-        black_scholes_price = calculate_black_scholes_price(
-            avg_price_underlying, config.STRIKE_PRICE, config.RISK_FREE_RATE,
-            config.EXPIRATION_DATE, config.CALL_PUT, current_date_jalali, estimated_vol
+    if config.VECTORIZED_WARMUP:
+        historical_data, under_negative_one_count, over_positive_one_count = warm_up_historical_vectorized(
+            historical_data, columns, rolling_vols, price_diff_window, counters, config, start_counts
         )
-
-        # Price difference
-        price_difference = avg_price_option - black_scholes_price
-
-        # **Delta Calculation**
-        delta = calculate_delta(
-            avg_price_underlying, config.STRIKE_PRICE, time_to_expiration,
-            config.RISK_FREE_RATE, estimated_vol, config.CALL_PUT
-        )
-
-        # Process price difference for signals
-        signal, under_count, over_count, rolling_mean_diff, rolling_std_diff, z_score = process_price_difference(
-            price_difference, price_diff_window, config.WINDOW_SIZE, config.Z_THRESHOLD, counters
+    else:
+        historical_data, under_negative_one_count, over_positive_one_count = warm_up_historical(
+            historical_data, columns, rolling_vols, price_diff_window, counters, config, start_counts
         )
-        signal, can_trade_same_dir, net_worth, risk = update_signal(signal, delta, config)
-
-        # Update counts
-        under_negative_one_count += under_count
-        over_positive_one_count += over_count
-
-        # Update the row with computed values
-        row["black_scholes_price"] = black_scholes_price
-        row["implied_vol"] = implied_vol
-        row["estimated_vol"] = estimated_vol
-        row["price_difference"] = price_difference
-        row["rolling_mean_diff"] = rolling_mean_diff
-        row["rolling_std_diff"] = rolling_std_diff
-        row["z_score"] = z_score
-        row["signal"] = signal
-        row["delta"] = delta  # Added Delta to results
-        row["net_worth"] = net_worth
-        row["can_trade_same_dir"] = can_trade_same_dir
-        row["risk"] = risk
-        row["under_negative_one_count"] = under_negative_one_count
-        row["over_positive_one_count"] = over_positive_one_count
-
-        processed_rows.append(row)
 
     print("historical data completely computed")
-    historical_data = pd.DataFrame(processed_rows, columns=columns)
     # historical_data.to_excel("output.xlsx", index=False)
 
     # Now process live data until the data_queue is empty
@@ -176,7 +128,7 @@ def merge_historical_and_live_data(
             continue
 
         # Calculate time to expiration
-        time_to_expiration = calculate_time_to_expiration(current_date_jalali, config.EXPIRATION_DATE)
+        time_to_expiration = calculate_time_to_expiration(current_date_jalali, config.EXPIRATION_DATE, current_time)
         if time_to_expiration <= 0:
             print("WARNING: Expiration date reached or passed.")
             # Stop processing since expiration is passed
@@ -191,21 +143,15 @@ def merge_historical_and_live_data(
         # Calculate estimated volatility
         estimated_vol = calculate_estimated_volatility(implied_vol, rolling_vols)
 
-        # Calculate Black-Scholes price
-        black_scholes_price = calculate_black_scholes_price(
-            avg_price_underlying, config.STRIKE_PRICE, config.RISK_FREE_RATE,
-            config.EXPIRATION_DATE, config.CALL_PUT, current_date_jalali, estimated_vol
+        # Calculate Black-Scholes price and delta
+        black_scholes_price, delta, _, _, _ = calculate_black_scholes_greeks(
+            avg_price_underlying, config.STRIKE_PRICE, time_to_expiration,
+            config.RISK_FREE_RATE, estimated_vol, config.CALL_PUT
         )
 
         # Calculate price difference
         price_difference = avg_price_option - black_scholes_price
 
-        # **Delta Calculation**
-        delta = calculate_delta(
-            avg_price_underlying, config.STRIKE_PRICE, time_to_expiration,
-            config.RISK_FREE_RATE, estimated_vol, config.CALL_PUT
-        )
-
         # Process price difference and generate signals
         signal, under_count, over_count, rolling_mean_diff, rolling_std_diff, z_score = process_price_difference(
             price_difference, price_diff_window, config.WINDOW_SIZE, config.Z_THRESHOLD, counters
@@ -250,4 +196,237 @@ def merge_historical_and_live_data(
     # Signal that processing is now fully ready since we have a combined dataset
     processing_ready_event.set()
 
-    return combined_data
+    return combined_data, under_negative_one_count, over_positive_one_count
+
+
+def warm_up_historical(historical_data, columns, rolling_vols, price_diff_window, counters, config=None,
+                       start_counts=(0, 0)):
+    """
+    Replays the historical rows one by one through the live processing steps.
+
+    Parameters:
+    - historical_data: DataFrame with Date, Time, avg_price_underlying and avg_price_option columns.
+    - columns: List of column names of the result.
+    - rolling_vols: RollingWindow (or deque) of past implied volatilities, updated in place.
+    - price_diff_window: RollingWindow (or deque) of past price differences, updated in place.
+    - counters: ErrorCounters instance.
+    - config: Optional instrument config, defaults to the process config.
+    - start_counts: (under_negative_one_count, over_positive_one_count) to continue from.
+
+    Returns:
+    The processed DataFrame and the final under_negative_one_count and over_positive_one_count.
+    """
+    config = get_config() if config is None else config
+
+    # Initialize counters for signals
+    under_negative_one_count, over_positive_one_count = start_counts
+
+    processed_rows = []
+    for idx, row in historical_data.iterrows():
+        current_date_jalali = row["Date"]
+        current_time = row["Time"]
+        avg_price_underlying = row["avg_price_underlying"]
+        avg_price_option = row["avg_price_option"]
+
+        # Validate data
+        is_valid = validate_time_and_data_preprocess(
+            current_time, counters, avg_price_underlying, avg_price_option
+        )
+        if not is_valid:
+            continue
+
+        time_to_expiration = calculate_time_to_expiration(current_date_jalali, config.EXPIRATION_DATE, current_time)
+        if time_to_expiration <= 0:
+            continue
+
+        implied_vol = calculate_implied_volatility(
+            avg_price_option, avg_price_underlying, time_to_expiration, config.STRIKE_PRICE,
+            config.RISK_FREE_RATE, config.CALL_PUT, counters
+        )
+
+        # Estimated volatility
+        estimated_vol = calculate_estimated_volatility(implied_vol, rolling_vols)
+
+        # Black-Scholes price and delta
+        black_scholes_price, delta, _, _, _ = calculate_black_scholes_greeks(
+            avg_price_underlying, config.STRIKE_PRICE, time_to_expiration,
+            config.RISK_FREE_RATE, estimated_vol, config.CALL_PUT
+        )
+
+        # Price difference
+        price_difference = avg_price_option - black_scholes_price
+
+        # Process price difference for signals
+        signal, under_count, over_count, rolling_mean_diff, rolling_std_diff, z_score = process_price_difference(
+            price_difference, price_diff_window, config.WINDOW_SIZE, config.Z_THRESHOLD, counters
+        )
+        signal, can_trade_same_dir, net_worth, risk = update_signal(signal, delta, config)
+
+        # Update counts
+        under_negative_one_count += under_count
+        over_positive_one_count += over_count
+
+        # Update the row with computed values
+        row["black_scholes_price"] = black_scholes_price
+        row["implied_vol"] = implied_vol
+        row["estimated_vol"] = estimated_vol
+        row["price_difference"] = price_difference
+        row["rolling_mean_diff"] = rolling_mean_diff
+        row["rolling_std_diff"] = rolling_std_diff
+        row["z_score"] = z_score
+        row["signal"] = signal
+        row["delta"] = delta  # Added Delta to results
+        row["net_worth"] = net_worth
+        row["can_trade_same_dir"] = can_trade_same_dir
+        row["risk"] = risk
+        row["under_negative_one_count"] = under_negative_one_count
+        row["over_positive_one_count"] = over_positive_one_count
+
+        processed_rows.append(row)
+
+    return pd.DataFrame(processed_rows, columns=columns), under_negative_one_count, over_positive_one_count
+
+
+def _past_window_stats(seed, values, window_size, min_periods):
+    """
+    Rolling statistics of the values seen strictly before every row.
+
+    The window holds the non-NaN values only, starting with the already buffered seed values, exactly like
+    appending every non-NaN value to a deque(maxlen=window_size) after the row has been evaluated.
+
+    Returns:
+    Per-row mean, sample standard deviation and number of values in the window.
+    """
+    seed = np.asarray(seed, dtype=float)
+    present = ~np.isnan(values)
+    compact = pd.Series(np.concatenate([seed, values[present]]))
+    rolling = compact.rolling(window_size, min_periods=1)
+    means = rolling.mean().to_numpy()
+    stds = rolling.std(ddof=1).to_numpy()
+
+    # Index of the last compact value before each row; -1 when the window is still empty.
+    last = len(seed) + np.cumsum(present) - present - 1
+    available = np.minimum(last + 1, window_size)
+    ready = available >= min_periods
+    mean = np.full(len(values), np.nan)
+    std = np.full(len(values), np.nan)
+    mean[ready] = means[last[ready]]
+    std[ready] = stds[last[ready]]
+    return mean, std, available, compact.to_numpy()[-window_size:]
+
+
+def warm_up_historical_vectorized(historical_data, columns, rolling_vols, price_diff_window, counters, config=None,
+                                  start_counts=(0, 0)):
+    """
+    Columnar equivalent of warm_up_historical.
+
+    Validation, time to expiration, implied volatility, the SMA of past implied volatilities, Black-Scholes price,
+    delta and the rolling z-score are computed as whole-column operations. Rolling statistics use the same
+    "past values only" semantics as the live path: the row itself enters the window after it has been evaluated,
+    and NaN values never enter it. Only update_signal, which reads the live trading state, runs per row.
+    Afterwards rolling_vols and price_diff_window hold the state after the last historical row.
+
+    Implied volatilities come from the vectorized solvers, so they agree with the per-row py_vollib values to
+    solver tolerance rather than bit for bit.
+
+    Parameters:
+    - historical_data: DataFrame with Date, Time, avg_price_underlying and avg_price_option columns.
+    - columns: List of column names of the result.
+    - rolling_vols: RollingWindow (or deque) of past implied volatilities, updated in place.
+    - price_diff_window: RollingWindow (or deque) of past price differences, updated in place.
+    - counters: ErrorCounters instance.
+    - config: Optional instrument config, defaults to the process config.
+    - start_counts: (under_negative_one_count, over_positive_one_count) to continue from.
+
+    Returns:
+    The processed DataFrame and the final under_negative_one_count and over_positive_one_count.
+    """
+    config = get_config() if config is None else config
+    data = historical_data.copy()
+
+    # Validation, as in validate_time_and_data_preprocess
+    times = data["Time"].map(str)
+    in_time = ((times >= str(config.VALID_TIME_START)) & (times <= str(config.VALID_TIME_END))).to_numpy()
+    counters.skip_by_time_counter += int(np.count_nonzero(~in_time))
+    has_prices = np.ones(len(data), dtype=bool)
+    for col in ["avg_price_underlying", "avg_price_option"]:
+        has_prices &= ~data[col].map(lambda value: value is None or value == 0).to_numpy(dtype=bool)
+    counters.null_counter += int(np.count_nonzero(in_time & ~has_prices))
+    data = data[in_time & has_prices]
+
+    time_to_expiration = time_to_expiration_array(data["Date"], config.EXPIRATION_DATE, data["Time"].map(str))
+    data = data[time_to_expiration > 0]
+    time_to_expiration = time_to_expiration[time_to_expiration > 0]
+
+    avg_price_underlying = data["avg_price_underlying"].to_numpy(dtype=float)
+    avg_price_option = data["avg_price_option"].to_numpy(dtype=float)
+
+    solver = implied_volatility_lookup if config.IV_METHOD == 'lookup' else implied_volatility_batch
+    implied_vol, iv_codes = solver(avg_price_option, avg_price_underlying, config.STRIKE_PRICE, time_to_expiration,
+                                   config.RISK_FREE_RATE, config.CALL_PUT)
+    # Missing quotes yield NaN without an error in calculate_implied_volatility, so only real failures count
+    counters.try_except_counter += int(np.count_nonzero((iv_codes != IV_OK) & ~np.isnan(avg_price_option)))
+
+    # Estimated volatility from past implied volatilities (NaN while there are none)
+    if isinstance(rolling_vols, VolatilityEstimator):
+        estimated_vol = rolling_vols.estimate_batch(implied_vol)
+    else:
+        estimated_vol, _, _, vol_tail = _past_window_stats(
+            list(rolling_vols), implied_vol, config.SMOOTHING_PARAM, min_periods=1)
+        rolling_vols.clear()
+        rolling_vols.extend(vol_tail)
+
+    black_scholes_price, delta, _, _, _ = black_scholes_greeks_batch(
+        avg_price_underlying, config.STRIKE_PRICE, time_to_expiration,
+        config.RISK_FREE_RATE, estimated_vol, config.CALL_PUT
+    )
+    # calculate_black_scholes_greeks reports an undefined delta as None
+    delta = np.where(np.isnan(estimated_vol), None, delta).astype(object)
+    price_difference = avg_price_option - black_scholes_price
+
+    # Rolling z-score over the past WINDOW_SIZE price differences
+    if isinstance(price_diff_window, RobustRollingWindow):
+        # The rolling median/MAD has no columnar form; the robust window is fed row by row.
+        statistics = [process_price_difference(
+            difference, price_diff_window, config.WINDOW_SIZE, config.Z_THRESHOLD, counters
+        ) for difference in price_difference]
+        raw_signals = [(signal, under, over) for signal, under, over, _, _, _ in statistics]
+        rolling_mean_diff = np.array([row[3] for row in statistics], dtype=float)
+        rolling_std_diff = np.array([row[4] for row in statistics], dtype=float)
+        z_score = np.array([row[5] for row in statistics], dtype=float)
+        diff_tail = list(price_diff_window)
+    else:
+        rolling_mean_diff, rolling_std_diff, available, diff_tail = _past_window_stats(
+            list(price_diff_window), price_difference, config.WINDOW_SIZE, min_periods=config.WINDOW_SIZE)
+        counters.condition_error_counter += int(np.count_nonzero(available < config.WINDOW_SIZE))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_score = np.where(rolling_std_diff == 0, 0.0,
+                               (price_difference - rolling_mean_diff) / rolling_std_diff)
+        raw_signals = [generate_signals(z, config.Z_THRESHOLD) for z in z_score]
+
+    under_counts = start_counts[0] + np.cumsum([under for _, under, _ in raw_signals], dtype=np.int64)
+    over_counts = start_counts[1] + np.cumsum([over for _, _, over in raw_signals], dtype=np.int64)
+    updated = [update_signal(signal, d, config) for (signal, _, _), d in zip(raw_signals, delta)]
+
+    data["black_scholes_price"] = black_scholes_price
+    data["implied_vol"] = implied_vol
+    data["estimated_vol"] = estimated_vol
+    data["price_difference"] = price_difference
+    data["rolling_mean_diff"] = rolling_mean_diff
+    data["rolling_std_diff"] = rolling_std_diff
+    data["z_score"] = z_score
+    data["signal"] = [u[0] for u in updated]
+    data["delta"] = delta
+    data["net_worth"] = [u[2] for u in updated]
+    data["can_trade_same_dir"] = [u[1] for u in updated]
+    data["risk"] = [u[3] for u in updated]
+    data["under_negative_one_count"] = under_counts
+    data["over_positive_one_count"] = over_counts
+
+    # Seed the live window with the tail of the historical values
+    price_diff_window.clear()
+    price_diff_window.extend(diff_tail)
+
+    under_negative_one_count = int(under_counts[-1]) if len(under_counts) else start_counts[0]
+    over_positive_one_count = int(over_counts[-1]) if len(over_counts) else start_counts[1]
+    return data[columns], under_negative_one_count, over_positive_one_count
@@ -1,100 +1,195 @@
+import os
 import time
 import jdatetime
 import numpy as np
 from helpers import (
-    validate_time_and_data, calculate_time_to_expiration,
-    calculate_implied_volatility, calculate_estimated_volatility,
-    calculate_black_scholes_price, calculate_delta, update_signal  # Added Delta import
+    validate_time_and_data, calculate_time_to_expiration, calculate_estimated_volatility,
+    calculate_black_scholes_greeks, update_signal
 )
 from signals import process_price_difference
+from iv_solver import IncrementalIVSolver
+from shadow_signals import ShadowSignalEngine
+from latency import latency_file_path
 from config import get_config
 
 
-def processing_thread(data_queue, result_queue, signal_queue, counters, processing_ready_event, rolling_vols,
-                      price_diff_window, stop_event):
+class TickProcessor:
     """
-    Thread function for data processing and signal generation.
+    Live per-instrument state and the processing of one tick, shared by processing_thread and the asyncio runtime.
+
+    If a StateSnapshotter is given, the rolling state is snapshotted periodically and once more on close().
+    restored_state (from state_store.load_state) continues the signal counters of the previous run.
+    If config.SHADOW_WINDOW_SIZES is set, the shadow window/threshold combinations are evaluated on every price
+    difference and written to exels/ on close().
+
+    config is the instrument's config (see the_config.for_instrument), by default the process config.
+
+    Create it once the historical warm-up has filled rolling_vols and price_diff_window.
     """
-    config = get_config()
 
+    def __init__(self, counters, rolling_vols, price_diff_window, snapshotter=None, restored_state=None,
+                 config=None):
+        config = get_config() if config is None else config
+        self.config = config
+        self.counters = counters
+        self.rolling_vols = rolling_vols
+        self.price_diff_window = price_diff_window
+        self.snapshotter = snapshotter
+        self.expired = False
+
+        self.under_negative_one_count = 0
+        self.over_positive_one_count = 0
+        self.last_date, self.last_time = None, None
+        if restored_state is not None:
+            self.under_negative_one_count = restored_state["under_negative_one_count"]
+            self.over_positive_one_count = restored_state["over_positive_one_count"]
+            self.last_date, self.last_time = restored_state["last_date"], restored_state["last_time"]
+
+        self.shadow_engine = None
+        if config.SHADOW_WINDOW_SIZES:
+            self.shadow_engine = ShadowSignalEngine(config.SHADOW_WINDOW_SIZES, config.SHADOW_Z_THRESHOLDS)
+            self.shadow_engine.extend(list(price_diff_window))  # start from the warmed-up production window
+
+        self.iv_solver = IncrementalIVSolver(config.STRIKE_PRICE, config.RISK_FREE_RATE, config.CALL_PUT, counters)
+        if rolling_vols:
+            self.iv_solver.seed(rolling_vols[-1])  # warm start from the last historical implied volatility
+
+    def process(self, current_date_jalali, current_time, underlying_data, option_data, implied_vol=None,
+                smile_vol=None):
+        """
+        Price one tick and generate its signal.
+
+        implied_vol is the option's implied volatility solved by the feed's OptionChain, if any; the processor only
+        solves it itself when it is missing or NaN. smile_vol is the chain's smile volatility for the 'smile'
+        volatility estimator (see volatility_estimators.SmileVolatilityEstimator).
+
+        Returns:
+            Optional[dict]: The result row, or None if the tick was skipped. Sets expired and returns None once the
+            option has expired.
+        """
+        config = self.config
+        counters = self.counters
+
+        avg_price_underlying, avg_price_option, is_valid = validate_time_and_data(
+            current_time, underlying_data, option_data, counters
+        )
+        if not is_valid:
+            print("INFO: Skipping due to invalid data or time :data has 0 :")
+            return None
+
+        time_to_expiration = calculate_time_to_expiration(current_date_jalali, config.EXPIRATION_DATE, current_time)
+        if time_to_expiration <= 0:
+            self.expired = True
+            return None
+
+        if implied_vol is None or np.isnan(implied_vol):
+            implied_vol = self.iv_solver.solve(avg_price_option, avg_price_underlying, time_to_expiration)
+        else:
+            self.iv_solver.seed(implied_vol)  # warm start for ticks without a chain solve
+
+        if smile_vol is not None:
+            self.rolling_vols.set_smile_vol(smile_vol)
+        estimated_vol = calculate_estimated_volatility(
+            implied_vol, self.rolling_vols
+        )
+
+        black_scholes_price, delta, _, _, _ = calculate_black_scholes_greeks(
+            avg_price_underlying, config.STRIKE_PRICE, time_to_expiration,
+            config.RISK_FREE_RATE, estimated_vol, config.CALL_PUT
+        )
+
+        price_difference = avg_price_option - black_scholes_price
+
+        if self.shadow_engine is not None:
+            self.shadow_engine.process(current_date_jalali, current_time, price_difference)
+
+        signal, under_count, over_count, rolling_mean_diff, rolling_std_diff, z_score = process_price_difference(
+            price_difference, self.price_diff_window, config.WINDOW_SIZE, config.Z_THRESHOLD, counters
+        )
+
+        self.under_negative_one_count += under_count
+        self.over_positive_one_count += over_count
+
+        signal, can_trade_same_dir, net_worth, risk = update_signal(signal, delta, config)
+
+        result = {
+            "Date": current_date_jalali,
+            "Time": current_time,
+            "avg_price_underlying": avg_price_underlying,
+            "avg_price_option": avg_price_option,
+            "black_scholes_price": black_scholes_price,
+            "implied_vol": implied_vol,
+            "estimated_vol": estimated_vol,
+            "price_difference": price_difference,
+            "rolling_mean_diff": rolling_mean_diff,
+            "rolling_std_diff": rolling_std_diff,
+            "z_score": z_score,
+            "signal": signal,  # Updated signal if necessary
+            "delta": delta,  # Added Delta to results
+            "net_worth": net_worth,
+            "can_trade_same_dir": can_trade_same_dir,
+            "risk": risk,
+            "under_negative_one_count": self.under_negative_one_count,
+            "over_positive_one_count": self.over_positive_one_count,
+        }
+
+        self.last_date, self.last_time = current_date_jalali, current_time
+        if self.snapshotter is not None:
+            self.snapshotter.maybe_save(self.rolling_vols, self.price_diff_window, self.under_negative_one_count,
+                                        self.over_positive_one_count, self.last_date, str(self.last_time))
+        return result
+
+    def close(self):
+        """
+        Write the final state snapshot and the shadow signals.
+        """
+        config = self.config
+        if self.snapshotter is not None and self.last_date is not None:
+            self.snapshotter.save(self.rolling_vols, self.price_diff_window, self.under_negative_one_count,
+                                  self.over_positive_one_count, self.last_date, str(self.last_time))
+        if self.shadow_engine is not None:
+            jalali_date = jdatetime.datetime.now().strftime("%Y-%m-%d")
+            shadow_filename = os.path.join(
+                "exels", f"market_name_{config.OPTION_NAME}_shadow_signals_{jalali_date}.xlsx")
+            self.shadow_engine.save_to_excel(shadow_filename)
+            print(f"INFO: Shadow signals saved to {shadow_filename}.")
+
+
+def processing_thread(data_queue, result_queue, signal_queue, counters, processing_ready_event, rolling_vols,
+                      price_diff_window, stop_event, snapshotter=None, restored_state=None, config=None):
+    """
+    Thread function for data processing and signal generation. See TickProcessor for snapshotter, restored_state
+    and config. The stage latencies of every tick are recorded in counters.latency and written to
+    latency_files/ every LATENCY_DUMP_INTERVAL seconds.
+    """
     print("INFO: Processing thread waiting for historical data to be ready...")
     processing_ready_event.wait()
     print("INFO: Historical data is ready. Processing thread starting analysis.")
 
-    under_negative_one_count = 0
-    over_positive_one_count = 0
+    processor = TickProcessor(counters, rolling_vols, price_diff_window, snapshotter, restored_state, config)
+    config = processor.config
+    latency_path = latency_file_path(config.OPTION_TICKER)
 
     try:
         while not stop_event.is_set():
-            time.sleep(0.01)
-            if data_queue:
-                current_date_jalali, current_time, underlying_data, option_data = data_queue.popleft()
-
-                avg_price_underlying, avg_price_option, is_valid = validate_time_and_data(
-                    current_time, underlying_data, option_data, counters
-                )
-                if not is_valid:
-                    print("INFO: Skipping due to invalid data or time :data has 0 :")
-                    continue
-
-                time_to_expiration = calculate_time_to_expiration(current_date_jalali, config.EXPIRATION_DATE)
-                if time_to_expiration <= 0:
+            tick = data_queue.get()  # blocks until the fetcher hands over a tick
+            if tick is not None:
+                tick.dequeued = time.monotonic()
+                result = processor.process(*tick, implied_vol=tick.implied_vol, smile_vol=tick.smile_vol)
+                tick.processed = time.monotonic()
+                counters.latency.record_tick(tick)
+                counters.latency.maybe_dump(latency_path, config.LATENCY_DUMP_INTERVAL)
+                if processor.expired:
                     print("WARNING: Expiration date reached or passed.")
                     break
-
-                implied_vol = calculate_implied_volatility(
-                    avg_price_option, avg_price_underlying, time_to_expiration, config.STRIKE_PRICE,
-                    config.RISK_FREE_RATE, config.CALL_PUT, counters
-                )
-
-                estimated_vol = calculate_estimated_volatility(
-                    implied_vol, rolling_vols
-                )
-
-                black_scholes_price = calculate_black_scholes_price(
-                    avg_price_underlying, config.STRIKE_PRICE, config.RISK_FREE_RATE,
-                    config.EXPIRATION_DATE, config.CALL_PUT, current_date_jalali, estimated_vol
-                )
-
-                price_difference = avg_price_option - black_scholes_price
-
-                # **Delta Calculation**
-                delta = calculate_delta(
-                    avg_price_underlying, config.STRIKE_PRICE, time_to_expiration,
-                    config.RISK_FREE_RATE, estimated_vol, config.CALL_PUT
-                )
-
-                signal, under_count, over_count, rolling_mean_diff, rolling_std_diff, z_score = process_price_difference(
-                    price_difference, price_diff_window, config.WINDOW_SIZE, config.Z_THRESHOLD, counters
-                )
-
-                under_negative_one_count += under_count
-                over_positive_one_count += over_count
-
-                signal, can_trade_same_dir, net_worth, risk = update_signal(signal, delta, config)
-
-                result = {
-                    "Date": current_date_jalali,
-                    "Time": current_time,
-                    "avg_price_underlying": avg_price_underlying,
-                    "avg_price_option": avg_price_option,
-                    "black_scholes_price": black_scholes_price,
-                    "implied_vol": implied_vol,
-                    "estimated_vol": estimated_vol,
-                    "price_difference": price_difference,
-                    "rolling_mean_diff": rolling_mean_diff,
-                    "rolling_std_diff": rolling_std_diff,
-                    "z_score": z_score,
-                    "signal": signal,  # Updated signal if necessary
-                    "delta": delta,  # Added Delta to results
-                    "net_worth": net_worth,
-                    "can_trade_same_dir": can_trade_same_dir,
-                    "risk": risk,
-                    "under_negative_one_count": under_negative_one_count,
-                    "over_positive_one_count": over_positive_one_count,
-                }
+                if result is None:
+                    continue
 
                 result_queue.append(result)
-                signal_queue.append({"Time": current_time, "signal": signal})
+                signal_queue.append({"Time": result["Time"], "signal": result["signal"], "tick": tick})
     finally:
+        counters.dropped_tick_counter = data_queue.dropped
+        processor.close()
+        if config.LATENCY_DUMP_INTERVAL:
+            counters.latency.dump(latency_path)
         print("INFO: processing_thread is shutting down gracefully.")
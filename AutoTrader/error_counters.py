@@ -1,5 +1,8 @@
 # error_counters.py
 
+from latency import LatencyStats
+
+
 class ErrorCounters:
     """
     Class to keep track of various error and condition counters.
@@ -11,6 +14,12 @@ class ErrorCounters:
         self.try_except_counter = 0
         self.key_error_counter = 0
         self.condition_error_counter = 0  # For condition-related errors
+        self.iv_solve_counter = 0  # Incremental implied volatility solves
+        self.iv_iteration_counter = 0  # Newton iterations spent by the incremental solver
+        self.iv_fallback_counter = 0  # Incremental solves that fell back to the exact solver
+        self.iv_cache_hit_counter = 0  # Ticks that reused the previous tick's implied volatility
+        self.dropped_tick_counter = 0  # Fetched ticks replaced or dropped before processing
+        self.latency = LatencyStats()  # Per-stage tick latency histograms
 
     def report(self):
         print(f"INFO: Null data rows: {self.null_counter}")
@@ -18,3 +27,11 @@ class ErrorCounters:
         print(f"INFO: Errors in implied volatility calculation: {self.try_except_counter}")
         print(f"INFO: KeyErrors encountered: {self.key_error_counter}")
         print(f"INFO: Condition-related errors: {self.condition_error_counter}")
+        print(f"INFO: Ticks dropped or coalesced before processing: {self.dropped_tick_counter}")
+        if self.iv_solve_counter:
+            print(f"INFO: Incremental IV solves: {self.iv_solve_counter}, "
+                  f"average iterations: {self.iv_iteration_counter / self.iv_solve_counter:.2f}, "
+                  f"fallbacks to exact solver: {self.iv_fallback_counter}")
+        if self.iv_cache_hit_counter:
+            print(f"INFO: IV reused from the previous tick (unchanged prices): {self.iv_cache_hit_counter}")
+        self.latency.report()
@@ -2,14 +2,16 @@
 
 import numpy as np
 import pandas as pd
-import jdatetime
 import datetime
 from scipy.stats import norm
 from collections import deque
-from py_vollib.black_scholes import black_scholes
 from py_vollib.black_scholes.implied_volatility import implied_volatility
 from config import get_config
 from py_vollib.black_scholes.greeks.analytical import delta
+from pricing import black_scholes_price_batch, black_scholes_greeks_batch
+from trading_calendar import time_to_expiration
+from rolling_window import RollingWindow
+from volatility_estimators import VolatilityEstimator
 
 import math
 
@@ -50,16 +52,52 @@ def calculate_delta(avg_price_underlying, strike_price, time_to_expiration, risk
     return delta_value
 
 
-def calculate_simple_moving_average(rolling_vols: deque) -> float:
+def calculate_black_scholes_greeks(avg_price_underlying, strike_price, time_to_expiration, risk_free_rate,
+                                   estimated_vol, call_put):
+    """
+    Calculate the Black-Scholes price together with Delta, Gamma, Vega and Theta from a single d1/d2 evaluation.
+
+    Args:
+        avg_price_underlying (float): Current price of the underlying asset.
+        strike_price (float): Strike price of the option.
+        time_to_expiration (float): Time to expiration in years.
+        risk_free_rate (float): Risk-free interest rate.
+        estimated_vol (float): Estimated volatility.
+        call_put (str): Option type ('c' for call, 'p' for put).
+
+    Returns:
+        Tuple[float, Optional[float], Optional[float], Optional[float], Optional[float]]: Price, delta, gamma, vega
+        and theta. As in calculate_black_scholes_price and calculate_delta, the price is NaN when it cannot be
+        computed, the Greeks are None if any input is None or NaN and 0 if time_to_expiration or estimated_vol
+        is not positive.
+    """
+    inputs = [avg_price_underlying, strike_price, time_to_expiration, risk_free_rate, estimated_vol]
+    if call_put is None or any(x is None or (isinstance(x, float) and math.isnan(x)) for x in inputs):
+        return np.nan, None, None, None, None
+
+    if time_to_expiration <= 0 or estimated_vol <= 0:
+        return np.nan, 0, 0, 0, 0
+
+    price, delta_value, gamma, vega, theta = (
+        float(value) for value in black_scholes_greeks_batch(
+            avg_price_underlying, strike_price, time_to_expiration, risk_free_rate, estimated_vol, call_put
+        )
+    )
+    return price, delta_value, gamma, vega, theta
+
+
+def calculate_simple_moving_average(rolling_vols) -> float:
     """
     Calculate the simple moving average (SMA) of implied volatility.
 
     Args:
-        rolling_vols (deque): A deque of past implied volatilities.
+        rolling_vols (RollingWindow or deque): Past implied volatilities. A RollingWindow gives the SMA in O(1).
 
     Returns:
         float: The SMA value.
     """
+    if isinstance(rolling_vols, RollingWindow):
+        return rolling_vols.mean()
     if len(rolling_vols) > 0:
         return sum(rolling_vols) / len(rolling_vols)
     return np.nan
@@ -67,16 +105,22 @@ def calculate_simple_moving_average(rolling_vols: deque) -> float:
 
 def calculate_estimated_volatility(implied_vol, rolling_vols):
     """
-    Calculate the estimated volatility using SMA or EMA based on the smoothing_param.
+    Calculate the estimated volatility from past implied volatilities only, then add the current one.
 
     Args:
         implied_vol (float): The current implied volatility.
-        rolling_vols (deque): A deque of past implied volatilities for SMA.
+        rolling_vols (VolatilityEstimator, RollingWindow or deque): A VolatilityEstimator (SMA, EMA or EWMA
+            variance, see volatility_estimators), or the past implied volatilities for an SMA.
 
     Returns:
         Tuple[float, deque, float]: The estimated volatility, updated rolling_vols, and updated ema_estimated_vol.
     """
 
+    if isinstance(rolling_vols, VolatilityEstimator):
+        estimated_vol = rolling_vols.estimate()
+        rolling_vols.append(implied_vol)
+        return estimated_vol
+
     estimated_vol = calculate_simple_moving_average(rolling_vols)
     if not pd.isnull(implied_vol):
         rolling_vols.append(implied_vol)
@@ -104,33 +148,33 @@ def calculate_black_scholes_price(avg_price_underlying, strike_price, risk_free_
     try:
         T = calculate_time_to_expiration(current_date_jalali, expiration_jalali_date)
         if T > 0 and estimated_vol > 0:
-            return black_scholes(call_put, avg_price_underlying, strike_price, T, risk_free_rate, estimated_vol)
+            return float(black_scholes_price_batch(
+                avg_price_underlying, strike_price, T, risk_free_rate, estimated_vol, call_put
+            ))
     except Exception as e:
-        a = 2
+        pass
     #    print(f"ERROR: Error calculating Black-Scholes price: {e}")
     return np.nan
 
 
-def calculate_time_to_expiration(current_date: str, expiration_jalali_date: str) -> float:
+def calculate_time_to_expiration(current_date: str, expiration_jalali_date: str, current_time=None) -> float:
     """
     Calculate the time to expiration (T) in years.
 
+    Dates are parsed through the memoized trading calendar, so repeated calls for the same
+    (date, expiry) pair do not re-parse the strings.
+
     Args:
         current_date (str): Current date in Jalali calendar (YYYY-MM-DD).
         expiration_jalali_date (str): Expiration date in Jalali calendar (YYYY-MM-DD).
+        current_time (datetime.time or str, optional): Current time of day, used for the intraday
+            value when config.TIME_TO_EXPIRATION_MODE is 'trading'.
 
     Returns:
         float: Time to expiration in years.
     """
     try:
-        expiration_jalali = jdatetime.datetime.strptime(expiration_jalali_date, '%Y-%m-%d')
-        expiration_gregorian = expiration_jalali.togregorian()
-
-        current_jalali_date = jdatetime.datetime.strptime(current_date, '%Y-%m-%d')
-        current_gregorian_date = current_jalali_date.togregorian()
-
-        days_to_expiration = (expiration_gregorian - current_gregorian_date).days
-        return days_to_expiration / 365  # Convert days to years
+        return time_to_expiration(current_date, expiration_jalali_date, current_time)
     except Exception as e:
         print(f"ERROR: Error calculating time to expiration: {e}")
     return 0.0
@@ -169,7 +213,7 @@ def calculate_implied_volatility(avg_price_option, avg_price_underlying, time_to
         return np.nan
 
 
-def fetch_data(api, underlying_ticker, option_ticker):
+def fetch_data(api, underlying_ticker, option_ticker, fetcher=None):
     """
     Fetch data for the underlying and options market.
 
@@ -177,10 +221,15 @@ def fetch_data(api, underlying_ticker, option_ticker):
         api (TradingAPI): An instance of the TradingAPI class.
         underlying_ticker (str): The ISIN ticker symbol for the underlying asset.
         option_ticker (str): The ISIN ticker symbol for the option.
+        fetcher (OrderBookFetcher, optional): Fetches both books concurrently within its deadline (a leg that
+            misses it is None). Without it they are fetched one after the other.
 
     Returns:
         Tuple[Optional[List[float]], Optional[List[float]]]: Tuple containing underlying data and option data.
     """
+    if fetcher is not None:
+        books = fetcher.fetch([underlying_ticker, option_ticker])
+        return books[underlying_ticker][0], books[option_ticker][0]
     underlying_data = api.fetch_order_book(underlying_ticker)
     option_data = api.fetch_order_book(option_ticker)
     return underlying_data, option_data
@@ -1,4 +1,5 @@
 import traceback
+from threading import Lock
 
 import numpy as np
 import pandas as pd
@@ -9,20 +10,61 @@ import finpy_tse as tse
 from config import get_config
 
 
-def historical_data_thread(historical_data_ready_event, historical_data_container, stop_event):
-    config = get_config()
+class UnderlyingHistoryCache:
     """
-    Thread function for downloading and processing historical data.
+    Downloaded order-book history of each underlying, shared by all the options on it.
+
+    The first request for an underlying downloads and structures its history; concurrent requests for the same
+    underlying wait for that download instead of starting their own, and later ones reuse it. Each option then
+    only downloads its own leg and joins it to the cached underlying.
+    """
+
+    def __init__(self, frames=None):
+        """
+        Args:
+            frames (dict, optional): Histories downloaded elsewhere (e.g. by the worker pool's coordinator), keyed
+                by (underlying_stock, start_date, end_date).
+        """
+        self.frames = dict(frames or {})
+        self._locks = {}
+        self._lock = Lock()
+
+    def get(self, underlying_stock: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        The underlying's download_market_data result, downloaded on first use.
+        """
+        key = (underlying_stock, start_date, end_date)
+        with self._lock:
+            key_lock = self._locks.setdefault(key, Lock())
+        with key_lock:
+            frame = self.frames.get(key)
+            if frame is None:
+                frame = download_market_data(underlying_stock, "Underlying Market", start_date, end_date)
+                self.frames[key] = frame
+        return frame
+
+
+def historical_data_thread(historical_data_ready_event, historical_data_container, stop_event, config=None,
+                           underlying_cache=None):
+    config = get_config() if config is None else config
+    """
+    Thread function for downloading and processing historical data. With an UnderlyingHistoryCache the underlying
+    is downloaded once for all the options sharing the cache.
     """
     print("INFO: Historical data thread started.")
     try:
         if stop_event.is_set():
             return
+        underlying_data = None
+        if underlying_cache is not None:
+            underlying_data = underlying_cache.get(config.UNDERLYING_NAME, config.HISTORICAL_DATA_START_DATE,
+                                                   config.HISTORICAL_DATA_END_DATE)
         historical_data = process_and_flatten_market_data(
             underlying_stock=config.UNDERLYING_NAME,
             option_stock=config.OPTION_NAME,
             start_date=config.HISTORICAL_DATA_START_DATE,
             end_date=config.HISTORICAL_DATA_END_DATE,
+            underlying_data=underlying_data,
         )
         historical_data_container['data'] = historical_data
         print("INFO: Historical data is ready.")
@@ -34,11 +76,135 @@ def historical_data_thread(historical_data_ready_event, historical_data_containe
         print("INFO: historical_data_thread is shutting down gracefully.")
 
 
+def valid_time_list() -> list:
+    """
+    The times between VALID_TIME_START and VALID_TIME_END with 1-second intervals.
+    """
+    start_time = get_config().VALID_TIME_START
+    end_time = get_config().VALID_TIME_END
+    delta = datetime.timedelta(seconds=1)
+    time_list = []
+    current = start_time
+    while current <= end_time:
+        time_list.append(current)
+        current = (datetime.datetime.combine(datetime.date.min, current) + delta).time()
+    return time_list
+
+
+def editing_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Edit and clean the raw data DataFrame.
+    """
+    df_edt = df.reset_index()
+    df_edt = df_edt[df_edt["Depth"] == 1]
+    df_edt = df_edt.reset_index(drop=True)
+    df_edt = df_edt[["J-Date", "Time", "Sell_Vol", "Sell_Price", "Buy_Price", "Buy_Vol"]]
+    df_edt["J-Date"] = df_edt["J-Date"].astype(str)
+    df_edt["Time"] = df_edt["Time"].astype(str)
+
+    initial_row_count = df_edt.shape[0]
+    df_edt = df_edt.drop_duplicates(subset=["J-Date", "Time"])
+    final_row_count = df_edt.shape[0]
+
+    return df_edt
+
+
+def generate_daily_data(date: str, data: pd.DataFrame, time_list: list) -> pd.Series:
+    """
+    Generate daily data aligned with the specified time list.
+    """
+    day_detail = pd.Series([np.array([np.nan] * 4)] * len(time_list), index=time_list)
+    row = [np.nan] * 4
+    today_data = data[data["J-Date"] == date]
+    today_data.index = list(today_data["Time"])
+    changed_times = list(today_data.index)
+    temp_row = row
+    changed_times_iter = iter(changed_times)
+    next_match = next(changed_times_iter, None)
+    first_time_list_time = time_list[0] if isinstance(time_list[0], datetime.time) else datetime.datetime.strptime(
+        time_list[0], "%H:%M:%S").time()
+    while next_match:
+        next_match_time = datetime.datetime.strptime(next_match, "%H:%M:%S").time() if isinstance(next_match,
+                                                                                                  str) else next_match
+        if next_match_time >= first_time_list_time:
+            break
+        next_match = next(changed_times_iter, None)
+
+    for i in time_list:
+        if next_match and str(i) == next_match:
+            if str(i) in today_data.index:
+                temp_row = np.array(today_data.loc[str(i)])[-4:]
+            next_match = next(changed_times_iter, None)
+        day_detail.loc[i] = temp_row
+    return day_detail
+
+
+def preparing_structure(data: pd.DataFrame, dates: list, time_list: list) -> pd.DataFrame:
+    """
+    Prepare the structured DataFrame from processed data.
+    """
+    data["J-Date"] = data["J-Date"].astype(str)
+    data["Time"] = data["Time"].astype(str)
+    column = []
+    for i in dates:
+        column.append(generate_daily_data(i, data, time_list))
+    df = pd.concat(column, axis=1)
+    df.columns = dates
+    return df
+
+
+def download_market_data(stock_name: str, market_type: str, start_date: str, end_date: str,
+                         time_list: list = None) -> pd.DataFrame:
+    """
+    Process a single stock's data: download, edit and structure it.
+
+    Returns:
+    - pd.DataFrame: One column per day, one row per time of time_list (valid_time_list() by default), each cell
+                    the [Sell_Vol, Sell_Price, Buy_Price, Buy_Vol] in effect at that second.
+    """
+    time_list = valid_time_list() if time_list is None else time_list
+
+    while True:
+        print(f"Start downloading data for {market_type}: {stock_name}")
+        data = tse.Get_IntradayOB_History(
+            stock=stock_name,
+            start_date=start_date,
+            end_date=end_date,
+            jalali_date=True,
+            combined_datatime=False,
+            show_progress=True
+        )
+        print("Downloading data finished.")
+
+        # Process the data
+        data = editing_data(data)
+        datapirim = preparing_structure(data, list(data["J-Date"].unique()), time_list)
+
+        # Check if all data is null
+        all_null_data = True
+        for date in tqdm(datapirim.columns, desc=f"Processing {market_type} Data", total=datapirim.shape[1]):
+            for time, underlying_data in datapirim[date].items():
+                if not (np.isnan(underlying_data[1]) and np.isnan(underlying_data[2])):
+                    all_null_data = False
+                    break
+            if not all_null_data:
+                break
+
+        # Retry if data is all null
+        if all_null_data:
+            print(f"Everything null for {market_type} ({stock_name}). Retrying data retrieval...")
+        else:
+            break
+
+    return datapirim
+
+
 def process_and_flatten_market_data(
         underlying_stock: str,
         option_stock: str,
         start_date: str,
         end_date: str,
+        underlying_data: pd.DataFrame = None,
 ) -> pd.DataFrame:
     """
     Process, save, and flatten underlying and options market data, and calculate implied volatility.
@@ -48,6 +214,8 @@ def process_and_flatten_market_data(
     - option_stock (str): Name of the option stock.
     - start_date (str): Start date in Jalali format ('YYYY-MM-DD').
     - end_date (str): End date in Jalali format ('YYYY-MM-DD').
+    - underlying_data (pd.DataFrame, optional): The underlying's download_market_data result, downloaded here if
+      not given.
     - strike_price (float): Strike price of the option.
     - risk_free_rate (float): Risk-free interest rate.
     - expiration_jalali_date (str): Expiration date in Jalali format ('YYYY-MM-DD').
@@ -60,121 +228,16 @@ def process_and_flatten_market_data(
                     If `just_download` is True, returns an empty DataFrame.
     """
 
-    # ----------------- Helper Functions -----------------
-
-    def editing_data(df: pd.DataFrame) -> pd.DataFrame:
-        """
-        Edit and clean the raw data DataFrame.
-        """
-        df_edt = df.reset_index()
-        df_edt = df_edt[df_edt["Depth"] == 1]
-        df_edt = df_edt.reset_index(drop=True)
-        df_edt = df_edt[["J-Date", "Time", "Sell_Vol", "Sell_Price", "Buy_Price", "Buy_Vol"]]
-        df_edt["J-Date"] = df_edt["J-Date"].astype(str)
-        df_edt["Time"] = df_edt["Time"].astype(str)
-
-        initial_row_count = df_edt.shape[0]
-        df_edt = df_edt.drop_duplicates(subset=["J-Date", "Time"])
-        final_row_count = df_edt.shape[0]
-
-        return df_edt
-
-    def generate_daily_data(date: str, data: pd.DataFrame, time_list: list) -> pd.Series:
-        """
-        Generate daily data aligned with the specified time list.
-        """
-        day_detail = pd.Series([np.array([np.nan] * 4)] * len(time_list), index=time_list)
-        row = [np.nan] * 4
-        today_data = data[data["J-Date"] == date]
-        today_data.index = list(today_data["Time"])
-        changed_times = list(today_data.index)
-        temp_row = row
-        changed_times_iter = iter(changed_times)
-        next_match = next(changed_times_iter, None)
-        first_time_list_time = time_list[0] if isinstance(time_list[0], datetime.time) else datetime.datetime.strptime(
-            time_list[0], "%H:%M:%S").time()
-        while next_match:
-            next_match_time = datetime.datetime.strptime(next_match, "%H:%M:%S").time() if isinstance(next_match,
-                                                                                                      str) else next_match
-            if next_match_time >= first_time_list_time:
-                break
-            next_match = next(changed_times_iter, None)
-
-        for i in time_list:
-            if next_match and str(i) == next_match:
-                if str(i) in today_data.index:
-                    temp_row = np.array(today_data.loc[str(i)])[-4:]
-                next_match = next(changed_times_iter, None)
-            day_detail.loc[i] = temp_row
-        return day_detail
-
-    def preparing_structure(data: pd.DataFrame, dates: list, time_list: list) -> pd.DataFrame:
-        """
-        Prepare the structured DataFrame from processed data.
-        """
-        data["J-Date"] = data["J-Date"].astype(str)
-        data["Time"] = data["Time"].astype(str)
-        column = []
-        for i in dates:
-            column.append(generate_daily_data(i, data, time_list))
-        df = pd.concat(column, axis=1)
-        df.columns = dates
-        return df
-
-    def process_single_stock(stock_name: str, market_type: str, time_list: list) -> pd.DataFrame:
-        """
-        Process a single stock's data: download, edit, structure, and save.
-        """
-
-        while True:
-            print(f"Start downloading data for {market_type}: {stock_name}")
-            data = tse.Get_IntradayOB_History(
-                stock=stock_name,
-                start_date=start_date,
-                end_date=end_date,
-                jalali_date=True,
-                combined_datatime=False,
-                show_progress=True
-            )
-            print("Downloading data finished.")
-
-            # Process the data
-            data = editing_data(data)
-            datapirim = preparing_structure(data, list(data["J-Date"].unique()), time_list)
-
-            # Check if all data is null
-            all_null_data = True
-            for date in tqdm(datapirim.columns, desc=f"Processing {market_type} Data", total=datapirim.shape[1]):
-                for time, underlying_data in datapirim[date].items():
-                    if not (np.isnan(underlying_data[1]) and np.isnan(underlying_data[2])):
-                        all_null_data = False
-                        break
-                if not all_null_data:
-                    break
-
-            # Retry if data is all null
-            if all_null_data:
-                print(f"Everything null for {market_type} ({stock_name}). Retrying data retrieval...")
-            else:
-                break
-
-        return datapirim
-
     # ----------------- Main Processing -----------------
 
-    # Generate the list of times between 09:15:00 and 12:30:00 with 1-second intervals
     start_time = get_config().VALID_TIME_START
     end_time = get_config().VALID_TIME_END
-    delta = datetime.timedelta(seconds=1)
-    time_list = []
-    current = start_time
-    while current <= end_time:
-        time_list.append(current)
-        current = (datetime.datetime.combine(datetime.date.min, current) + delta).time()
+    time_list = valid_time_list()
 
-    # Step 1: Process and save underlying and option data
-    underlying_data = process_single_stock(underlying_stock, "Underlying Market", time_list)
-    option_data = process_single_stock(option_stock, "Options Market", time_list)
+    # Step 1: Process underlying and option data; the underlying may come from an UnderlyingHistoryCache
+    if underlying_data is None:
+        underlying_data = download_market_data(underlying_stock, "Underlying Market", start_date, end_date, time_list)
+    option_data = download_market_data(option_stock, "Options Market", start_date, end_date, time_list)
 
     flattened_data = {
         "Date": [],
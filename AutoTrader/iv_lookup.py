@@ -0,0 +1,251 @@
+# iv_lookup.py
+
+import threading
+
+import numpy as np
+from scipy.special import ndtr
+
+from config import get_config
+from pricing import (
+    implied_volatility_batch, _as_call_mask, _broadcast_inputs,
+    IV_OK, IV_INVALID_INPUT, IV_BELOW_INTRINSIC, IV_ABOVE_MAXIMUM
+)
+
+
+class IVLookupTable:
+    """
+    Precomputed implied-volatility inversion table with an exact fallback.
+
+    Any Black price can be reduced to an out-of-the-money price normalized by the forward (calls) or strike
+    (puts), which only depends on x = -|ln(F / K)| and the total volatility w = sigma * sqrt(T):
+
+        c(x, w) = N(x / w + w / 2) - exp(-x) * N(x / w - w / 2)
+
+    The table stores ln c(x, w) on a regular 2-D grid. A lookup interpolates w between the two neighbouring x rows
+    (one np.searchsorted over all rows, then linear interpolation in ln c), then takes two Newton steps on ln c of
+    the exact formula, which converge far better than steps on c for out-of-the-money prices. Elements whose last
+    step exceeds tolerance * w, whose normalized price is below exp(MIN_LOG_PRICE) (where c has lost its precision
+    and the table is too coarse), or that fall outside the grid are solved with the exact solver
+    (pricing.implied_volatility_batch).
+    """
+
+    MIN_LOG_PRICE = -20.0
+
+    def __init__(self, max_log_moneyness=2.0, max_total_vol=4.0, moneyness_points=201, vol_points=400,
+                 tolerance=1e-4):
+        """
+        Args:
+            max_log_moneyness (float): Largest |ln(F / K)| covered by the grid.
+            max_total_vol (float): Largest total volatility sigma * sqrt(T) covered by the grid.
+            moneyness_points (int): Number of grid rows in x.
+            vol_points (int): Number of grid columns in w.
+            tolerance (float): Largest relative last Newton step accepted before falling back to the exact solver.
+        """
+        self.tolerance = tolerance
+        self.x_grid = np.linspace(-max_log_moneyness, 0.0, moneyness_points)
+        self.w_grid = np.linspace(max_total_vol / vol_points, max_total_vol, vol_points)
+
+        x, w = np.meshgrid(self.x_grid, self.w_grid, indexing='ij')
+        with np.errstate(divide='ignore'):
+            self.log_price_table = np.log(_normalized_otm_price(x, w))
+        # Deep out-of-the-money prices underflow at small w; keep each row strictly increasing.
+        self.log_price_table = np.maximum.accumulate(
+            np.where(np.isfinite(self.log_price_table), self.log_price_table, -np.inf), axis=1)
+        # Row r is mapped monotonically into [r, r + 1), so a single sorted array serves every row's search.
+        self._search_keys = (np.arange(moneyness_points)[:, None] + self._search_offset(self.log_price_table)).ravel()
+
+    @staticmethod
+    def _search_offset(log_price):
+        """
+        Monotone map from ln c in (-inf, 0) into [0, 1).
+        """
+        return np.exp(log_price / 64.0)
+
+    def implied_volatility(self, price, S, K, T, r, call_put, counters=None):
+        """
+        Implied volatility for arrays of option prices; same arguments and return values as
+        pricing.implied_volatility_batch.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Implied volatilities (NaN on failure) and failure-reason codes.
+        """
+        price, S, K, T, r = _broadcast_inputs(price, S, K, T, r)
+        is_call = _as_call_mask(call_put, S.shape)
+
+        iv = np.full(S.shape, np.nan)
+        codes = np.full(S.shape, IV_INVALID_INPUT, dtype=np.int8)
+        valid = (T > 0) & (S > 0) & (K > 0) & (price > 0) & np.isfinite(r)
+
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            growth = np.exp(r * T)
+            forward = S * growth
+            log_moneyness = np.log(forward / K)
+            # Convert in-the-money options to the out-of-the-money side with put-call parity.
+            call_price = np.where(is_call, price * growth, price * growth + forward - K)
+            put_price = call_price - forward + K
+            otm_price = np.where(log_moneyness <= 0, call_price / forward, put_price / K)
+            intrinsic = np.where(is_call, np.maximum(forward - K, 0.0), np.maximum(K - forward, 0.0))
+            maximum = np.where(is_call, forward, K)
+
+        codes[valid & (price * growth <= intrinsic)] = IV_BELOW_INTRINSIC
+        codes[valid & (price * growth >= maximum)] = IV_ABOVE_MAXIMUM
+        solve = valid & (codes == IV_INVALID_INPUT)
+
+        x = -np.abs(log_moneyness)
+        in_grid = solve & (x >= self.x_grid[0]) & (otm_price > np.exp(self.MIN_LOG_PRICE)) & (otm_price < 1)
+        w = np.full(S.shape, np.nan)
+        if in_grid.any():
+            w[in_grid] = self._lookup(x[in_grid], np.log(otm_price[in_grid]))
+
+        accepted = in_grid & np.isfinite(w)
+        iv[accepted] = w[accepted] / np.sqrt(T[accepted])
+        codes[accepted] = IV_OK
+
+        fallback = solve & ~accepted
+        if fallback.any():
+            exact_iv, exact_codes = implied_volatility_batch(
+                price[fallback], S[fallback], K[fallback], T[fallback], r[fallback], is_call[fallback])
+            iv[fallback] = exact_iv
+            codes[fallback] = exact_codes
+
+        if counters is not None:
+            counters.try_except_counter += int(np.count_nonzero(codes != IV_OK))
+        return iv, codes
+
+    def _lookup(self, x, log_price):
+        """
+        Interpolate and polish total volatility; NaN where the error bound is exceeded or the price is off-grid.
+        """
+        spacing = self.x_grid[1] - self.x_grid[0]
+        position = np.clip((x - self.x_grid[0]) / spacing, 0, len(self.x_grid) - 1)
+        row = np.minimum(position.astype(int), len(self.x_grid) - 2)
+        weight = position - row
+
+        w_low = self._invert_row(row, log_price)
+        w_high = self._invert_row(row + 1, log_price)
+        w = (1.0 - weight) * w_low + weight * w_high
+
+        # Two Newton steps on ln c; the size of the last one bounds the remaining error.
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            for _ in range(2):
+                model_price = _normalized_otm_price(x, w)
+                vega = np.exp(-0.5 * (x / w + 0.5 * w) ** 2) / np.sqrt(2.0 * np.pi)
+                step = (np.log(model_price) - log_price) * model_price / vega
+                w = w - step
+        ok = np.isfinite(w) & (w > 0) & (np.abs(step) <= self.tolerance * w)
+        return np.where(ok, w, np.nan)
+
+    def _invert_row(self, row, log_price):
+        """
+        Locate log_price inside each element's grid row, then interpolate linearly in w.
+        """
+        table = self.log_price_table
+        columns = table.shape[1]
+        below = log_price < table[row, 0]
+        above = log_price > table[row, -1]
+
+        position = np.searchsorted(self._search_keys, row + self._search_offset(log_price), side='right')
+        hi = np.clip(position - row * columns, 1, columns - 1)
+        lo = hi - 1
+
+        left_value = table[row, lo]
+        right_value = table[row, hi]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.clip((log_price - left_value) / (right_value - left_value), 0.0, 1.0)
+        w = self.w_grid[lo] + t * (self.w_grid[hi] - self.w_grid[lo])
+        return np.where(below | above, np.nan, w)
+
+
+def _normalized_otm_price(x, w):
+    """
+    Out-of-the-money Black price normalized by the forward (x = ln(F / K) <= 0).
+    """
+    return ndtr(x / w + 0.5 * w) - np.exp(-x) * ndtr(x / w - 0.5 * w)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_iv_lookup_table() -> IVLookupTable:
+    """
+    Return the shared lookup table, building it on first use.
+    """
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = IVLookupTable(tolerance=get_config().IV_LOOKUP_TOLERANCE)
+    return _table
+
+
+def implied_volatility_lookup(price, S, K, T, r, call_put, counters=None):
+    """
+    Implied volatility through the shared lookup table; same arguments and return values as
+    pricing.implied_volatility_batch.
+    """
+    return get_iv_lookup_table().implied_volatility(price, S, K, T, r, call_put, counters)
+
+
+if __name__ == "__main__":
+    # Benchmark the lookup path against py_vollib and the exact batch solver.
+    import time
+    import warnings
+
+    from py_vollib.black_scholes.implied_volatility import implied_volatility as vollib_implied_volatility
+    from pricing import black_scholes_price_batch
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    rng = np.random.default_rng(0)
+    size = 20_000
+    S = rng.uniform(800, 1200, size)
+    K = rng.uniform(700, 1300, size)
+    T = rng.uniform(5, 250, size) / 365
+    sigma = rng.uniform(0.1, 1.5, size)
+    call_put = np.where(rng.random(size) < 0.5, 'c', 'p')
+    r = get_config().RISK_FREE_RATE
+    prices = black_scholes_price_batch(S, K, T, r, sigma, call_put)
+
+    start = time.perf_counter()
+    table = get_iv_lookup_table()
+    print(f"Table build: {time.perf_counter() - start:.3f} s")
+
+    def best_time(solver, repeats=5):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = solver(prices, S, K, T, r, call_put)
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    lookup_time, (lookup_iv, lookup_codes) = best_time(implied_volatility_lookup)
+    exact_time, (exact_iv, _) = best_time(implied_volatility_batch)
+
+    start = time.perf_counter()
+    vollib_iv = np.full(size, np.nan)
+    for i in range(size):
+        try:
+            vollib_iv[i] = vollib_implied_volatility(prices[i], S[i], K[i], T[i], r, call_put[i])
+        except Exception:
+            pass
+    vollib_time = time.perf_counter() - start
+
+    both = np.isfinite(lookup_iv) & np.isfinite(vollib_iv)
+    print(f"py_vollib loop: {vollib_time:.3f} s")
+    print(f"Exact batch:    {exact_time:.3f} s ({vollib_time / exact_time:.0f}x)")
+    print(f"Lookup:         {lookup_time:.3f} s ({vollib_time / lookup_time:.0f}x, "
+          f"{exact_time / lookup_time:.2f}x the exact batch)")
+    error = np.abs(lookup_iv[both] - vollib_iv[both])
+    print(f"|lookup - py_vollib|: median {np.median(error):.2e}, p99 {np.percentile(error, 99):.2e}, "
+          f"max {np.max(error):.2e}")
+    both = np.isfinite(exact_iv) & np.isfinite(vollib_iv)
+    print(f"|exact batch - py_vollib|: max {np.max(np.abs(exact_iv[both] - vollib_iv[both])):.2e} "
+          f"(deep in-the-money prices barely above intrinsic are ill-conditioned for every solver)")
+    exact_error = np.abs(lookup_iv - exact_iv)[np.isfinite(lookup_iv) & np.isfinite(exact_iv) & (prices > 1e-3)]
+    print(f"|lookup - exact batch| (price > 0.001): max {np.max(exact_error):.2e}")
+    solved = np.isfinite(lookup_iv)
+    repriced = black_scholes_price_batch(S[solved], K[solved], T[solved], r, lookup_iv[solved], call_put[solved])
+    print(f"Lookup repricing error: max {np.max(np.abs(repriced - prices[solved])):.2e}")
+    print(f"Failures: lookup {np.count_nonzero(lookup_codes != IV_OK)}, "
+          f"py_vollib {np.count_nonzero(np.isnan(vollib_iv))}")
@@ -0,0 +1,130 @@
+# iv_solver.py
+
+import math
+
+import numpy as np
+
+from helpers import calculate_implied_volatility
+
+
+def _norm_cdf(x):
+    return 0.5 * math.erfc(-x / math.sqrt(2.0))
+
+
+def _norm_pdf(x):
+    return math.exp(-0.5 * x * x) / math.sqrt(2.0 * math.pi)
+
+
+class IncrementalIVSolver:
+    """
+    Warm-started implied-volatility solver for the live tick stream of a single instrument.
+
+    Between consecutive seconds the option and underlying mids usually move by one tick or not at all, so the
+    previous tick's implied volatility is an excellent Newton starting point and the solve converges in one or two
+    iterations. When there is no previous value, or Newton does not converge within max_iterations, the exact
+    solver (calculate_implied_volatility) is used instead.
+
+    Iteration and fallback counts are reported through ErrorCounters (iv_solve_counter, iv_iteration_counter and
+    iv_fallback_counter). Ticks with the same inputs as the previous one reuse its result and are counted in
+    iv_cache_hit_counter instead.
+    """
+
+    def __init__(self, strike_price, risk_free_rate, call_put, counters, max_iterations=3, tolerance=1e-6):
+        """
+        Args:
+            strike_price (float): Strike price of the option.
+            risk_free_rate (float): Risk-free interest rate.
+            call_put (str): Option type ('c' for call, 'p' for put').
+            counters (ErrorCounters): An instance of the ErrorCounters class.
+            max_iterations (int): Newton iterations allowed before falling back to the exact solver.
+            tolerance (float): Convergence tolerance on the Newton step. Newton converges quadratically, so the
+                error left after a step of this size is of the order of its square.
+        """
+        self.strike_price = strike_price
+        self.risk_free_rate = risk_free_rate
+        self.call_put = call_put
+        self.counters = counters
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+
+        self.last_iv = np.nan
+        self._last_inputs = None
+
+    def seed(self, implied_vol):
+        """
+        Set the starting point for the next solve, e.g. the last implied volatility of the historical warm-up.
+
+        Args:
+            implied_vol (float): Implied volatility to start from. NaN clears the warm start.
+        """
+        self.last_iv = implied_vol if implied_vol is not None else np.nan
+        self._last_inputs = None
+
+    def solve(self, avg_price_option, avg_price_underlying, time_to_expiration):
+        """
+        Calculate implied volatility for the current tick, starting from the previous tick's value.
+
+        Args:
+            avg_price_option (float): Average price of the option.
+            avg_price_underlying (float): Average price of the underlying asset.
+            time_to_expiration (float): Time to expiration in years.
+
+        Returns:
+            float: The implied volatility, or NaN if it could not be calculated.
+        """
+        inputs = (avg_price_option, avg_price_underlying, time_to_expiration)
+        if inputs == self._last_inputs:
+            self.counters.iv_cache_hit_counter += 1
+            return self.last_iv
+
+        self.counters.iv_solve_counter += 1
+
+        iv = np.nan
+        if not np.isnan(self.last_iv) and self.last_iv > 0:
+            iv = self._newton(avg_price_option, avg_price_underlying, time_to_expiration, self.last_iv)
+
+        if np.isnan(iv):
+            self.counters.iv_fallback_counter += 1
+            iv = calculate_implied_volatility(
+                avg_price_option, avg_price_underlying, time_to_expiration, self.strike_price,
+                self.risk_free_rate, self.call_put, self.counters
+            )
+
+        self.last_iv = iv
+        self._last_inputs = inputs if not np.isnan(iv) else None
+        return iv
+
+    def _newton(self, price, S, T, sigma):
+        """
+        Run a few Newton iterations from sigma. Returns NaN if they do not converge.
+        """
+        K = self.strike_price
+        r = self.risk_free_rate
+        if T <= 0 or S <= 0 or K <= 0 or price <= 0:
+            return np.nan
+
+        sqrt_t = math.sqrt(T)
+        discounted_strike = K * math.exp(-r * T)
+        log_moneyness = math.log(S / K)
+
+        for iteration in range(1, self.max_iterations + 1):
+            self.counters.iv_iteration_counter += 1
+            sigma_sqrt_t = sigma * sqrt_t
+            d1 = (log_moneyness + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_t
+            d2 = d1 - sigma_sqrt_t
+            if self.call_put == 'c':
+                model_price = S * _norm_cdf(d1) - discounted_strike * _norm_cdf(d2)
+            else:
+                model_price = discounted_strike * _norm_cdf(-d2) - S * _norm_cdf(-d1)
+
+            vega = S * _norm_pdf(d1) * sqrt_t
+            if vega <= 0:
+                return np.nan
+
+            step = (model_price - price) / vega
+            sigma -= step
+            if sigma <= 0 or not math.isfinite(sigma):
+                return np.nan
+            if abs(step) <= self.tolerance:
+                return sigma
+        return np.nan
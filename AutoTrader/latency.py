@@ -0,0 +1,190 @@
+# latency.py
+
+import json
+import os
+import time
+from threading import Lock
+
+import numpy as np
+
+LATENCY_FOLDER = "latency_files"
+
+# Log-linear buckets as in HdrHistogram: 2**SUB_BUCKET_BITS exact buckets, then 2**(SUB_BUCKET_BITS - 1) buckets per
+# power of two, so every recorded value is within 1 / 2**(SUB_BUCKET_BITS - 1) (about 1.6%) of its bucket.
+SUB_BUCKET_BITS = 7
+MAX_VALUE_BITS = 40  # microseconds, about 12 days
+
+# Stages of a tick, in pipeline order.
+STAGES = (
+    "fetch",  # fetch start until the tick is queued (all legs received or the deadline passed)
+    "data_queue",  # waiting in data_queue
+    "staleness",  # fetch start until processing started: age of the prices the tick is priced on
+    "processing",  # pricing and signal generation
+    "signal_queue",  # waiting in signal_queue
+    "order",  # signal handling until the order call returned
+    "tick_to_order",  # fetch start until the order call returned
+)
+
+
+def _bucket_index(value):
+    if value < (1 << SUB_BUCKET_BITS):
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return (shift << (SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+
+def _bucket_value(index):
+    """
+    Middle of a bucket.
+    """
+    if index < (1 << SUB_BUCKET_BITS):
+        return index
+    shift = (index >> (SUB_BUCKET_BITS - 1)) - 1
+    lowest = (index - (shift << (SUB_BUCKET_BITS - 1))) << shift
+    return lowest + ((1 << shift) - 1) / 2
+
+
+class LatencyHistogram:
+    """
+    Fixed-size histogram of durations with HdrHistogram-style log-linear buckets.
+
+    Recording costs O(1) and the memory does not grow with the number of samples. Percentiles are accurate to
+    about 1.6%; the maximum is exact. Safe to record from one thread while another reads.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(_bucket_index((1 << MAX_VALUE_BITS) - 1) + 1, dtype=np.int64)
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+        self._lock = Lock()
+
+    def record(self, seconds):
+        """
+        Add a duration.
+
+        Args:
+            seconds (float): Duration in seconds; negative values are recorded as 0.
+        """
+        value = min(max(int(seconds * 1e6), 0), (1 << MAX_VALUE_BITS) - 1)
+        with self._lock:
+            self.counts[_bucket_index(value)] += 1
+            self.total += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, percent) -> float:
+        """
+        Duration in seconds below which percent of the samples fall, NaN if there are none.
+        """
+        with self._lock:
+            if self.total == 0:
+                return np.nan
+            rank = max(1, int(np.ceil(percent / 100 * self.total)))
+            index = int(np.searchsorted(np.cumsum(self.counts), rank))
+            return min(_bucket_value(index), self.max) / 1e6
+
+    def summary(self) -> dict:
+        """
+        Sample count, mean, p50, p95, p99 and max, durations in milliseconds.
+        """
+        if self.total == 0:
+            return {"count": 0}
+        return {
+            "count": self.total,
+            "mean_ms": self.sum / self.total / 1e3,
+            "p50_ms": self.percentile(50) * 1e3,
+            "p95_ms": self.percentile(95) * 1e3,
+            "p99_ms": self.percentile(99) * 1e3,
+            "max_ms": self.max / 1e3,
+        }
+
+
+class LatencyStats:
+    """
+    One LatencyHistogram per tick stage (see STAGES), fed from the monotonic stamps a Tick collects on its way
+    through the pipeline.
+    """
+
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self._last_dump = time.monotonic()
+
+    def record(self, stage, seconds):
+        self.histograms[stage].record(seconds)
+
+    def record_tick(self, tick):
+        """
+        Record the fetch, data_queue, staleness and processing stages of a processed tick.
+
+        Args:
+            tick (market_feed.Tick): Tick with fetch_started, queued, dequeued and processed set.
+        """
+        if tick.fetch_started is not None and tick.queued is not None:
+            self.record("fetch", tick.queued - tick.fetch_started)
+        if tick.queued is not None and tick.dequeued is not None:
+            self.record("data_queue", tick.dequeued - tick.queued)
+        if tick.fetch_started is not None and tick.dequeued is not None:
+            self.record("staleness", tick.dequeued - tick.fetch_started)
+        if tick.dequeued is not None and tick.processed is not None:
+            self.record("processing", tick.processed - tick.dequeued)
+
+    def record_order(self, tick, picked_up, done):
+        """
+        Record the signal stages of a tick whose signal was handled.
+
+        Args:
+            tick (market_feed.Tick): The processed tick.
+            picked_up (float): time.monotonic() at which the signal handler took the signal.
+            done (float): time.monotonic() at which the order call returned.
+        """
+        if tick.processed is not None:
+            self.record("signal_queue", picked_up - tick.processed)
+        self.record("order", done - picked_up)
+        if tick.fetch_started is not None:
+            self.record("tick_to_order", done - tick.fetch_started)
+
+    def summary(self) -> dict:
+        return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def report(self):
+        """
+        Print p50/p95/p99/max per stage.
+        """
+        for stage, summary in self.summary().items():
+            if summary["count"]:
+                print(f"INFO: Latency {stage}: p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, "
+                      f"p99 {summary['p99_ms']:.1f} ms, max {summary['max_ms']:.1f} ms "
+                      f"({summary['count']} samples)")
+
+    def dump(self, path):
+        """
+        Write the summary to a JSON file, replacing it atomically so it can be read while the process runs.
+        """
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({"updated": time.strftime("%Y-%m-%d %H:%M:%S"), "stages": self.summary()}, f, indent=2)
+        os.replace(temporary_path, path)
+
+    def maybe_dump(self, path, interval):
+        """
+        dump() if at least interval seconds passed since the last one. An interval of 0 disables it.
+        """
+        now = time.monotonic()
+        if interval and now - self._last_dump >= interval:
+            self._last_dump = now
+            try:
+                self.dump(path)
+            except OSError as e:
+                print(f"ERROR: Could not write latency file {path}: {e}")
+
+
+def latency_file_path(option_ticker):
+    """
+    Path of the live latency summary of an option.
+    """
+    return os.path.join(LATENCY_FOLDER, f"{option_ticker}_latency.json")
@@ -3,13 +3,17 @@
 import time
 import jdatetime
 from threading import Thread, Event
-from collections import deque
+from channels import TickQueue, tick_handoff
 import pandas as pd
 
 from config import get_config
 from signal_handling import signal_handling_thread
-from trading_api import TradingAPI
+from trading_api import get_trading_api, close_sessions
 from error_counters import ErrorCounters
+from rolling_window import RollingWindow, RobustRollingWindow
+from volatility_estimators import create_volatility_estimator
+from state_store import (state_file_path, load_state, restore_windows, signal_counts, advance_signal_counts,
+                         StateSnapshotter)
 from data_fetching import data_fetching_thread
 from data_processing import processing_thread
 from result_handling import result_handling_thread
@@ -26,28 +30,59 @@ import warnings
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-
-def main():
+RESULT_COLUMNS = [
+    "Date", "Time", "avg_price_underlying", "avg_price_option",
+    "black_scholes_price", "implied_vol", "estimated_vol",
+    "price_difference", "rolling_mean_diff", "rolling_std_diff", "z_score",
+    "signal", "delta", "net_worth", "can_trade_same_dir", "risk", "under_negative_one_count",
+    "over_positive_one_count"
+]
+
+
+def parse_arguments():
+    """
+    Parses the command line of a single-instrument run, or of supervisor mode (--mode supervisor) and process
+    pool mode (--mode pool), which run every instrument of the today-running table and need no instrument
+    arguments.
+    """
     parser = argparse.ArgumentParser(description="Run the script with a specific configuration mode.")
 
-    # Required arguments
+    # Required arguments (the instrument arguments are not used in supervisor and pool mode)
     parser.add_argument('--mode', type=str, required=True, help="Mode to run the script in.")
-    parser.add_argument('--underlying_name', type=str, required=True, help="Name of the underlying.")
-    parser.add_argument('--underlying_ticker', type=str, required=True, help="Ticker of the underlying.")
-    parser.add_argument('--option_name', type=str, required=True, help="Name of the option.")
-    parser.add_argument('--option_ticker', type=str, required=True, help="Ticker of the option.")
-    parser.add_argument('--expiration_date', type=str, required=True,
+    parser.add_argument('--underlying_name', type=str, help="Name of the underlying.")
+    parser.add_argument('--underlying_ticker', type=str, help="Ticker of the underlying.")
+    parser.add_argument('--option_name', type=str, help="Name of the option.")
+    parser.add_argument('--option_ticker', type=str, help="Ticker of the option.")
+    parser.add_argument('--expiration_date', type=str,
                         help="Expiration date of the option (YYYY-MM-DD).")
-    parser.add_argument('--strike_price', type=float, required=True, help="Strike price of the option.")
-    parser.add_argument('--call_put', type=str, choices=['c', 'p'], required=True,
+    parser.add_argument('--strike_price', type=float, help="Strike price of the option.")
+    parser.add_argument('--call_put', type=str, choices=['c', 'p'],
                         help="Option type (CALL or PUT).")
 
     # Optional flag
     parser.add_argument('--can_trade_in_same_direction', action='store_true',
                         help="Allow trading in the same direction.")
 
-    args = parser.parse_args()  # Parse arguments
+    # Supervisor and pool mode
+    parser.add_argument('--today_running', type=str,
+                        help="Today-running table for --mode supervisor/pool (default: the newest one).")
+    parser.add_argument('--workers', type=int,
+                        help="Worker processes for --mode pool (default: config.POOL_WORKERS).")
 
+    args = parser.parse_args()  # Parse arguments
+    if args.mode not in ('supervisor', 'pool'):
+        instrument_arguments = ['underlying_name', 'underlying_ticker', 'option_name', 'option_ticker',
+                                'expiration_date', 'strike_price', 'call_put']
+        missing = [f"--{name}" for name in instrument_arguments if getattr(args, name) is None]
+        if missing:
+            parser.error(f"the following arguments are required: {', '.join(missing)}")
+    return args
+
+
+def configure(args):
+    """
+    Applies the parsed arguments to the config and returns it.
+    """
     print(f"Mode: {args.mode}")
     print(f"Underlying Name: {args.underlying_name}")
     print(f"Underlying Ticker: {args.underlying_ticker}")
@@ -82,27 +117,61 @@ def main():
           f"Strike Price: {config.STRIKE_PRICE}\n"
           f"Call/Put: {config.CALL_PUT}\n"
           f"Can Trade in Same Direction: {config.CAN_TRADE_IN_SAME_DIRECTION}")
+    return config
 
-    api = TradingAPI()
+
+def create_rolling_state(config):
+    """
+    Builds the volatility estimator and price difference window, restoring the previous run's snapshot if any.
+
+    Returns:
+        Tuple: rolling_vols, price_diff_window, snapshotter, restored_state and resume_after.
+    """
+    rolling_vols = create_volatility_estimator(
+        config.VOLATILITY_ESTIMATOR, config.SMOOTHING_PARAM)  # ye size az inke volatility ro cheghad ghabl tar takhmin bezanim
+    window_class = RobustRollingWindow if config.Z_SCORE_MODE == 'median_mad' else RollingWindow
+    price_diff_window = window_class(
+        maxlen=config.WINDOW_SIZE)  # size panjere i ke farz mikonim price dif haye in size az N(?,?) miad
+
+    # Restore the rolling state of the previous run, so only the gap since its snapshot needs backfilling
+    snapshotter = None
+    restored_state = None
+    resume_after = None
+    if config.USE_STATE_SNAPSHOT:
+        snapshot_path = state_file_path(config.OPTION_TICKER)
+        restored_state = load_state(snapshot_path, config)
+        if restored_state is not None:
+            restore_windows(restored_state, rolling_vols, price_diff_window)
+            resume_after = f"{restored_state['last_date']} {restored_state['last_time']}"
+            config.HISTORICAL_DATA_START_DATE = restored_state["last_date"]
+            print(f"INFO: Restored rolling state from {snapshot_path} (last tick {resume_after}).")
+        snapshotter = StateSnapshotter(snapshot_path, config.STATE_SNAPSHOT_INTERVAL)
+    return rolling_vols, price_diff_window, snapshotter, restored_state, resume_after
+
+
+def main():
+    args = parse_arguments()
+    if args.mode == 'supervisor':
+        from supervisor import run_supervisor  # supervisor imports this module
+        run_supervisor(args.today_running)
+        return
+    if args.mode == 'pool':
+        from worker_pool import run_worker_pool  # worker_pool imports this module
+        run_worker_pool(args.today_running, args.workers)
+        return
+    config = configure(args)
+
+    api = get_trading_api()
     counters = ErrorCounters()
 
-    columns = [
-        "Date", "Time", "avg_price_underlying", "avg_price_option",
-        "black_scholes_price", "implied_vol", "estimated_vol",
-        "price_difference", "rolling_mean_diff", "rolling_std_diff", "z_score",
-        "signal", "delta", "net_worth", "can_trade_same_dir", "risk", "under_negative_one_count",
-        "over_positive_one_count"
-    ]
+    columns = RESULT_COLUMNS
     data = pd.DataFrame(columns=columns)  # kole data inja bayad bashe ta akhare code amalan
 
-    rolling_vols = deque(
-        maxlen=config.SMOOTHING_PARAM)  # ye size az inke volatility ro cheghad ghabl tar takhmin bezanim
-    price_diff_window = deque(
-        maxlen=config.WINDOW_SIZE)  # size panjere i ke farz mikonim price dif haye in size az N(?,?) miad
+    rolling_vols, price_diff_window, snapshotter, restored_state, resume_after = create_rolling_state(config)
 
-    data_queue = deque(maxlen=config.MAX_SIZE)  # data fetch mishe mire too in
-    result_queue = deque()  # khorooji ha mire too in bad az process shodan
-    signal_queue = deque(maxlen=config.MAX_SIZE)  # signal generate shode miad inja
+    data_queue = tick_handoff(config)  # data fetch mishe mire too in
+    result_queue = TickQueue()  # khorooji ha mire too in bad az process shodan
+    signal_queue = TickQueue(maxlen=config.MAX_SIZE)  # signal generate shode miad inja
 
     processing_ready_event = Event()  # in event miad ke process shorou beshavad ya na
     stop_event = Event()  # <-- Stop event for graceful shutdown
@@ -129,11 +198,11 @@ def main():
     # Start processing thread
     processing_thread_instance = Thread(target=processing_thread, args=(
         data_queue, result_queue, signal_queue, counters, processing_ready_event,
-        rolling_vols, price_diff_window, stop_event))
+        rolling_vols, price_diff_window, stop_event, snapshotter, restored_state))
     processing_thread_instance.start()
 
     # Start signal handling thread
-    signal_thread = Thread(target=signal_handling_thread, args=(signal_queue, stop_event))
+    signal_thread = Thread(target=signal_handling_thread, args=(signal_queue, stop_event, None, api, counters))
     signal_thread.start()
 
     # Start the net worth monitoring thread
@@ -163,10 +232,15 @@ def main():
         while not stop_event.is_set():
             if config.USE_HISTORICAL:
                 if historical_data_ready_event.is_set() and not historical_data_merged:
-                    data = merge_historical_and_live_data(
+                    # processing_ready_event is set below, once the restored counters include the backfill
+                    merged = merge_historical_and_live_data(
                         data_queue, historical_data_container, columns,
-                        rolling_vols, price_diff_window, processing_ready_event, counters
+                        rolling_vols, price_diff_window, Event(), counters, resume_after,
+                        start_counts=signal_counts(restored_state)
                     )
+                    if merged is not None:
+                        data, under_negative_one_count, over_positive_one_count = merged
+                        advance_signal_counts(restored_state, under_negative_one_count, over_positive_one_count)
                     historical_data_merged = True
 
                     result_thread = Thread(target=result_handling_thread, args=(result_queue, data, stop_event))
@@ -202,6 +276,10 @@ def main():
 
     finally:
 
+        # Wake the workers blocked on their queues so they see stop_event right away
+        for queue in (data_queue, signal_queue, result_queue):
+            queue.close()
+
         net_worth_thread.join()
 
         print("INFO: Net worth monitoring thread has been terminated.")
@@ -229,6 +307,7 @@ def main():
         if config_syncing and config_syncing.is_alive():
             config_syncing.join()
 
+        close_sessions()
         counters.report()
         print("INFO: Program terminated gracefully.")
 
@@ -0,0 +1,284 @@
+# market_feed.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Lock
+
+import jdatetime
+import numpy as np
+
+from config import get_config
+from option_chain import OptionChain
+from scheduler import Scheduler
+
+
+class Tick:
+    """
+    One fetched tick of an option pipeline.
+
+    It unpacks, indexes and iterates like the (date, time, underlying_data, option_data) tuples the data queues
+    carried before, and adds the time.monotonic() at which each order book was received (None for a missing leg).
+    The pipeline stamps the time.monotonic() at which the fetch started, the tick was queued, taken from the queue
+    and processed; see latency.LatencyStats. implied_vol, and smile_vol for the 'smile' volatility estimator, are set
+    by a feed that prices its options as a chain (None otherwise), so the processor does not have to solve them
+    again.
+    """
+
+    __slots__ = ("date", "time", "underlying_data", "option_data", "underlying_received", "option_received",
+                 "fetch_started", "queued", "dequeued", "processed", "implied_vol", "smile_vol")
+
+    def __init__(self, date, time, underlying_data, option_data, underlying_received=None, option_received=None,
+                 fetch_started=None):
+        self.date = date
+        self.time = time
+        self.underlying_data = underlying_data
+        self.option_data = option_data
+        self.underlying_received = underlying_received
+        self.option_received = option_received
+        self.fetch_started = fetch_started
+        self.queued = None
+        self.dequeued = None
+        self.processed = None
+        self.implied_vol = None
+        self.smile_vol = None
+
+    @property
+    def skew(self) -> float:
+        """
+        Seconds between the receipt of the underlying and the option book, NaN if a leg is missing.
+        """
+        if self.underlying_received is None or self.option_received is None:
+            return np.nan
+        return abs(self.option_received - self.underlying_received)
+
+    def __iter__(self):
+        return iter((self.date, self.time, self.underlying_data, self.option_data))
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __len__(self):
+        return 4
+
+    def __repr__(self):
+        return f"Tick({self.date} {self.time}, underlying={self.underlying_data}, option={self.option_data})"
+
+
+class OrderBookFetcher:
+    """
+    Fetches several order books concurrently, waiting at most FETCH_TIMEOUT seconds per tick.
+
+    A leg that misses the deadline is returned as missing and its request is left running; the next fetch of the
+    same ticker waits for that request instead of sending another, so a slow endpoint never has more than one
+    request in flight per ticker. A late answer that arrives between two ticks is discarded as stale.
+
+    One fetcher may be shared by the feeds of all underlyings, which then fetch through one thread pool.
+    """
+
+    def __init__(self, api, timeout=None, max_workers=None):
+        """
+        Args:
+            api (TradingAPI): API used for the order books.
+            timeout (float, optional): Deadline per fetch in seconds, config.FETCH_TIMEOUT by default.
+            max_workers (int, optional): Concurrent requests, config.FETCH_WORKERS by default.
+        """
+        config = get_config()
+        self.api = api
+        self.timeout = config.FETCH_TIMEOUT if timeout is None else timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or config.FETCH_WORKERS,
+                                           thread_name_prefix="order-book")
+        self.in_flight = {}
+        self.late_legs = 0
+        self._lock = Lock()
+
+    def _request(self, ticker):
+        data = self.api.fetch_order_book(ticker)
+        return data, time.monotonic()
+
+    def fetch(self, tickers):
+        """
+        Fetch the order books of several tickers concurrently.
+
+        Args:
+            tickers (list): The ISIN ticker symbols.
+
+        Returns:
+            dict: (order book, receive time) per ticker; (None, None) for a leg that failed or missed the deadline.
+        """
+        futures = {}
+        for ticker in dict.fromkeys(tickers):
+            with self._lock:
+                future = self.in_flight.pop(ticker, None)
+            if future is None or future.done():
+                future = self.executor.submit(self._request, ticker)
+            futures[ticker] = future
+
+        wait(futures.values(), timeout=self.timeout)
+
+        books = {}
+        for ticker, future in futures.items():
+            if not future.done():
+                with self._lock:
+                    self.in_flight[ticker] = future
+                    self.late_legs += 1
+                books[ticker] = (None, None)
+            elif future.exception() is not None:
+                print(f"ERROR: Fetching the order book of {ticker} failed: {future.exception()}")
+                books[ticker] = (None, None)
+            else:
+                books[ticker] = future.result()
+        return books
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class UnderlyingFeed:
+    """
+    Order-book feed of one underlying and the options that depend on it.
+
+    Every tick fetches the underlying book once and the book of each subscribed option, all concurrently through
+    an OrderBookFetcher, and appends a Tick to each option's data queue, so all the options of a chain see the same
+    underlying snapshot under the same timestamp. The underlying is requested once per tick however many options
+    subscribe.
+
+    The options subscribed with their instrument config form an OptionChain, whose implied volatilities are solved
+    in one batch per tick and handed to the processors on the Ticks. With VOLATILITY_ESTIMATOR = 'smile' the chain
+    also fits the underlying's VolatilitySmile, and every option gets its estimated volatility from it.
+    """
+
+    def __init__(self, api, underlying_ticker, fetcher=None):
+        """
+        Args:
+            api (TradingAPI): API used for the order books.
+            underlying_ticker (str): The ISIN ticker symbol of the underlying.
+            fetcher (OrderBookFetcher, optional): Fetcher shared between feeds, which its owner closes; by default
+                the feed creates its own and underlying_feed_thread closes it.
+        """
+        self.api = api
+        self.underlying_ticker = underlying_ticker
+        self.owns_fetcher = fetcher is None
+        self.fetcher = OrderBookFetcher(api) if fetcher is None else fetcher
+        self.subscriptions = []
+        self.instruments = {}
+        self.chain = None
+
+    def subscribe(self, option_ticker, data_queue, instrument=None):
+        """
+        Publish the ticks of an option to a data queue.
+
+        Args:
+            option_ticker (str): The ISIN ticker symbol of the option.
+            data_queue (TickQueue): Queue of the option's processing thread.
+            instrument (optional): The option's instrument config (see the_config.for_instrument); adds the option
+                to the feed's OptionChain.
+        """
+        self.subscriptions.append((option_ticker, data_queue))
+        if instrument is not None:
+            self.instruments[option_ticker] = instrument
+            instruments = list(self.instruments.values())
+            self.chain = OptionChain(
+                list(self.instruments), [i.STRIKE_PRICE for i in instruments],
+                [i.EXPIRATION_DATE for i in instruments], [i.CALL_PUT for i in instruments],
+                risk_free_rate=instrument.RISK_FREE_RATE,
+                use_smile=any(i.VOLATILITY_ESTIMATOR == 'smile' for i in instruments))
+
+    def price_chain(self, books, current_date, current_time):
+        """
+        Implied volatility of every option of the chain for one tick, in one batch, and the smile's volatility.
+
+        Args:
+            books (dict): The OrderBookFetcher.fetch result of the tick.
+            current_date (str): Date of the tick in Jalali calendar (YYYY-MM-DD).
+            current_time (str): Time of the tick (HH:MM:SS).
+
+        Returns:
+            dict: (implied volatility, smile volatility) per option ticker. The implied volatility is NaN where it
+            could not be solved; the smile volatility is None for options not using the 'smile' estimator and NaN
+            before the smile's first fit. Empty if there is no chain or the underlying has no valid quote.
+        """
+        if self.chain is None:
+            return {}
+        underlying_price = _mid_price(books[self.underlying_ticker][0])
+        if np.isnan(underlying_price):
+            return {}
+        option_prices = [_mid_price(books[ticker][0]) for ticker in self.chain.option_tickers]
+        try:
+            T, implied_vols, _ = self.chain.implied_volatility(underlying_price, option_prices, current_date,
+                                                               current_time)
+            smile_vols = np.full(len(self.chain), np.nan)
+            if self.chain.smile is not None:
+                smile_vols = self.chain.smile_volatility(underlying_price, T, implied_vols)
+        except Exception as e:
+            print(f"ERROR: Pricing the option chain of {self.underlying_ticker} failed: {e}")
+            return {}
+        return {
+            ticker: (implied_vol, smile_vol if self.instruments[ticker].VOLATILITY_ESTIMATOR == 'smile' else None)
+            for ticker, implied_vol, smile_vol in zip(self.chain.option_tickers, implied_vols.tolist(),
+                                                      smile_vols.tolist())
+        }
+
+    def fetch(self, slot_time=None):
+        """
+        Fetch one tick and publish it to every subscriber.
+
+        Args:
+            slot_time (float, optional): Unix timestamp the tick is labelled with, the current time by default.
+        """
+        fetch_started = time.monotonic()
+        now = jdatetime.datetime.now() if slot_time is None else jdatetime.datetime.fromtimestamp(slot_time)
+        current_date = now.strftime("%Y-%m-%d")
+        current_time = now.strftime("%H:%M:%S")
+
+        books = self.fetcher.fetch([self.underlying_ticker] + [ticker for ticker, _ in self.subscriptions])
+        underlying_data, underlying_received = books[self.underlying_ticker]
+        chain_vols = self.price_chain(books, current_date, current_time)
+        for option_ticker, data_queue in self.subscriptions:
+            option_data, option_received = books[option_ticker]
+            if underlying_data is None and option_data is None:
+                print(f"Fetched data is null for {option_ticker}")
+            else:
+                tick = Tick(current_date, current_time, underlying_data, option_data, underlying_received,
+                            option_received, fetch_started)
+                tick.implied_vol, tick.smile_vol = chain_vols.get(option_ticker, (None, None))
+                tick.queued = time.monotonic()
+                data_queue.append(tick)
+
+    def __repr__(self):
+        return f"UnderlyingFeed({self.underlying_ticker}, options={[t for t, _ in self.subscriptions]})"
+
+
+def _mid_price(book):
+    """
+    Mid of an order book as validate_time_and_data computes it, NaN for a missing book or a zero price.
+    """
+    if not book or not book[1] or not book[2]:
+        return np.nan
+    return (book[1] + book[2]) / 2
+
+
+def underlying_feed_thread(feed, counters, stop_event):
+    """
+    Thread function fetching a feed every SLEEP_INTERVAL seconds on a Scheduler. A failed tick is counted and
+    skipped.
+    """
+    scheduler = Scheduler(get_config().SLEEP_INTERVAL)
+
+    try:
+        while True:
+            slot_time = scheduler.wait(stop_event)
+            if slot_time is None:
+                break
+            try:
+                feed.fetch(slot_time)
+            except Exception as e:
+                counters.try_except_counter += 1
+                print(f"ERROR: Exception in underlying_feed_thread ({feed.underlying_ticker}): {e}")
+    finally:
+        scheduler.report(f"underlying_feed_thread ({feed.underlying_ticker})")
+        if feed.owns_fetcher:
+            if feed.fetcher.late_legs:
+                print(f"WARNING: {feed.fetcher.late_legs} order books of {feed.underlying_ticker}'s feed missed the "
+                      f"fetch deadline.")
+            feed.fetcher.close()
+        print(f"INFO: underlying_feed_thread ({feed.underlying_ticker}) is shutting down gracefully.")
@@ -3,38 +3,39 @@
 import time
 from threading import Event
 
-from trading_api import TradingAPI
+from trading_api import get_trading_api
 from config import get_config
 
 
-def monitor_net_worth(stop_event: Event) -> None:
+def monitor_net_worth(stop_event: Event, configs=None, api=None) -> None:
     """
     Monitors the net worth balance every 5 seconds and updates config.NET_WORTH.
 
     This function is intended to be run in a separate thread. It continuously
-    creates an instance of TradingAPI and calls get_net_worth_balance at the
-    specified interval until the stop_event is set.
+    calls get_net_worth_balances at the specified interval until the stop_event
+    is set. One portfolio request serves all monitored instruments.
 
     Args:
         stop_event (Event): An event to signal the thread to stop gracefully.
+        configs (list, optional): Instrument configs to update (supervisor mode), defaults to the process config.
+        api (TradingAPI, optional): TradingAPI instance, the shared one (get_trading_api) by default.
     """
-    # Initialize the TradingAPI instance
-    api = TradingAPI()
-    # Retrieve the configuration instance
-    config = get_config()
+    api = get_trading_api() if api is None else api
+    # Retrieve the configuration instances
+    configs = [get_config()] if configs is None else configs
 
     print("[Net Worth Monitor] Started monitoring net worth balance.")
 
     while not stop_event.is_set():
         try:
-            # Fetch the current net worth balance
-            net_worth, vol = api.get_net_worth_balance()
+            # Fetch the current net worth balances
+            balances = api.get_net_worth_balances([config.OPTION_TICKER for config in configs])
             # manfi bashe foroosh mosbat bashe kharid
 
-            if net_worth is not None:
-                # Update the NET_WORTH in the configuration
-                config.NET_WORTH = net_worth
-                config.VOLUME = vol
+            if balances is not None:
+                # Update the NET_WORTH in the configurations
+                for config in configs:
+                    config.NET_WORTH, config.VOLUME = balances[config.OPTION_TICKER]
                 # print(f"[Net Worth Monitor] NET_WORTH updated to: {net_worth}")
             # else:
             # print("[Net Worth Monitor] Warning: NET_WORTH is None.")
@@ -0,0 +1,205 @@
+# option_chain.py
+
+import numpy as np
+import pandas as pd
+
+from config import get_config
+from pricing import implied_volatility_batch, black_scholes_greeks_batch
+from iv_lookup import implied_volatility_lookup
+from trading_calendar import time_to_expiration
+from volatility_smile import VolatilitySmile
+
+
+class OptionChain:
+    """
+    Prices every option of one underlying in a single vectorized step per tick.
+
+    The static contract data (strikes, expiries, call/put flags) is stored as arrays once. Each call to evaluate
+    takes the underlying mid and the array of option mids and returns implied volatility, model price, Greeks and
+    the price difference that feeds the z-score, for the whole chain at once.
+
+    Unless estimated volatilities are passed in, they come either from a VolatilitySmile fitted to the whole
+    chain (use_smile=True) or from each contract's simple moving average of its own past implied volatilities.
+    Both follow the same "estimate from past values only" contract as helpers.calculate_estimated_volatility.
+
+    In supervisor and worker-pool mode every UnderlyingFeed prices its options as a chain: implied_volatility solves
+    the chain of each live tick in one batch, and with VOLATILITY_ESTIMATOR = 'smile' smile_volatility gives every
+    contract its estimated volatility. The results travel to each option's TickProcessor on its Tick.
+    """
+
+    def __init__(self, option_tickers, strike_prices, expiration_dates, call_puts, risk_free_rate=None,
+                 smoothing_param=None, use_smile=False):
+        """
+        Args:
+            option_tickers (list): ISIN tickers of the options.
+            strike_prices (array-like): Strike prices.
+            expiration_dates (list): Expiration dates in Jalali calendar (YYYY-MM-DD).
+            call_puts (list): Option types ('c' for call, 'p' for put).
+            risk_free_rate (float, optional): Risk-free interest rate. Defaults to config.RISK_FREE_RATE.
+            smoothing_param (int, optional): SMA length for estimated volatility. Defaults to config.SMOOTHING_PARAM.
+            use_smile (bool): Estimate volatility from a smile fitted to the chain instead of per-contract SMAs.
+        """
+        config = get_config()
+        self.option_tickers = list(option_tickers)
+        self.strike_prices = np.asarray(strike_prices, dtype=float)
+        self.expiration_dates = np.asarray(expiration_dates, dtype=str)
+        self.call_puts = np.asarray(call_puts, dtype=str)
+        self.risk_free_rate = config.RISK_FREE_RATE if risk_free_rate is None else risk_free_rate
+        self.smoothing_param = config.SMOOTHING_PARAM if smoothing_param is None else smoothing_param
+
+        self.smile = VolatilitySmile() if use_smile else None
+
+        size = len(self.option_tickers)
+        # Per-contract SMA state, allocated by the first estimate_volatility call; not needed when the smile or the
+        # caller provides the estimates.
+        self._vol_buffer = None
+        self._vol_sum = np.zeros(size)
+        self._vol_count = np.zeros(size, dtype=int)
+        self._vol_position = np.zeros(size, dtype=int)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, **kwargs) -> "OptionChain":
+        """
+        Build a chain from a today-running style table (OPTION_TICKER, STRIKE_PRICE, EXPIRATION_DATE, CALL_PUT).
+
+        Args:
+            df (pd.DataFrame): Table with one row per option, e.g. the output of FIND_MARKETS.py.
+            **kwargs: Passed on to the constructor.
+
+        Returns:
+            OptionChain: The chain.
+        """
+        expiration_dates = df["EXPIRATION_DATE"].astype(str).str.replace("/", "-")
+        return cls(df["OPTION_TICKER"].tolist(), df["STRIKE_PRICE"].to_numpy(), expiration_dates.tolist(),
+                   df["CALL_PUT"].tolist(), **kwargs)
+
+    def __len__(self):
+        return len(self.option_tickers)
+
+    def time_to_expiration(self, current_date: str, current_time=None) -> np.ndarray:
+        """
+        Time to expiration in years for every contract. Each distinct expiry is looked up once.
+
+        Args:
+            current_date (str): Current date in Jalali calendar (YYYY-MM-DD).
+            current_time (datetime.time or str, optional): Current time of day.
+
+        Returns:
+            np.ndarray: Time to expiration per contract.
+        """
+        T = np.zeros(len(self))
+        for expiration_date in np.unique(self.expiration_dates):
+            T[self.expiration_dates == expiration_date] = time_to_expiration(
+                current_date, expiration_date, current_time)
+        return T
+
+    def estimate_volatility(self, implied_vols: np.ndarray) -> np.ndarray:
+        """
+        Return each contract's SMA of past implied volatilities, then add the current ones (NaN values skipped).
+
+        Args:
+            implied_vols (np.ndarray): Current implied volatility per contract.
+
+        Returns:
+            np.ndarray: Estimated volatility per contract, NaN while a contract has no history.
+        """
+        if self._vol_buffer is None:
+            self._vol_buffer = np.zeros((len(self), self.smoothing_param))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            estimated_vols = np.where(self._vol_count > 0, self._vol_sum / self._vol_count, np.nan)
+
+        rows = np.flatnonzero(~np.isnan(implied_vols))
+        if rows.size:
+            columns = self._vol_position[rows]
+            full = self._vol_count[rows] >= self.smoothing_param
+            self._vol_sum[rows] -= np.where(full, self._vol_buffer[rows, columns], 0.0)
+            self._vol_buffer[rows, columns] = implied_vols[rows]
+            self._vol_sum[rows] += implied_vols[rows]
+            self._vol_count[rows] = np.minimum(self._vol_count[rows] + 1, self.smoothing_param)
+            self._vol_position[rows] = (columns + 1) % self.smoothing_param
+        return estimated_vols
+
+    def implied_volatility(self, avg_price_underlying, avg_prices_option, current_date, current_time=None,
+                           counters=None):
+        """
+        Implied volatility of the whole chain in one batch solve (IV_METHOD selects the batch solver).
+
+        Args:
+            avg_price_underlying (float): Average price of the underlying asset.
+            avg_prices_option (array-like): Average price per contract (NaN where there is no valid quote).
+            current_date (str): Current date in Jalali calendar (YYYY-MM-DD).
+            current_time (datetime.time or str, optional): Current time of day.
+            counters (ErrorCounters, optional): Implied volatility failures are counted in try_except_counter.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Time to expiration, implied volatility (NaN on failure) and
+            failure-reason code per contract.
+        """
+        T = self.time_to_expiration(current_date, current_time)
+        solver = implied_volatility_lookup if get_config().IV_METHOD == 'lookup' else implied_volatility_batch
+        implied_vols, iv_codes = solver(
+            np.asarray(avg_prices_option, dtype=float), avg_price_underlying, self.strike_prices, T,
+            self.risk_free_rate, self.call_puts, counters
+        )
+        return T, implied_vols, iv_codes
+
+    def smile_volatility(self, avg_price_underlying, time_to_expiration, implied_vols) -> np.ndarray:
+        """
+        Evaluate the smile for every contract, then refit it with the current implied volatilities (use_smile only).
+
+        Args:
+            avg_price_underlying (float): Average price of the underlying asset.
+            time_to_expiration (np.ndarray): Time to expiration per contract.
+            implied_vols (np.ndarray): Current implied volatility per contract (NaN values are skipped).
+
+        Returns:
+            np.ndarray: The smile's volatility per contract, fitted to past ticks only; NaN before the first fit.
+        """
+        k = self.smile.moneyness(avg_price_underlying, self.strike_prices, time_to_expiration, self.risk_free_rate)
+        smile_vols = self.smile.evaluate(k)
+        self.smile.update(k, implied_vols)
+        return smile_vols
+
+    def evaluate(self, avg_price_underlying, avg_prices_option, current_date, current_time=None,
+                 estimated_vols=None, counters=None) -> dict:
+        """
+        Price the whole chain for one tick.
+
+        Args:
+            avg_price_underlying (float): Average price of the underlying asset.
+            avg_prices_option (array-like): Average price per contract (NaN where there is no valid quote).
+            current_date (str): Current date in Jalali calendar (YYYY-MM-DD).
+            current_time (datetime.time or str, optional): Current time of day.
+            estimated_vols (array-like, optional): Volatility to price with. Defaults to the smile (use_smile) or
+                each contract's SMA of past implied volatilities.
+            counters (ErrorCounters, optional): Implied volatility failures are counted in try_except_counter.
+
+        Returns:
+            dict: Arrays keyed by "time_to_expiration", "implied_vol", "iv_code", "estimated_vol",
+            "black_scholes_price", "price_difference", "delta", "gamma", "vega" and "theta".
+        """
+        avg_prices_option = np.asarray(avg_prices_option, dtype=float)
+        T, implied_vols, iv_codes = self.implied_volatility(avg_price_underlying, avg_prices_option, current_date,
+                                                            current_time, counters)
+        if estimated_vols is None and self.smile is not None:
+            estimated_vols = self.smile_volatility(avg_price_underlying, T, implied_vols)
+        elif estimated_vols is None:
+            estimated_vols = self.estimate_volatility(implied_vols)
+        else:
+            estimated_vols = np.asarray(estimated_vols, dtype=float)
+
+        price, delta, gamma, vega, theta = black_scholes_greeks_batch(
+            avg_price_underlying, self.strike_prices, T, self.risk_free_rate, estimated_vols, self.call_puts
+        )
+        return {
+            "time_to_expiration": T,
+            "implied_vol": implied_vols,
+            "iv_code": iv_codes,
+            "estimated_vol": estimated_vols,
+            "black_scholes_price": price,
+            "price_difference": avg_prices_option - price,
+            "delta": delta,
+            "gamma": gamma,
+            "vega": vega,
+            "theta": theta,
+        }
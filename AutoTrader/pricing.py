@@ -0,0 +1,265 @@
+# pricing.py
+
+import numpy as np
+from scipy.special import ndtr
+
+
+def _as_call_mask(call_put, shape):
+    """
+    Convert option type flags into a boolean call mask.
+
+    Args:
+        call_put (str, bool or array-like): 'c'/'p' flags (any case) or booleans where True means call.
+        shape (tuple): Shape the mask is broadcast to.
+
+    Returns:
+        np.ndarray: Boolean array, True where the option is a call.
+    """
+    flags = np.asarray(call_put)
+    if flags.dtype.kind in ('U', 'S', 'O'):
+        flags = flags.astype(str)
+        is_call = (flags == 'c') | (flags == 'C')
+    else:
+        is_call = flags.astype(bool)
+    return np.broadcast_to(is_call, shape)
+
+
+def _broadcast_inputs(*arrays):
+    """
+    Convert the numeric inputs to float arrays broadcast to a common shape.
+    """
+    return np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in arrays))
+
+
+def black_scholes_price_batch(S, K, T, r, sigma, call_put):
+    """
+    Calculate Black-Scholes prices for a batch of European options in one NumPy pass.
+
+    All numeric arguments may be scalars or arrays; they are broadcast against each other.
+
+    Args:
+        S (array-like): Prices of the underlying asset.
+        K (array-like): Strike prices.
+        T (array-like): Times to expiration in years.
+        r (array-like): Risk-free interest rates.
+        sigma (array-like): Volatilities.
+        call_put (str or array-like): Option types ('c' for call, 'p' for put) or booleans (True for call).
+
+    Returns:
+        np.ndarray: Black-Scholes prices, NaN where T <= 0, sigma <= 0 or any input is NaN.
+    """
+    S, K, T, r, sigma = _broadcast_inputs(S, K, T, r, sigma)
+    is_call = _as_call_mask(call_put, S.shape)
+
+    price = np.full(S.shape, np.nan)
+    valid = _valid_pricing_inputs(S, K, T, r, sigma)
+    if not valid.any():
+        return price
+
+    S, K, T, r, sigma, is_call = S[valid], K[valid], T[valid], r[valid], sigma[valid], is_call[valid]
+    d1, d2, _ = _d1_d2(S, K, T, r, sigma)
+    discounted_strike = K * np.exp(-r * T)
+
+    call_price = S * ndtr(d1) - discounted_strike * ndtr(d2)
+    put_price = discounted_strike * ndtr(-d2) - S * ndtr(-d1)
+    price[valid] = np.where(is_call, call_price, put_price)
+    return price
+
+
+def black_scholes_greeks_batch(S, K, T, r, sigma, call_put):
+    """
+    Calculate Black-Scholes price, delta, gamma, vega and theta for a batch of European options.
+
+    d1, d2, the normal CDF and the normal density are evaluated once and shared by all outputs. Vega and theta
+    follow the py_vollib analytical conventions: vega per 1% change in volatility and theta per calendar day.
+
+    Args:
+        S (array-like): Prices of the underlying asset.
+        K (array-like): Strike prices.
+        T (array-like): Times to expiration in years.
+        r (array-like): Risk-free interest rates.
+        sigma (array-like): Volatilities.
+        call_put (str or array-like): Option types ('c' for call, 'p' for put) or booleans (True for call).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Price, delta, gamma, vega and theta,
+        NaN where T <= 0, sigma <= 0 or any input is NaN.
+    """
+    S, K, T, r, sigma = _broadcast_inputs(S, K, T, r, sigma)
+    is_call = _as_call_mask(call_put, S.shape)
+
+    outputs = tuple(np.full(S.shape, np.nan) for _ in range(5))
+    valid = _valid_pricing_inputs(S, K, T, r, sigma)
+    if not valid.any():
+        return outputs
+
+    S, K, T, r, sigma, is_call = S[valid], K[valid], T[valid], r[valid], sigma[valid], is_call[valid]
+    d1, d2, sigma_sqrt_t = _d1_d2(S, K, T, r, sigma)
+    discounted_strike = K * np.exp(-r * T)
+    sqrt_t = np.sqrt(T)
+
+    cdf_d1 = ndtr(d1)
+    cdf_d2 = ndtr(d2)
+    pdf_d1 = _norm_pdf(d1)
+
+    call_price = S * cdf_d1 - discounted_strike * cdf_d2
+    # Put values through put-call parity, reusing the call terms.
+    put_price = call_price - S + discounted_strike
+    time_decay = -S * pdf_d1 * sigma / (2.0 * sqrt_t)
+
+    price = np.where(is_call, call_price, put_price)
+    delta = np.where(is_call, cdf_d1, cdf_d1 - 1.0)
+    gamma = pdf_d1 / (S * sigma_sqrt_t)
+    vega = S * pdf_d1 * sqrt_t * 0.01
+    theta = np.where(
+        is_call,
+        time_decay - r * discounted_strike * cdf_d2,
+        time_decay + r * discounted_strike * (1.0 - cdf_d2),
+    ) / 365.0
+
+    for output, values in zip(outputs, (price, delta, gamma, vega, theta)):
+        output[valid] = values
+    return outputs
+
+
+def _valid_pricing_inputs(S, K, T, r, sigma):
+    """
+    Mask of elements the Black-Scholes formulas can be evaluated for.
+    """
+    return (T > 0) & (sigma > 0) & (S > 0) & (K > 0) & np.isfinite(r)
+
+
+def _d1_d2(S, K, T, r, sigma):
+    """
+    Black-Scholes d1 and d2 terms, plus sigma * sqrt(T).
+    """
+    sigma_sqrt_t = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_t
+    return d1, d1 - sigma_sqrt_t, sigma_sqrt_t
+
+
+# Failure-reason codes returned by implied_volatility_batch.
+IV_OK = 0
+IV_INVALID_INPUT = 1
+IV_BELOW_INTRINSIC = 2
+IV_ABOVE_MAXIMUM = 3
+IV_NOT_CONVERGED = 4
+
+IV_FAILURE_REASONS = {
+    IV_OK: "ok",
+    IV_INVALID_INPUT: "invalid input",
+    IV_BELOW_INTRINSIC: "price below intrinsic value",
+    IV_ABOVE_MAXIMUM: "price above maximum value",
+    IV_NOT_CONVERGED: "solver did not converge",
+}
+
+
+def implied_volatility_batch(price, S, K, T, r, call_put, counters=None, max_iterations=100, tolerance=1e-12):
+    """
+    Invert the Black-Scholes formula for a batch of option prices at once.
+
+    The undiscounted Black price is solved for the total volatility w = sigma * sqrt(T) with a bracketed Newton
+    iteration. Newton starts at the inflection point
+    sqrt(2 * |ln(F / K)|), from where it converges monotonically; steps leaving the bracket fall back to bisection.
+
+    Args:
+        price (array-like): Observed option prices (e.g. order book mids).
+        S (array-like): Prices of the underlying asset.
+        K (array-like): Strike prices.
+        T (array-like): Times to expiration in years.
+        r (array-like): Risk-free interest rates.
+        call_put (str or array-like): Option types ('c' for call, 'p' for put) or booleans (True for call).
+        counters (ErrorCounters, optional): If given, try_except_counter is increased by the number of failures.
+        max_iterations (int): Maximum number of Newton/bisection iterations.
+        tolerance (float): Convergence tolerance on the total volatility.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Implied volatilities (NaN on failure) and per-element failure-reason codes
+        (IV_OK or one of the IV_* codes in IV_FAILURE_REASONS).
+    """
+    price, S, K, T, r = _broadcast_inputs(price, S, K, T, r)
+    is_call = _as_call_mask(call_put, S.shape)
+
+    iv = np.full(S.shape, np.nan)
+    codes = np.full(S.shape, IV_INVALID_INPUT, dtype=np.int8)
+
+    valid = (T > 0) & (S > 0) & (K > 0) & (price > 0) & np.isfinite(r)
+    with np.errstate(invalid='ignore', over='ignore'):
+        growth = np.exp(r * T)
+        forward = S * growth
+        target = price * growth
+        intrinsic = np.where(is_call, np.maximum(forward - K, 0.0), np.maximum(K - forward, 0.0))
+        maximum = np.where(is_call, forward, K)
+
+    below = valid & (target <= intrinsic)
+    above = valid & (target >= maximum)
+    codes[below] = IV_BELOW_INTRINSIC
+    codes[above] = IV_ABOVE_MAXIMUM
+    solve = valid & ~below & ~above
+    codes[solve] = IV_NOT_CONVERGED
+
+    if solve.any():
+        index = np.flatnonzero(solve)
+        F, K_s, C = forward.ravel()[index], K.ravel()[index], target.ravel()[index]
+        theta = np.where(is_call.ravel()[index], 1.0, -1.0)
+        x = np.log(F / K_s)
+
+        lo = np.zeros_like(F)
+        hi = np.full_like(F, 10.0)
+        # Widen the upper bracket until it prices above the target.
+        for _ in range(10):
+            short = _black_price(F, K_s, x, hi, theta) < C
+            if not short.any():
+                break
+            lo = np.where(short, hi, lo)
+            hi = np.where(short, hi * 2.0, hi)
+
+        w = np.clip(np.sqrt(2.0 * np.abs(x)), lo, hi)
+        w = np.where(w > 0, w, 0.5 * (lo + hi))
+        converged = np.zeros(F.shape, dtype=bool)
+        for _ in range(max_iterations):
+            active = ~converged
+            if not active.any():
+                break
+            w_a = w[active]
+            diff = _black_price(F[active], K_s[active], x[active], w_a, theta[active]) - C[active]
+            lo[active] = np.where(diff < 0, w_a, lo[active])
+            hi[active] = np.where(diff > 0, w_a, hi[active])
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                vega = F[active] * _norm_pdf(x[active] / w_a + 0.5 * w_a)
+                step = diff / vega
+            w_new = w_a - step
+            outside = ~np.isfinite(w_new) | (w_new <= lo[active]) | (w_new >= hi[active])
+            w_new = np.where(outside, 0.5 * (lo[active] + hi[active]), w_new)
+
+            done = (np.abs(w_new - w_a) <= tolerance * (1.0 + w_a)) | (diff == 0)
+            w[active] = w_new
+            converged[np.flatnonzero(active)[done]] = True
+
+        T_s = T.ravel()[index]
+        iv.ravel()[index[converged]] = w[converged] / np.sqrt(T_s[converged])
+        codes.ravel()[index[converged]] = IV_OK
+
+    if counters is not None:
+        counters.try_except_counter += int(np.count_nonzero(codes != IV_OK))
+    return iv, codes
+
+
+def _norm_pdf(x):
+    """
+    Standard normal probability density function.
+    """
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+
+def _black_price(F, K, x, w, theta):
+    """
+    Undiscounted Black price for log-moneyness x = ln(F / K) and total volatility w = sigma * sqrt(T).
+    theta is +1 for calls and -1 for puts.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = x / w + 0.5 * w
+    d1 = np.where(w > 0, d1, np.where(x > 0, np.inf, -np.inf))
+    d2 = np.where(w > 0, d1 - w, d1)
+    return theta * (F * ndtr(theta * d1) - K * ndtr(theta * d2))
@@ -0,0 +1,386 @@
+# rolling_window.py
+
+import math
+import random
+from collections import deque
+
+import numpy as np
+
+
+class RollingWindow:
+    """
+    Fixed-capacity NumPy ring buffer with O(1) running mean, variance and standard deviation.
+
+    It can stand in for deque(maxlen=...) where the code appends values and reads statistics of the window
+    (append, extend, len, truthiness, indexing, iteration and clear behave the same way).
+
+    Running sums are kept for values shifted by an anchor close to the window's mean, which avoids the
+    cancellation of the naive sum-of-squares formula. Every maxlen appends the sums are recomputed exactly from
+    the buffer around a fresh anchor, so rounding errors cannot accumulate; this costs O(maxlen) once per maxlen
+    appends, i.e. O(1) amortized. The sums are also recomputed early when the variance becomes tiny compared to
+    the shifted sum of squares (the data moved away from the anchor), where cancellation would cost precision.
+    The anchor is always one of the stored values, so a window of identical values has a standard deviation of
+    exactly 0.
+    """
+
+    def __init__(self, maxlen):
+        """
+        Args:
+            maxlen (int): Capacity of the window.
+        """
+        self.maxlen = int(maxlen)
+        self._buffer = np.zeros(self.maxlen)
+        self._start = 0
+        self._size = 0
+        self._anchor = 0.0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._appends_since_anchor = 0
+        self._sums_exact = True
+
+    def append(self, value):
+        """
+        Add a value, evicting the oldest one when the window is full.
+        """
+        value = float(value)
+        if self._size == 0:
+            self._anchor = value
+            self._sum = 0.0
+            self._sum_sq = 0.0
+
+        if self._size == self.maxlen:
+            evicted = self._buffer[self._start] - self._anchor
+            self._sum -= evicted
+            self._sum_sq -= evicted * evicted
+            self._buffer[self._start] = value
+            self._start = (self._start + 1) % self.maxlen
+        else:
+            self._buffer[(self._start + self._size) % self.maxlen] = value
+            self._size += 1
+
+        shifted = value - self._anchor
+        self._sum += shifted
+        self._sum_sq += shifted * shifted
+        self._sums_exact = False
+
+        self._appends_since_anchor += 1
+        if self._appends_since_anchor >= self.maxlen:
+            self._reanchor()
+
+    def extend(self, values):
+        """
+        Append several values in order.
+        """
+        for value in values:
+            self.append(value)
+
+    def _reanchor(self):
+        """
+        Recompute the running sums exactly around the stored value closest to the current mean.
+        """
+        values = self.values()
+        self._appends_since_anchor = 0
+        self._sums_exact = True
+        if values.size == 0:
+            return
+        self._anchor = float(values[np.argmin(np.abs(values - values.mean()))])
+        shifted = values - self._anchor
+        self._sum = float(shifted.sum())
+        self._sum_sq = float(np.dot(shifted, shifted))
+
+    def mean(self) -> float:
+        """
+        Mean of the window, NaN when it is empty.
+        """
+        if self._size == 0:
+            return np.nan
+        return self._anchor + self._sum / self._size
+
+    def var(self, ddof=0) -> float:
+        """
+        Variance of the window with the given delta degrees of freedom (as in np.var), NaN if size <= ddof.
+        """
+        if self._size <= ddof:
+            return np.nan
+        centered_sum_sq = self._sum_sq - self._sum * self._sum / self._size
+        if not self._sums_exact and centered_sum_sq <= 1e-6 * self._sum_sq:
+            self._reanchor()
+            centered_sum_sq = self._sum_sq - self._sum * self._sum / self._size
+        return max(centered_sum_sq / (self._size - ddof), 0.0)
+
+    def std(self, ddof=0) -> float:
+        """
+        Standard deviation of the window with the given delta degrees of freedom (as in np.std).
+        """
+        return math.sqrt(self.var(ddof)) if self._size > ddof else np.nan
+
+    def sum(self) -> float:
+        """
+        Sum of the window.
+        """
+        return self._anchor * self._size + self._sum
+
+    def values(self) -> np.ndarray:
+        """
+        Copy of the window's values, oldest first.
+        """
+        end = self._start + self._size
+        if end <= self.maxlen:
+            return self._buffer[self._start:end].copy()
+        return np.concatenate((self._buffer[self._start:], self._buffer[:end - self.maxlen]))
+
+    def clear(self):
+        """
+        Remove all values.
+        """
+        self._start = 0
+        self._size = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._appends_since_anchor = 0
+        self._sums_exact = True
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("RollingWindow index out of range")
+        return self._buffer[(self._start + index) % self.maxlen]
+
+    def __repr__(self):
+        return f"RollingWindow(maxlen={self.maxlen}, size={self._size})"
+
+
+class _SkiplistNode:
+    __slots__ = ("value", "next", "width")
+
+    def __init__(self, value, next_nodes, widths):
+        self.value = value
+        self.next = next_nodes
+        self.width = widths
+
+
+class IndexableSkiplist:
+    """
+    Sorted multiset with O(log n) insert, remove, rank and access by sorted position.
+
+    Every link stores how many positions it skips, so the i-th smallest value is found by walking down the
+    levels like a binary search.
+    """
+
+    def __init__(self, expected_size=100):
+        """
+        Args:
+            expected_size (int): Expected number of values; sets the number of levels.
+        """
+        self.size = 0
+        self.maxlevels = int(1 + math.log2(max(expected_size, 2)))
+        self._tail = _SkiplistNode(math.inf, [], [])
+        self._head = _SkiplistNode(None, [self._tail] * self.maxlevels, [1] * self.maxlevels)
+        self._random = random.Random(0)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("IndexableSkiplist index out of range")
+        node = self._head
+        index += 1
+        for level in reversed(range(self.maxlevels)):
+            while node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def rank(self, value) -> int:
+        """
+        Number of stored values strictly smaller than value.
+        """
+        node = self._head
+        position = 0
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def insert(self, value):
+        """
+        Add a value.
+        """
+        chain = [None] * self.maxlevels
+        steps_at_level = [0] * self.maxlevels
+        node = self._head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = min(self.maxlevels, 1 - int(math.log2(1.0 - self._random.random())))
+        new_node = _SkiplistNode(value, [None] * levels, [None] * levels)
+        steps = 0
+        for level in range(levels):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, self.maxlevels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        """
+        Remove one occurrence of value. Raises KeyError if it is not stored.
+        """
+        chain = [None] * self.maxlevels
+        node = self._head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is self._tail or target.value != value:
+            raise KeyError(value)
+
+        levels = len(target.next)
+        for level in range(levels):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(levels, self.maxlevels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+
+class RobustRollingWindow:
+    """
+    Fixed-capacity window with a rolling median and median absolute deviation (MAD).
+
+    The values are kept in insertion order (for eviction) and in an IndexableSkiplist (for order statistics), so
+    append costs O(log maxlen) and there is no sort of the window per tick. The median is read by position in
+    O(log maxlen). The MAD is the k-th smallest distance to the median; the distances below and above the median
+    form two sorted sequences of the skiplist, so it is found by a binary search over both in O(log^2 maxlen).
+
+    Like RollingWindow it can stand in for deque(maxlen=...) (append, extend, len, truthiness, indexing,
+    iteration and clear). NaN values cannot be ordered and are rejected.
+    """
+
+    def __init__(self, maxlen):
+        """
+        Args:
+            maxlen (int): Capacity of the window.
+        """
+        self.maxlen = int(maxlen)
+        self._values = deque(maxlen=self.maxlen)
+        self._sorted = IndexableSkiplist(self.maxlen)
+
+    def append(self, value):
+        """
+        Add a value, evicting the oldest one when the window is full.
+        """
+        value = float(value)
+        if math.isnan(value):
+            raise ValueError("RobustRollingWindow cannot store NaN")
+        if len(self._values) == self.maxlen:
+            self._sorted.remove(self._values[0])
+        self._values.append(value)
+        self._sorted.insert(value)
+
+    def extend(self, values):
+        """
+        Append several values in order.
+        """
+        for value in values:
+            self.append(value)
+
+    def median(self) -> float:
+        """
+        Median of the window, NaN when it is empty.
+        """
+        size = len(self._sorted)
+        if size == 0:
+            return np.nan
+        middle = size // 2
+        if size % 2:
+            return self._sorted[middle]
+        return 0.5 * (self._sorted[middle - 1] + self._sorted[middle])
+
+    def mad(self) -> float:
+        """
+        Median absolute deviation from the median (unscaled), NaN when the window is empty.
+        """
+        size = len(self._sorted)
+        if size == 0:
+            return np.nan
+        middle = size // 2
+        if size % 2:
+            return self._kth_distance(middle)
+        return 0.5 * (self._kth_distance(middle - 1) + self._kth_distance(middle))
+
+    def _kth_distance(self, k) -> float:
+        """
+        k-th smallest (0-based) absolute distance of the stored values to the median.
+        """
+        median = self.median()
+        split = self._sorted.rank(median)
+        below = split  # distances median - x of the values below the median, ascending with i
+        above = len(self._sorted) - split
+
+        def below_distance(i):
+            return median - self._sorted[split - 1 - i]
+
+        def above_distance(i):
+            return self._sorted[split + i] - median
+
+        # Find how many of the k + 1 smallest distances come from below the median.
+        low, high = max(0, k + 1 - above), min(k + 1, below)
+        while low < high:
+            taken = (low + high) // 2
+            if below_distance(taken) < above_distance(k - taken):
+                low = taken + 1
+            else:
+                high = taken
+        taken_above = k + 1 - low
+        candidates = []
+        if low > 0:
+            candidates.append(below_distance(low - 1))
+        if taken_above > 0:
+            candidates.append(above_distance(taken_above - 1))
+        return max(candidates)
+
+    def values(self) -> np.ndarray:
+        """
+        Copy of the window's values, oldest first.
+        """
+        return np.array(self._values, dtype=float)
+
+    def clear(self):
+        """
+        Remove all values.
+        """
+        self._values.clear()
+        self._sorted = IndexableSkiplist(self.maxlen)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __repr__(self):
+        return f"RobustRollingWindow(maxlen={self.maxlen}, size={len(self._values)})"
@@ -0,0 +1,80 @@
+# scheduler.py
+
+import math
+import time
+
+
+class Scheduler:
+    """
+    Fixed-rate schedule aligned to wall-clock multiples of an interval.
+
+    The slots are placed on whole multiples of interval seconds of the wall clock (every full second for an interval
+    of 1, every half second for 0.5), and then advanced on the monotonic clock, so the schedule neither drifts by
+    the time the work takes nor jumps when the system clock is adjusted. Each slot carries its wall-clock time, which
+    is used as the tick's timestamp: consecutive ticks get consecutive labels that line up with the 1-second grid
+    of the historical data.
+
+    Work that runs past the next slot is an overrun. The loop then continues right away with the latest slot that
+    has already started; the slots skipped in between are counted as missed.
+    """
+
+    def __init__(self, interval):
+        """
+        Args:
+            interval (float): Seconds between slots, may be below one second.
+        """
+        if interval <= 0:
+            raise ValueError(f"Scheduler interval must be positive, got {interval}")
+        self.interval = interval
+        self.overruns = 0
+        self.missed_slots = 0
+
+        wall_now = time.time()
+        self._slot_time = math.ceil(wall_now / interval) * interval
+        self._deadline = time.monotonic() + (self._slot_time - wall_now)
+        self._started = False
+
+    def next_slot(self):
+        """
+        Advance to the next slot.
+
+        Returns:
+            tuple: (seconds to wait until the slot starts, wall-clock time of the slot as a Unix timestamp).
+        """
+        if self._started:
+            self._deadline += self.interval
+            self._slot_time += self.interval
+        self._started = True
+
+        late = time.monotonic() - self._deadline
+        if late > 0:
+            self.overruns += 1
+            missed = int(late // self.interval)
+            if missed:
+                self.missed_slots += missed
+                self._deadline += missed * self.interval
+                self._slot_time += missed * self.interval
+        return max(0.0, -late), self._slot_time
+
+    def wait(self, stop_event):
+        """
+        Block until the next slot starts or stop_event is set.
+
+        Returns:
+            float: Wall-clock time of the slot, or None if stop_event was set while waiting.
+        """
+        delay, slot_time = self.next_slot()
+        if stop_event.wait(delay):
+            return None
+        return slot_time
+
+    def report(self, name):
+        """
+        Print the overruns and missed slots, if there were any.
+        """
+        if self.overruns:
+            print(f"WARNING: {name} overran its {self.interval} s slot {self.overruns} times, "
+                  f"{self.missed_slots} slots were missed.")
+
+    def __repr__(self):
+        return f"Scheduler(interval={self.interval}, overruns={self.overruns}, missed_slots={self.missed_slots})"
@@ -0,0 +1,179 @@
+# shadow_signals.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class ShadowSignalEngine:
+    """
+    Evaluates several WINDOW_SIZE / Z_THRESHOLD combinations next to the production signal.
+
+    All windows share one ring buffer of price differences holding max(window_sizes) values. For each window a
+    running sum and sum of squares (shifted by a common anchor) are kept, so one tick costs O(number of windows)
+    regardless of the window lengths; every threshold of a window reuses its z-score. The statistics follow
+    process_price_difference: only past values are used, a window needs window_size values, the standard deviation
+    uses ddof=1, a zero standard deviation gives a z-score of 0 and NaN differences never enter the buffer.
+
+    Shadow signals are only recorded, never traded.
+    """
+
+    def __init__(self, window_sizes, z_thresholds):
+        """
+        Args:
+            window_sizes (list): Rolling window sizes to evaluate.
+            z_thresholds (list): Z-score thresholds to evaluate for every window size.
+        """
+        self.window_sizes = np.array(sorted(set(int(w) for w in window_sizes)), dtype=int)
+        self.z_thresholds = np.asarray(z_thresholds, dtype=float)
+        self.capacity = int(self.window_sizes.max())
+
+        self._ring = np.zeros(self.capacity)
+        self._count = 0
+        self._position = 0
+        self._anchor = 0.0
+        self._sums = np.zeros(len(self.window_sizes))
+        self._sums_sq = np.zeros(len(self.window_sizes))
+        self._appends_since_resum = 0
+
+        shape = (len(self.window_sizes), len(self.z_thresholds))
+        self.under_counts = np.zeros(shape, dtype=np.int64)
+        self.over_counts = np.zeros(shape, dtype=np.int64)
+        self.records = []
+
+    def values(self) -> np.ndarray:
+        """
+        Buffered price differences, oldest first.
+        """
+        if self._count < self.capacity:
+            return self._ring[:self._count].copy()
+        return np.concatenate((self._ring[self._position:], self._ring[:self._position]))
+
+    def extend(self, values):
+        """
+        Append past price differences, e.g. the production window after the historical warm-up.
+        """
+        for value in values:
+            self.append(value)
+
+    def append(self, price_difference):
+        """
+        Add one price difference to every window. NaN values are ignored.
+        """
+        if np.isnan(price_difference):
+            return
+        full = self._count >= self.window_sizes
+        leaving = self._ring[(self._position - self.window_sizes) % self.capacity] - self._anchor
+        self._sums -= np.where(full, leaving, 0.0)
+        self._sums_sq -= np.where(full, leaving * leaving, 0.0)
+
+        shifted = price_difference - self._anchor
+        self._sums += shifted
+        self._sums_sq += shifted * shifted
+
+        self._ring[self._position] = price_difference
+        self._position = (self._position + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+        self._appends_since_resum += 1
+        if self._appends_since_resum >= self.capacity:
+            self._resum()
+
+    def _resum(self):
+        """
+        Recompute the running sums exactly around the current mean, so rounding errors cannot accumulate.
+        """
+        values = self.values()
+        self._anchor = float(values.mean()) if values.size else 0.0
+        for i, window_size in enumerate(self.window_sizes):
+            tail = values[-window_size:] - self._anchor
+            self._sums[i] = tail.sum()
+            self._sums_sq[i] = np.dot(tail, tail)
+        self._appends_since_resum = 0
+
+    def statistics(self):
+        """
+        Rolling mean and standard deviation of every window, NaN for windows that are not full yet.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Means and standard deviations per window size.
+        """
+        ready = self._count >= self.window_sizes
+        sizes = self.window_sizes.astype(float)
+        means = np.where(ready, self._anchor + self._sums / sizes, np.nan)
+        centered = self._sums_sq - self._sums * self._sums / sizes
+
+        # Nearly constant windows lose all precision in the running sums; compute those exactly.
+        suspect = np.flatnonzero(ready & (centered <= 1e-6 * self._sums_sq))
+        if suspect.size:
+            values = self.values()
+            for i in suspect:
+                tail = values[-self.window_sizes[i]:]
+                means[i] = tail.mean()
+                deviations = tail - means[i]
+                centered[i] = np.dot(deviations, deviations)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stds = np.where(ready, np.sqrt(np.maximum(centered, 0.0) / (sizes - 1)), np.nan)
+        return means, stds
+
+    def evaluate(self, price_difference):
+        """
+        Z-scores and signals of all combinations for the current price difference, then add it to the windows.
+
+        Args:
+            price_difference (float): Current price difference.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Z-score per window size and signal ('buy', 'sell', 'hold') per
+            (window size, threshold) pair.
+        """
+        means, stds = self.statistics()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z_scores = np.where(stds == 0, 0.0, (price_difference - means) / stds)
+
+        z = z_scores[:, None]
+        under = z < -self.z_thresholds[None, :]
+        over = z > self.z_thresholds[None, :]
+        signals = np.where(under, 'buy', np.where(over, 'sell', 'hold'))
+        self.under_counts += under
+        self.over_counts += over
+
+        self.append(price_difference)
+        return z_scores, signals
+
+    def process(self, current_date, current_time, price_difference):
+        """
+        Evaluate one tick and keep the result for save_to_excel.
+
+        Args:
+            current_date (str): Jalali date of the tick.
+            current_time (str): Time of the tick.
+            price_difference (float): Current price difference.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The return value of evaluate.
+        """
+        z_scores, signals = self.evaluate(price_difference)
+        record = {"Date": current_date, "Time": current_time, "price_difference": price_difference}
+        for i, window_size in enumerate(self.window_sizes):
+            record[f"z_score_w{window_size}"] = z_scores[i]
+            for j, z_threshold in enumerate(self.z_thresholds):
+                record[f"signal_w{window_size}_z{z_threshold:g}"] = signals[i, j]
+                record[f"under_count_w{window_size}_z{z_threshold:g}"] = self.under_counts[i, j]
+                record[f"over_count_w{window_size}_z{z_threshold:g}"] = self.over_counts[i, j]
+        self.records.append(record)
+        return z_scores, signals
+
+    def save_to_excel(self, filename):
+        """
+        Write the recorded shadow signals to an Excel file.
+
+        Args:
+            filename (str): Output file path.
+        """
+        folder = os.path.dirname(filename)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        pd.DataFrame(self.records).to_excel(filename, index=False)
@@ -1,26 +1,37 @@
 import time
+
 from signals import buy, sell, cancel_all_orders
 
 
-def signal_handling_thread(signal_queue, stop_event):
+def signal_handling_thread(signal_queue, stop_event, config=None, api=None, counters=None):
     """
-    Thread function for handling signals.
+    Thread function for handling signals. Blocks on signal_queue (a TickQueue) until a signal arrives.
+    Orders are placed for the option of config with api, see buy, sell and cancel_all_orders. With counters, the
+    latency of every executed signal is recorded in counters.latency.
     """
     last_signal = None
     try:
         while not stop_event.is_set():
-            time.sleep(0.01)
-            if signal_queue:
-                signal_data = signal_queue.popleft()
-                current_time = signal_data.get("Time")
-                signal = signal_data.get("signal")
+            signal_data = signal_queue.get()
+            if signal_data is None:
+                continue
+            picked_up = time.monotonic()
+            current_time = signal_data.get("Time")
+            signal = signal_data.get("signal")
+
+            ordered = True
+            if signal == 'buy':
+                buy(config, api)
+            elif signal == 'sell':
+                sell(config, api)
+            elif signal == 'hold' and last_signal != 'hold':
+                cancel_all_orders(config, api)
+            else:
+                ordered = False
+            last_signal = signal
 
-                if signal == 'buy':
-                    buy()
-                elif signal == 'sell':
-                    sell()
-                elif signal == 'hold' and last_signal != 'hold':
-                    cancel_all_orders()
-                last_signal = signal
+            tick = signal_data.get("tick")
+            if ordered and counters is not None and tick is not None:
+                counters.latency.record_order(tick, picked_up, time.monotonic())
     finally:
         print("INFO: signal_handling_thread is shutting down gracefully.")
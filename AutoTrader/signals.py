@@ -4,9 +4,13 @@ import numpy as np
 from collections import deque
 from typing import Tuple
 
-from trading_api import TradingAPI
+from trading_api import get_trading_api
 from error_counters import ErrorCounters
 from config import get_config
+from rolling_window import RollingWindow, RobustRollingWindow
+
+# Scales the MAD to a standard deviation for normally distributed data.
+MAD_SCALE = 1.4826
 
 
 def generate_signals(z_score: float, z_threshold: float) -> Tuple[str, float, float]:
@@ -37,7 +41,10 @@ def process_price_difference(price_difference, price_diff_window, window_size, z
 
     Args:
         price_difference (float): Current price difference.
-        price_diff_window (deque): Rolling window of past price differences.
+        price_diff_window (RollingWindow, RobustRollingWindow or deque): Rolling window of past price differences.
+            A RollingWindow provides the mean and standard deviation in O(1). A RobustRollingWindow switches to the
+            robust z-score (x - median) / (MAD_SCALE * MAD); rolling_mean_diff and rolling_std_diff then hold the
+            median and the scaled MAD.
         window_size (int): The size of the rolling window.
         z_threshold (float): Threshold for z-score to trigger signals.
         counters (ErrorCounters): An instance of the ErrorCounters class.
@@ -48,8 +55,15 @@ def process_price_difference(price_difference, price_diff_window, window_size, z
     try:
         # Calculate rolling statistics based on existing window (excluding current price_difference)
         if len(price_diff_window) >= window_size:
-            rolling_mean_diff = np.mean(price_diff_window)
-            rolling_std_diff = np.std(price_diff_window, ddof=1)
+            if isinstance(price_diff_window, RobustRollingWindow):
+                rolling_mean_diff = price_diff_window.median()
+                rolling_std_diff = MAD_SCALE * price_diff_window.mad()
+            elif isinstance(price_diff_window, RollingWindow):
+                rolling_mean_diff = price_diff_window.mean()
+                rolling_std_diff = price_diff_window.std(ddof=1)
+            else:
+                rolling_mean_diff = np.mean(price_diff_window)
+                rolling_std_diff = np.std(price_diff_window, ddof=1)
             if rolling_std_diff == 0:
                 z_score = 0.0  # or some default value
             else:
@@ -80,18 +94,18 @@ def process_price_difference(price_difference, price_diff_window, window_size, z
         return 'hold', 0, 0, np.nan, np.nan, np.nan
 
 
-def buy():
-    config = get_config()
+def buy(config=None, api=None):
+    config = get_config() if config is None else config
     if config.NET_WORTH > config.MAX_BID:
         print(f"Net worth buy (${config.NET_WORTH}) exceeds the maximum bid (${config.MAX_BID}).")
         return
 
     """
-    Implements the buy logic using the TradingAPI.
+    Implements the buy logic using the TradingAPI (the shared one unless api is given) for the option of config.
     """
     print("INFO: Executing Buy Order")
 
-    api = TradingAPI()
+    api = get_trading_api() if api is None else api
 
     # Calculate buy price
     market_data = api.fetch_order_book(config.OPTION_TICKER)
@@ -113,17 +127,17 @@ def buy():
     api.buy(ticker=config.OPTION_TICKER, price=buy_price, quantity=order_quantity)
 
 
-def sell():
-    config = get_config()
+def sell(config=None, api=None):
+    config = get_config() if config is None else config
     if config.NET_WORTH < -config.MAX_BID:
         print(f"Net worth sell (${config.NET_WORTH}) exceeds the maximum bid (${config.MAX_BID}).")
         return
     """
-    Implements the sell logic using the TradingAPI.
+    Implements the sell logic using the TradingAPI (the shared one unless api is given) for the option of config.
     """
     print("INFO: Executing Sell Order")
 
-    api = TradingAPI()
+    api = get_trading_api() if api is None else api
 
     # Calculate sell price
     market_data = api.fetch_order_book(config.OPTION_TICKER)
@@ -145,14 +159,14 @@ def sell():
     api.sell(ticker=config.OPTION_TICKER, price=sell_price, quantity=order_quantity)
 
 
-def cancel_all_orders():
-    config = get_config()
+def cancel_all_orders(config=None, api=None):
+    config = get_config() if config is None else config
     """
     Cancels all open orders for the specified ticker.
     """
     print("INFO: Cancelling all open orders.")
 
-    api = TradingAPI()
+    api = get_trading_api() if api is None else api
     open_orders = api.fetch_open_orders()
     if open_orders:
         # Filter orders for the specific ticker
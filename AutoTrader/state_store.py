@@ -0,0 +1,165 @@
+# state_store.py
+
+import os
+import time
+
+import numpy as np
+
+from config import get_config
+
+STATE_FOLDER = "state_files"
+
+
+def state_file_path(option_ticker: str) -> str:
+    """
+    Path of the rolling-state snapshot for an option.
+
+    Args:
+        option_ticker (str): The ISIN ticker symbol of the option.
+
+    Returns:
+        str: The snapshot file path.
+    """
+    return os.path.join(STATE_FOLDER, f"{option_ticker}_state.npz")
+
+
+def save_state(path, rolling_vols, price_diff_window, under_negative_one_count, over_positive_one_count,
+               last_date, last_time):
+    """
+    Write the rolling windows, signal counters and last processed timestamp to a compressed binary file.
+
+    The file is written next to its final name and then renamed, so a crash never leaves a half-written snapshot.
+
+    Args:
+        path (str): Snapshot file path.
+        rolling_vols (VolatilityEstimator, RollingWindow or deque): Volatility estimator state.
+        price_diff_window (RollingWindow or deque): Past price differences.
+        under_negative_one_count (int): Number of z-scores below -Z_THRESHOLD so far.
+        over_positive_one_count (int): Number of z-scores above +Z_THRESHOLD so far.
+        last_date (str): Jalali date of the last processed tick (YYYY-MM-DD).
+        last_time (str): Time of the last processed tick (HH:MM:SS).
+    """
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            rolling_vols=np.asarray(list(rolling_vols), dtype=float),
+            price_diff_window=np.asarray(list(price_diff_window), dtype=float),
+            signal_counts=np.array([under_negative_one_count, over_positive_one_count], dtype=np.int64),
+            last_timestamp=np.array([last_date, last_time]),
+        )
+    os.replace(temporary_path, path)
+
+
+def load_state(path, config=None):
+    """
+    Read a snapshot written by save_state.
+
+    Snapshots older than HISTORICAL_DATA_START_DATE are ignored, because a normal warm-up covers more history
+    than they do.
+
+    Args:
+        path (str): Snapshot file path.
+        config (optional): Instrument config, defaults to the process config.
+
+    Returns:
+        Optional[dict]: Keys "rolling_vols", "price_diff_window", "under_negative_one_count",
+        "over_positive_one_count", "last_date" and "last_time", or None if there is no usable snapshot.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as snapshot:
+            last_date, last_time = (str(value) for value in snapshot["last_timestamp"])
+            state = {
+                "rolling_vols": snapshot["rolling_vols"],
+                "price_diff_window": snapshot["price_diff_window"],
+                "under_negative_one_count": int(snapshot["signal_counts"][0]),
+                "over_positive_one_count": int(snapshot["signal_counts"][1]),
+                "last_date": last_date,
+                "last_time": last_time,
+            }
+    except Exception as e:
+        print(f"ERROR: Could not read state snapshot {path}: {e}")
+        return None
+
+    config = get_config() if config is None else config
+    if state["last_date"] < config.HISTORICAL_DATA_START_DATE:
+        print(f"INFO: State snapshot {path} is older than the historical window, ignoring it.")
+        return None
+    return state
+
+
+def restore_windows(state, rolling_vols, price_diff_window):
+    """
+    Refill the rolling windows from a loaded snapshot.
+
+    Args:
+        state (dict): Snapshot returned by load_state.
+        rolling_vols (VolatilityEstimator, RollingWindow or deque): Estimator to rebuild.
+        price_diff_window (RollingWindow or deque): Window to refill with past price differences.
+    """
+    rolling_vols.clear()
+    rolling_vols.extend(state["rolling_vols"])
+    price_diff_window.clear()
+    price_diff_window.extend(state["price_diff_window"])
+
+
+def signal_counts(state):
+    """
+    (under_negative_one_count, over_positive_one_count) of a loaded snapshot, (0, 0) without one.
+    """
+    if state is None:
+        return 0, 0
+    return state["under_negative_one_count"], state["over_positive_one_count"]
+
+
+def advance_signal_counts(state, under_negative_one_count, over_positive_one_count):
+    """
+    Replace the signal counts of a loaded snapshot with the counts after the backfilled gap, so the live counters
+    continue from them. Does nothing without a snapshot.
+    """
+    if state is not None:
+        state["under_negative_one_count"] = under_negative_one_count
+        state["over_positive_one_count"] = over_positive_one_count
+
+
+class StateSnapshotter:
+    """
+    Writes rolling-state snapshots from the processing thread, at most once per interval.
+    """
+
+    def __init__(self, path, interval):
+        """
+        Args:
+            path (str): Snapshot file path.
+            interval (float): Minimum number of seconds between periodic snapshots.
+        """
+        self.path = path
+        self.interval = interval
+        self._last_save = time.monotonic()
+
+    def save(self, rolling_vols, price_diff_window, under_negative_one_count, over_positive_one_count,
+             last_date, last_time):
+        """
+        Write a snapshot now. Errors are reported and otherwise ignored so trading is never interrupted.
+        """
+        try:
+            save_state(self.path, rolling_vols, price_diff_window, under_negative_one_count,
+                       over_positive_one_count, last_date, last_time)
+        except Exception as e:
+            print(f"ERROR: Could not write state snapshot {self.path}: {e}")
+        self._last_save = time.monotonic()
+
+    def maybe_save(self, rolling_vols, price_diff_window, under_negative_one_count, over_positive_one_count,
+                   last_date, last_time):
+        """
+        Write a snapshot if at least interval seconds passed since the previous one.
+        """
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save(rolling_vols, price_diff_window, under_negative_one_count, over_positive_one_count,
+                      last_date, last_time)
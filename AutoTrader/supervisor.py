@@ -0,0 +1,252 @@
+# supervisor.py
+#
+# Supervisor mode (main.py --mode supervisor): runs every instrument of the today-running table written by
+# FIND_MARKETS.py in one process instead of one main.py process per option. Each instrument keeps its own config,
+# rolling state, counters and queues; the TradingAPI, the order-book feed of each underlying, the portfolio
+# monitor, the config sync and the pricing code are shared.
+
+import glob
+import os
+import time
+from threading import Thread, Event
+
+import jdatetime
+import pandas as pd
+
+from channels import TickQueue, tick_handoff
+from config import get_config, the_config
+from config_syncing import config_sync_thread
+from data_merging import merge_historical_and_live_data
+from data_processing import processing_thread
+from error_counters import ErrorCounters
+from historical_data import UnderlyingHistoryCache, historical_data_thread
+from main import RESULT_COLUMNS, create_rolling_state
+from market_feed import OrderBookFetcher, UnderlyingFeed, underlying_feed_thread
+from net_worth_monitor import monitor_net_worth
+from result_handling import result_handling_thread
+from signal_handling import signal_handling_thread
+from state_store import signal_counts, advance_signal_counts
+from trading_api import TradingAPI
+
+TODAY_RUNNING_FOLDER = "market database folder"
+
+
+def latest_today_running_file(folder=TODAY_RUNNING_FOLDER):
+    """
+    Path of the newest today_running_YYYYMMDD.xlsx written by FIND_MARKETS.py, or None if there is none.
+    """
+    files = sorted(glob.glob(os.path.join(folder, "today_running_*.xlsx")))
+    return files[-1] if files else None
+
+
+def load_instrument_configs(path):
+    """
+    Builds one config per option of a today-running table.
+
+    Args:
+        path (str): Excel file with the columns written by FIND_MARKETS.py.
+
+    Returns:
+        list: Instrument configs (see the_config.for_instrument), one per distinct OPTION_TICKER.
+    """
+    table = pd.read_excel(path, dtype={"OPTION_TICKER": str, "UNDERLYING_TICKER": str, "EXPIRATION_DATE": str})
+    configs = []
+    seen = set()
+    for _, row in table.iterrows():
+        option_ticker = row["OPTION_TICKER"]
+        if option_ticker in seen:
+            continue
+        if pd.isnull(row["UNDERLYING_TICKER"]) or row["CALL_PUT"] not in ('c', 'p'):
+            print(f"WARNING: Skipping {row['OPTION_NAME']}: unknown underlying or option type.")
+            continue
+        seen.add(option_ticker)
+        configs.append(the_config.for_instrument(
+            underlying_name=row["UNDERLYING_NAME"],
+            underlying_ticker=row["UNDERLYING_TICKER"],
+            option_name=row["OPTION_NAME"],
+            option_ticker=option_ticker,
+            expiration_date=row["EXPIRATION_DATE"].replace("/", "-"),
+            strike_price=float(row["STRIKE_PRICE"]),
+            call_put=row["CALL_PUT"],
+            can_trade_in_same_direction=bool(row["CAN_TRADE_IN_SAME_DIRECTION"]),
+        ))
+    return configs
+
+
+class InstrumentRunner:
+    """
+    Pipeline of one option in supervisor mode.
+
+    Runs the same processing, signal and result threads as main() with the instrument's config, plus a warm-up
+    thread that downloads and merges its historical data the way main() does before processing starts. Ticks
+    arrive in data_queue from the UnderlyingFeed of the instrument's underlying.
+    """
+
+    def __init__(self, config, api, stop_event, history_cache=None):
+        """
+        Args:
+            config: Instrument config from the_config.for_instrument.
+            api (TradingAPI): TradingAPI shared by all instruments.
+            stop_event (Event): Stop event shared by all instruments.
+            history_cache (UnderlyingHistoryCache, optional): Underlying histories shared by all instruments.
+        """
+        self.config = config
+        self.api = api
+        self.stop_event = stop_event
+        self.history_cache = history_cache
+        self.counters = ErrorCounters()
+
+        (self.rolling_vols, self.price_diff_window, self.snapshotter, self.restored_state,
+         self.resume_after) = create_rolling_state(config)
+
+        self.data_queue = tick_handoff(config)
+        self.result_queue = TickQueue()
+        self.signal_queue = TickQueue(maxlen=config.MAX_SIZE)
+        self.processing_ready_event = Event()
+        self.threads = []
+
+    def start(self):
+        self._start_thread("processing", processing_thread, (
+            self.data_queue, self.result_queue, self.signal_queue, self.counters, self.processing_ready_event,
+            self.rolling_vols, self.price_diff_window, self.stop_event, self.snapshotter, self.restored_state,
+            self.config))
+        self._start_thread("signals", signal_handling_thread,
+                           (self.signal_queue, self.stop_event, self.config, self.api, self.counters))
+        # The merge waits for the first live tick, so it may never return; do not let it block the shutdown
+        self._start_thread("warm-up", self._warm_up, (), daemon=True)
+
+    def _start_thread(self, stage, target, args, daemon=False):
+        thread = Thread(target=target, args=args, name=f"{self.config.OPTION_NAME}-{stage}", daemon=daemon)
+        thread.start()
+        if not daemon:
+            self.threads.append(thread)
+
+    def _warm_up(self):
+        """
+        Merges the historical data into the rolling state, then starts processing and result handling. If the merge
+        fails, the error is counted and the instrument starts from live data only, as in worker-pool mode.
+        """
+        data = pd.DataFrame(columns=RESULT_COLUMNS)
+        try:
+            if self.config.USE_HISTORICAL:
+                historical_data_container = {}
+                historical_data_thread(Event(), historical_data_container, self.stop_event, self.config,
+                                       self.history_cache)
+                if self.stop_event.is_set():
+                    return
+                merged = merge_historical_and_live_data(
+                    self.data_queue, historical_data_container, RESULT_COLUMNS, self.rolling_vols,
+                    self.price_diff_window, Event(), self.counters, self.resume_after, self.config,
+                    signal_counts(self.restored_state)
+                )
+                if merged is not None:
+                    data, under_negative_one_count, over_positive_one_count = merged
+                    advance_signal_counts(self.restored_state, under_negative_one_count, over_positive_one_count)
+        except Exception as e:
+            self.counters.try_except_counter += 1
+            print(f"ERROR: Warm-up of {self.config.OPTION_NAME} failed, continuing with live data only: {e}")
+            data = pd.DataFrame(columns=RESULT_COLUMNS)
+        finally:
+            if not self.stop_event.is_set():
+                if self.config.USE_HISTORICAL:
+                    self.data_queue.clear()
+                    print(f"INFO: {self.config.OPTION_NAME}: cleared data_queue after the historical warm-up.")
+                self._start_thread("results", result_handling_thread,
+                                   (self.result_queue, data, self.stop_event, self.config))
+            self.processing_ready_event.set()
+
+    def stop(self):
+        """
+        Wakes the threads blocked on their queues or on the warm-up, once stop_event is set.
+        """
+        for queue in (self.data_queue, self.signal_queue, self.result_queue):
+            queue.close()
+        self.processing_ready_event.set()
+
+    def join(self):
+        for thread in list(self.threads):
+            thread.join()
+
+
+def run_supervisor(today_running_path=None):
+    """
+    Runs all instruments of a today-running table until VALID_TIME_END or Ctrl+C.
+
+    Args:
+        today_running_path (str, optional): Today-running Excel file, the newest one in TODAY_RUNNING_FOLDER by
+            default.
+    """
+    config = get_config()
+    path = today_running_path or latest_today_running_file()
+    if path is None or not os.path.exists(path):
+        print(f"ERROR: No today-running table found (run FIND_MARKETS.py first): {path}")
+        return
+
+    configs = load_instrument_configs(path)
+    if not configs:
+        print(f"ERROR: No instruments to run in {path}.")
+        return
+    print(f"INFO: Supervisor running {len(configs)} instruments on "
+          f"{len({c.UNDERLYING_TICKER for c in configs})} underlyings from {path}:")
+    for instrument in configs:
+        print(f"INFO:   {instrument.OPTION_NAME} ({instrument.OPTION_TICKER}) on {instrument.UNDERLYING_NAME}, "
+              f"strike {instrument.STRIKE_PRICE}, expiry {instrument.EXPIRATION_DATE}, {instrument.CALL_PUT}")
+
+    api = TradingAPI()
+    stop_event = Event()
+    # The underlying's history is downloaded once for all the options on it
+    history_cache = UnderlyingHistoryCache()
+    runners = [InstrumentRunner(instrument, api, stop_event, history_cache) for instrument in configs]
+    for runner in runners:
+        runner.start()
+
+    # One feed per underlying: its book is fetched once per tick for all the options on it, and their implied
+    # volatilities are solved as one OptionChain. All feeds share one fetcher, so the process has a single pool of
+    # FETCH_WORKERS request threads.
+    fetcher = OrderBookFetcher(api)
+    feeds = {}
+    for runner in runners:
+        ticker = runner.config.UNDERLYING_TICKER
+        if ticker not in feeds:
+            feeds[ticker] = UnderlyingFeed(api, ticker, fetcher)
+        feeds[ticker].subscribe(runner.config.OPTION_TICKER, runner.data_queue, runner.config)
+    feed_counters = ErrorCounters()
+    feed_threads = [Thread(target=underlying_feed_thread, args=(feed, feed_counters, stop_event),
+                           name=f"{ticker}-feed") for ticker, feed in feeds.items()]
+    for thread in feed_threads:
+        thread.start()
+
+    # One portfolio request and one pass over the risk files per second serve all instruments
+    net_worth_thread = Thread(target=monitor_net_worth, args=(stop_event, configs, api),
+                              name="NetWorthMonitorThread")
+    net_worth_thread.start()
+    config_syncing = Thread(target=config_sync_thread, args=(stop_event, configs))
+    config_syncing.start()
+
+    try:
+        while not stop_event.is_set():
+            if jdatetime.datetime.now().time() > config.VALID_TIME_END:
+                print("INFO: Current time has passed VALID_TIME_END, initiating graceful shutdown.")
+                break
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("INFO: Processing stopped by user, initiating graceful shutdown.")
+    finally:
+        stop_event.set()
+        for runner in runners:
+            runner.stop()
+        for thread in feed_threads:
+            thread.join()
+        fetcher.close()
+        for runner in runners:
+            runner.join()
+        net_worth_thread.join()
+        config_syncing.join()
+
+        print(f"INFO: Errors in the market feeds: {feed_counters.try_except_counter}")
+        if fetcher.late_legs:
+            print(f"WARNING: {fetcher.late_legs} order books missed the fetch deadline.")
+        for runner in runners:
+            print(f"INFO: Counters of {runner.config.OPTION_NAME}:")
+            runner.counters.report()
+        print("INFO: Program terminated gracefully.")
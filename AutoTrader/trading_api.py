@@ -2,12 +2,323 @@
 
 import json
 import time
+from threading import Lock
+from urllib.parse import urlsplit
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional, List
 from config import get_config
 
+_sessions = {}
+_sessions_lock = Lock()
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Returns the shared session of the host of url, creating it on first use.
+
+    Every host (BASE_URL, MARKET_URL, MDAPI_URL, ...) gets one session whose connection pool keeps up to
+    max(HTTP_POOL_SIZE, FETCH_WORKERS) connections alive, so repeated requests reuse an open TCP/TLS connection
+    instead of a new handshake each time, and every thread of the shared order-book fetcher has its own connection.
+    The pool blocks when it is exhausted: a request waits for a free connection instead of opening one that would
+    be closed again afterwards. Sessions are shared by all threads and TradingAPI instances of the process.
+
+    Args:
+        url (str): Any URL on the host.
+
+    Returns:
+        requests.Session: The host's session.
+    """
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            config = get_config()
+            # Retries are done by TradingAPI._make_request
+            pool_size = max(config.HTTP_POOL_SIZE, config.FETCH_WORKERS)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0, pool_block=True)
+            session = requests.Session()
+            session.mount(f"{parts.scheme}://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def close_sessions():
+    """
+    Closes the shared sessions and their connections.
+    """
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def parse_order_book(response: Optional[dict], ticker: str) -> Optional[List[float]]:
+    """
+    Extracts the best limits from a BestLimitWithSize response.
+
+    Args:
+        response (Optional[dict]): The JSON response, None if the request failed.
+        ticker (str): The ISIN ticker symbol (for messages).
+
+    Returns:
+        Optional[List[float]]: A list containing [sell_volume, sell_price, buy_price, buy_volume].
+    """
+    if response:
+        try:
+            buy = response.get('buy', [])
+            sell = response.get('sell', [])
+
+            # Handle cases where either buy or sell is empty
+            if buy and sell:
+                buy_data = buy[0]
+                sell_data = sell[0]
+                return [sell_data['v'], sell_data['p'], buy_data['p'], buy_data['v']]
+            elif sell:
+                sell_data = sell[0]
+                return [sell_data['v'], sell_data['p'], sell_data['p'], sell_data['v']]
+            elif buy:
+                buy_data = buy[0]
+                return [buy_data['v'], buy_data['p'], buy_data['p'], buy_data['v']]
+            else:
+                print(f"WARNING: No buy or sell data available for ticker {ticker}.")
+        except (KeyError, IndexError) as e:
+            print(f"ERROR: Error extracting order book data for {ticker}: {e}")
+    return None
+
+
+def parse_open_orders(response: Optional[list]) -> Optional[List[dict]]:
+    """
+    Keeps only the necessary fields of a GetOpenOrders response.
+
+    Args:
+        response (Optional[list]): The JSON response, None if the request failed.
+
+    Returns:
+        Optional[List[dict]]: A list of processed open orders if successful, else None.
+    """
+    if response:
+        try:
+            # Process each order in the response
+            processed_orders = []
+            for order in response:
+                processed_order = {
+                    'isin': order.get('isin'),
+                    'orderSide': int(order.get('orderSide', 0)),
+                    'remainedVolume': int(order.get('remainedVolume', 0)),
+                    'price': float(order.get('price', 0.0)),
+                    'serialNumber': int(order.get('serialNumber', 0)),
+                }
+                processed_orders.append(processed_order)
+            return processed_orders
+        except Exception as e:
+            print(f"ERROR: Error processing open orders: {e}")
+            return None
+    else:
+        return None
+
+
+def parse_net_worth_balance(response: Optional[list], option_ticker: str) -> tuple[float, float]:
+    """
+    Computes the net worth and volume of one option from a Portfolio response.
+
+    Args:
+        response (Optional[list]): The JSON response, None if the request failed.
+        option_ticker (str): The ISIN ticker symbol of the option.
+
+    Returns:
+        tuple[float, float]: The computed net worth and volume, (0, 0.0) if there is no usable position.
+    """
+    if response:
+        try:
+            # print("INFO: Retrieved portfolio positions successfully.")
+            for position in response:
+                if position.get('isin') == option_ticker:
+                    net_worth_balance = int(position.get('netWorthBalance', 0))
+                    option_margin_block_amount = int(position.get('optionMarginBlockAmount', 0))
+                    buy_volume = float(position.get('buyVolume', 0.0))
+                    sell_volume = float(position.get('sellVolume', 0.0))
+
+                    # Calculate volume based on buyVolume and sellVolume
+                    if sell_volume == 0:
+                        volume = int(buy_volume)
+                    elif buy_volume == 0:
+                        volume = int(-sell_volume)
+                    else:
+                        volume = int(buy_volume - sell_volume)
+
+                    if option_margin_block_amount == 0 and net_worth_balance > 0:
+                        # print(f"INFO: netWorthBalance for {option_ticker} is {net_worth_balance}")
+                        return net_worth_balance, volume
+
+                    elif option_margin_block_amount != 0 and net_worth_balance < 0:
+                        adjusted_net_worth = -option_margin_block_amount
+                        # print(f"INFO: Adjusted net worth for {option_ticker} is {adjusted_net_worth}")
+                        return adjusted_net_worth, volume
+
+                    else:
+                        print("ERROR: Conditions not met for calculating net worth.")
+                        return 0, volume
+
+            # print(f"WARNING: No position found for ISIN {option_ticker}.")
+        except (KeyError, TypeError) as e:
+            print(f"ERROR: Error processing portfolio positions: {e}")
+    else:
+        print("ERROR: Failed to retrieve portfolio positions.")
+
+    return 0, 0.0
+
+
+def parse_net_worth_balances(response: Optional[list], option_tickers: List[str]) -> Optional[dict]:
+    """
+    Computes the net worth and volume of several options from one Portfolio response.
+
+    Args:
+        response (Optional[list]): The JSON response, None if the request failed.
+        option_tickers (List[str]): The ISIN ticker symbols of the options.
+
+    Returns:
+        Optional[dict]: The (net worth, volume) tuple of parse_net_worth_balance per ticker, None if the request
+        failed.
+    """
+    if response is None:
+        print("ERROR: Failed to retrieve portfolio positions.")
+        return None
+    if not response:
+        return {option_ticker: (0, 0.0) for option_ticker in option_tickers}  # no open positions
+    return {option_ticker: parse_net_worth_balance(response, option_ticker) for option_ticker in option_tickers}
+
+
+def order_payload(ticker: str, price: float, volume: int, side: str, serial_number: Optional[int] = None) -> dict:
+    """
+    Body of a NewOrder request, or of an EditOrder request when serial_number is given.
+    """
+    data = {
+        "validity": 1,  # Assuming 'validity' is 'Day' order
+        "validityDate": None,
+        "price": price,
+        "volume": volume,
+        "side": 1 if side.lower() == 'buy' else 2,
+        "isin": ticker,
+        "accountType": 1  # Adjust account type if necessary
+    }
+    if serial_number is not None:
+        data["serialNumber"] = serial_number
+    return data
+
+
+def find_open_order(open_orders: Optional[List[dict]], ticker: str, side: str) -> Optional[dict]:
+    """
+    The open order on one side of a ticker, as returned by parse_open_orders.
+
+    Args:
+        open_orders (Optional[List[dict]]): Processed open orders.
+        ticker (str): The ISIN ticker symbol.
+        side (str): 'buy' or 'sell'.
+
+    Returns:
+        Optional[dict]: The first matching order (only one per ticker and side is expected), None if there is none.
+    """
+    order_side = 1 if side == 'buy' else 2
+    for order in open_orders or []:
+        if order['orderSide'] == order_side and order['isin'] == ticker:
+            return order
+    return None
+
+
+def parse_portfolio_options(response: Optional[list]) -> Optional[pd.DataFrame]:
+    """
+    Builds the option table of a Portfolio response, see TradingAPI.get_portfolio_options_df.
+    """
+    if not response:
+        print("No response received from portfolio options API.")
+        return None
+
+    processed_data = []
+    for item in response:
+        option_ticker = item.get("isin", "")
+        option_name = item.get("symbol", "")
+        # Use physicalSettlementDateJalali if available; otherwise try cashSettlementDateJalali.
+        expiration_date = item.get("physicalSettlementDateJalali", item.get("cashSettlementDateJalali", ""))
+        strike_price = item.get("strikePrice", 0)
+
+        # Determine CALL_PUT based on the starting letter of the symbol:
+        # If symbol starts with 'ض' then it's a call, if it starts with 'ط' then it's a put.
+        if option_name.startswith("ض"):
+            call_put = "c"
+        elif option_name.startswith("ط"):
+            call_put = "p"
+        else:
+            call_put = ""
+
+        processed_data.append({
+            "OPTION_NAME": option_name,
+            "OPTION_TICKER": option_ticker,
+            "EXPIRATION_DATE": expiration_date,
+            "STRIKE_PRICE": strike_price,
+            "CALL_PUT": call_put
+        })
+
+    return pd.DataFrame(processed_data)
+
+
+def parse_portfolio_balances(response: Optional[list]) -> Optional[pd.DataFrame]:
+    """
+    Builds the ISIN / NET table of a Portfolio response, see TradingAPI.portfo_analyse.
+    """
+    if not response:
+        print("No response received from portfolio options API.")
+        return None
+
+    processed_data = []
+    for item in response:
+        processed_data.append({
+            "ISIN": item.get("isin", ""),
+            "NET": item.get("netWorthBalance", 0),
+        })
+
+    return pd.DataFrame(processed_data)
+
+
+def parse_total_balance(portfolio_response: Optional[list], tradingbook_response: Optional[dict]) -> Optional[float]:
+    """
+    Sums the netWorthBalance of a Portfolio response and the 'remain' of a GetLastTradingBook response, see
+    TradingAPI.calculate_total_balance. A failed request counts as 0.
+    """
+    total_net_worth = 0.0
+
+    if portfolio_response:
+        try:
+            for position in portfolio_response:
+                net_balance = position.get("netWorthBalance", 0)
+                total_net_worth += float(net_balance)
+        except (ValueError, TypeError) as e:
+            print(f"ERROR: Error processing portfolio netWorthBalance: {e}")
+            return None
+    else:
+        print("ERROR: Failed to retrieve portfolio options.")
+        # If the portfolio request fails, assume 0 for net worth.
+
+    remain_value = 0.0
+
+    if tradingbook_response:
+        try:
+            remain_value = float(tradingbook_response.get("remain", 0))
+        except (ValueError, TypeError) as e:
+            print(f"ERROR: Error processing trading book 'remain' value: {e}")
+            return None
+    else:
+        print("ERROR: Failed to retrieve trading book data.")
+        # If the trading book request fails, assume 0 for remain.
+
+    total_balance = total_net_worth + remain_value
+    print(
+        f"INFO: Total net worth from portfolio: {total_net_worth}, remain from trading book: {remain_value}, total: {total_balance}")
+    return total_balance
+
 
 class TradingAPI:
     """
@@ -22,6 +333,7 @@ class TradingAPI:
         self.max_retries = config.MAX_RETRIES
         self.option_ticker = config.OPTION_TICKER
         self.mdapi_url = config.MDAPI_URL  # Assign the Market Data API URL
+        self.timeout = (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
 
     def _make_request(self, method: str, url: str, data: Optional[dict] = None) -> Optional[dict]:
         config = get_config()
@@ -39,9 +351,10 @@ class TradingAPI:
         for attempt in range(1, self.max_retries + 1):
             try:
                 if method.upper() == 'POST':
-                    response = requests.post(url, headers=self.headers, data=json.dumps(data))
+                    response = get_session(url).post(url, headers=self.headers, data=json.dumps(data),
+                                                     timeout=self.timeout)
                 elif method.upper() == 'GET':
-                    response = requests.get(url, headers=self.headers)
+                    response = get_session(url).get(url, headers=self.headers, timeout=self.timeout)
                 else:
                     print(f"ERROR: Unsupported HTTP method: {method}")
                     return None
@@ -67,28 +380,7 @@ class TradingAPI:
         url = f"{self.market_url}/Queue/BestLimitWithSize?isin={ticker}"
 
         response = self._make_request('GET', url)
-
-        if response:
-            try:
-                buy = response.get('buy', [])
-                sell = response.get('sell', [])
-
-                # Handle cases where either buy or sell is empty
-                if buy and sell:
-                    buy_data = buy[0]
-                    sell_data = sell[0]
-                    return [sell_data['v'], sell_data['p'], buy_data['p'], buy_data['v']]
-                elif sell:
-                    sell_data = sell[0]
-                    return [sell_data['v'], sell_data['p'], sell_data['p'], sell_data['v']]
-                elif buy:
-                    buy_data = buy[0]
-                    return [buy_data['v'], buy_data['p'], buy_data['p'], buy_data['v']]
-                else:
-                    print(f"WARNING: No buy or sell data available for ticker {ticker}.")
-            except (KeyError, IndexError) as e:
-                print(f"ERROR: Error extracting order book data for {ticker}: {e}")
-        return None
+        return parse_order_book(response, ticker)
 
     def place_order(self, ticker: str, price: float, quantity: int, side: str) -> Optional[dict]:
         """
@@ -104,16 +396,7 @@ class TradingAPI:
             Optional[dict]: The API response if successful, else None.
         """
         url = f"{self.base_url}/orders/NewOrder"
-        data = {
-            "validity": 1,  # Assuming 'validity' is 'Day' order
-            "validityDate": None,
-            "price": price,
-            "volume": quantity,
-            "side": 1 if side.lower() == 'buy' else 2,
-            "isin": ticker,
-            "accountType": 1  # Adjust account type if necessary
-        }
-        response = self._make_request('POST', url, data)
+        response = self._make_request('POST', url, order_payload(ticker, price, quantity, side))
         if response:
             print(f"INFO: Placed {side} order for {ticker} at price {price} and volume {quantity}.")
         else:
@@ -135,17 +418,7 @@ class TradingAPI:
             Optional[dict]: The API response if successful, else None.
         """
         url = f"{self.base_url}/orders/EditOrder"
-        data = {
-            "validity": 1,  # Assuming 'validity' is 'Day' order
-            "validityDate": None,
-            "price": price,
-            "volume": volume,
-            "side": 1 if side.lower() == 'buy' else 2,
-            "isin": ticker,
-            "accountType": 1,  # Adjust account type if necessary
-            "serialNumber": order_id
-        }
-        response = self._make_request('POST', url, data)
+        response = self._make_request('POST', url, order_payload(ticker, price, volume, side, order_id))
         if response:
             print(f"INFO: Modified {side} order {order_id} for {ticker} to price {price} and volume {volume}.")
         else:
@@ -161,25 +434,7 @@ class TradingAPI:
         """
         url = f"{self.base_url}/orders/GetOpenOrders"
         response = self._make_request('GET', url)
-        if response:
-            try:
-                # Process each order in the response
-                processed_orders = []
-                for order in response:
-                    processed_order = {
-                        'isin': order.get('isin'),
-                        'orderSide': int(order.get('orderSide', 0)),
-                        'remainedVolume': int(order.get('remainedVolume', 0)),
-                        'price': float(order.get('price', 0.0)),
-                        'serialNumber': int(order.get('serialNumber', 0)),
-                    }
-                    processed_orders.append(processed_order)
-                return processed_orders
-            except Exception as e:
-                print(f"ERROR: Error processing open orders: {e}")
-                return None
-        else:
-            return None
+        return parse_open_orders(response)
 
     def buy(self, ticker: str, price: float, quantity: int) -> None:
         """
@@ -190,36 +445,16 @@ class TradingAPI:
             price (float): The desired price for the buy order.
             quantity (int): The desired quantity for the buy order.
         """
-        open_orders = self.fetch_open_orders()
-        if not open_orders:
-            # No open orders, place a new buy order
-            self.place_order(ticker, price, quantity, 'buy')
-            return
-
-        # Check if there is an existing buy order for the ticker
-        buy_orders = [
-            order for order in open_orders
-            if order['orderSide'] == 1 and order['isin'] == ticker
-        ]
-
-        if not buy_orders:
+        order = find_open_order(self.fetch_open_orders(), ticker, 'buy')
+        if order is None:
             # No existing buy order for the ticker, place a new one
             self.place_order(ticker, price, quantity, 'buy')
-            return
-
-        # Modify the existing buy order
-        for order in buy_orders:
-            current_price = order['price']
-            current_quantity = order['remainedVolume']
-            serial_number = order['serialNumber']
-
-            if price != current_price or quantity != current_quantity:
-                # Modify the order to the desired price and quantity
-                self.modify_order(price, serial_number, quantity, ticker, 'buy')
-            else:
-                # Order already at desired price and quantity, no action needed
-                print(f"INFO: Buy order for {ticker} already at desired price and quantity.")
-            return  # Assuming only one buy order per ticker
+        elif price != order['price'] or quantity != order['remainedVolume']:
+            # Modify the order to the desired price and quantity
+            self.modify_order(price, order['serialNumber'], quantity, ticker, 'buy')
+        else:
+            # Order already at desired price and quantity, no action needed
+            print(f"INFO: Buy order for {ticker} already at desired price and quantity.")
 
     def sell(self, ticker: str, price: float, quantity: int) -> None:
         """
@@ -230,36 +465,16 @@ class TradingAPI:
             price (float): The desired price for the sell order.
             quantity (int): The desired quantity for the sell order.
         """
-        open_orders = self.fetch_open_orders()
-        if not open_orders:
-            # No open orders, place a new sell order
-            self.place_order(ticker, price, quantity, 'sell')
-            return
-
-        # Check if there is an existing sell order for the ticker
-        sell_orders = [
-            order for order in open_orders
-            if order['orderSide'] == 2 and order['isin'] == ticker
-        ]
-
-        if not sell_orders:
+        order = find_open_order(self.fetch_open_orders(), ticker, 'sell')
+        if order is None:
             # No existing sell order for the ticker, place a new one
             self.place_order(ticker, price, quantity, 'sell')
-            return
-
-        # Modify the existing sell order
-        for order in sell_orders:
-            current_price = order['price']
-            current_quantity = order['remainedVolume']
-            serial_number = order['serialNumber']
-
-            if price != current_price or quantity != current_quantity:
-                # Modify the order to the desired price and quantity
-                self.modify_order(price, serial_number, quantity, ticker, 'sell')
-            else:
-                # Order already at desired price and quantity, no action needed
-                print(f"INFO: Sell order for {ticker} already at desired price and quantity.")
-            return  # Assuming only one sell order per ticker
+        elif price != order['price'] or quantity != order['remainedVolume']:
+            # Modify the order to the desired price and quantity
+            self.modify_order(price, order['serialNumber'], quantity, ticker, 'sell')
+        else:
+            # Order already at desired price and quantity, no action needed
+            print(f"INFO: Sell order for {ticker} already at desired price and quantity.")
 
     def cancel_orders(self, serial_numbers: List[int]) -> Optional[dict]:
         """
@@ -292,45 +507,22 @@ class TradingAPI:
         """
         url = f"{self.base_url}/positions/options/Portfolio"
         response = self._make_request('GET', url)
+        return parse_net_worth_balance(response, self.option_ticker)
 
-        if response:
-            try:
-                # print("INFO: Retrieved portfolio positions successfully.")
-                for position in response:
-                    if position.get('isin') == self.option_ticker:
-                        net_worth_balance = int(position.get('netWorthBalance', 0))
-                        option_margin_block_amount = int(position.get('optionMarginBlockAmount', 0))
-                        buy_volume = float(position.get('buyVolume', 0.0))
-                        sell_volume = float(position.get('sellVolume', 0.0))
-
-                        # Calculate volume based on buyVolume and sellVolume
-                        if sell_volume == 0:
-                            volume = int(buy_volume)
-                        elif buy_volume == 0:
-                            volume = int(-sell_volume)
-                        else:
-                            volume = int(buy_volume - sell_volume)
-
-                        if option_margin_block_amount == 0 and net_worth_balance > 0:
-                            # print(f"INFO: netWorthBalance for {self.option_ticker} is {net_worth_balance}")
-                            return net_worth_balance, volume
-
-                        elif option_margin_block_amount != 0 and net_worth_balance < 0:
-                            adjusted_net_worth = -option_margin_block_amount
-                            # print(f"INFO: Adjusted net worth for {self.option_ticker} is {adjusted_net_worth}")
-                            return adjusted_net_worth, volume
-
-                        else:
-                            print("ERROR: Conditions not met for calculating net worth.")
-                            return 0, volume
-
-                # print(f"WARNING: No position found for ISIN {self.option_ticker}.")
-            except (KeyError, TypeError) as e:
-                print(f"ERROR: Error processing portfolio positions: {e}")
-        else:
-            print("ERROR: Failed to retrieve portfolio positions.")
+    def get_net_worth_balances(self, option_tickers: List[str]) -> Optional[dict]:
+        """
+        Retrieves the net worth and volume of several options with a single portfolio request.
 
-        return 0, 0.0
+        Args:
+            option_tickers (List[str]): The ISIN ticker symbols of the options.
+
+        Returns:
+            Optional[dict]: The (net worth, volume) tuple of get_net_worth_balance per ticker, None if the
+            portfolio could not be retrieved.
+        """
+        url = f"{self.base_url}/positions/options/Portfolio"
+        response = self._make_request('GET', url)
+        return parse_net_worth_balances(response, option_tickers)
 
     def get_option_details_from_mdpapi(self, option_id: str) -> Optional[dict]:
         """
@@ -361,38 +553,7 @@ class TradingAPI:
             pd.DataFrame: DataFrame with the processed portfolio option data.
         """
         url = f"{self.base_url}/positions/options/Portfolio"
-        response = self._make_request('GET', url)
-
-        if not response:
-            print("No response received from portfolio options API.")
-            return None
-
-        processed_data = []
-        for item in response:
-            option_ticker = item.get("isin", "")
-            option_name = item.get("symbol", "")
-            # Use physicalSettlementDateJalali if available; otherwise try cashSettlementDateJalali.
-            expiration_date = item.get("physicalSettlementDateJalali", item.get("cashSettlementDateJalali", ""))
-            strike_price = item.get("strikePrice", 0)
-
-            # Determine CALL_PUT based on the starting letter of the symbol:
-            # If symbol starts with 'ض' then it's a call, if it starts with 'ط' then it's a put.
-            if option_name.startswith("ض"):
-                call_put = "c"
-            elif option_name.startswith("ط"):
-                call_put = "p"
-            else:
-                call_put = ""
-
-            processed_data.append({
-                "OPTION_NAME": option_name,
-                "OPTION_TICKER": option_ticker,
-                "EXPIRATION_DATE": expiration_date,
-                "STRIKE_PRICE": strike_price,
-                "CALL_PUT": call_put
-            })
-
-        return pd.DataFrame(processed_data)
+        return parse_portfolio_options(self._make_request('GET', url))
 
     def portfo_analyse(self):
         """
@@ -407,20 +568,7 @@ class TradingAPI:
             pd.DataFrame: DataFrame with the processed portfolio analysis data.
         """
         url = f"{self.base_url}/positions/options/Portfolio"
-        response = self._make_request('GET', url)
-
-        if not response:
-            print("No response received from portfolio options API.")
-            return None
-
-        processed_data = []
-        for item in response:
-            processed_data.append({
-                "ISIN": item.get("isin", ""),
-                "NET": item.get("netWorthBalance", 0),
-            })
-
-        return pd.DataFrame(processed_data)
+        return parse_portfolio_balances(self._make_request('GET', url))
 
     def calculate_total_balance(self) -> Optional[float]:
         """
@@ -431,39 +579,23 @@ class TradingAPI:
             Optional[float]: The total balance computed by summing the netWorthBalance from portfolio
             and the 'remain' value from the trading book. Returns None if an error occurs.
         """
-        # Fetch portfolio options and sum netWorthBalance values.
+        # Fetch portfolio options and the trading book data
         portfolio_url = "https://api-bbi.ephoenix.ir/api/v2/positions/options/Portfolio"
         portfolio_response = self._make_request('GET', portfolio_url)
-        total_net_worth = 0.0
-
-        if portfolio_response:
-            try:
-                for position in portfolio_response:
-                    net_balance = position.get("netWorthBalance", 0)
-                    total_net_worth += float(net_balance)
-            except (ValueError, TypeError) as e:
-                print(f"ERROR: Error processing portfolio netWorthBalance: {e}")
-                return None
-        else:
-            print("ERROR: Failed to retrieve portfolio options.")
-            # If the portfolio request fails, assume 0 for net worth.
-
-        # Fetch the trading book data and extract the 'remain' value.
         tradingbook_url = "https://api-bbi.ephoenix.ir/api/v2/tradingbook/GetLastTradingBook"
         tradingbook_response = self._make_request('GET', tradingbook_url)
-        remain_value = 0.0
+        return parse_total_balance(portfolio_response, tradingbook_response)
 
-        if tradingbook_response:
-            try:
-                remain_value = float(tradingbook_response.get("remain", 0))
-            except (ValueError, TypeError) as e:
-                print(f"ERROR: Error processing trading book 'remain' value: {e}")
-                return None
-        else:
-            print("ERROR: Failed to retrieve trading book data.")
-            # If the trading book request fails, assume 0 for remain.
 
-        total_balance = total_net_worth + remain_value
-        print(
-            f"INFO: Total net worth from portfolio: {total_net_worth}, remain from trading book: {remain_value}, total: {total_balance}")
-        return total_balance
+_api_instance = None
+
+
+def get_trading_api():
+    """
+    Returns the TradingAPI shared by the code paths that are not handed one, such as the order functions of
+    signals.py.
+    """
+    global _api_instance
+    if _api_instance is None:
+        _api_instance = TradingAPI()
+    return _api_instance
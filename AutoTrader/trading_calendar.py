@@ -0,0 +1,183 @@
+# trading_calendar.py
+
+import datetime
+from functools import lru_cache
+
+import jdatetime
+import numpy as np
+import pandas as pd
+
+from config import get_config
+
+
+@lru_cache(maxsize=None)
+def jalali_to_gregorian(jalali_date: str) -> datetime.date:
+    """
+    Convert a Jalali date string to a Gregorian date. Results are memoized.
+
+    Args:
+        jalali_date (str): Date in Jalali calendar (YYYY-MM-DD).
+
+    Returns:
+        datetime.date: The Gregorian date.
+    """
+    return jdatetime.datetime.strptime(jalali_date, '%Y-%m-%d').togregorian().date()
+
+
+@lru_cache(maxsize=4096)
+def calendar_time_to_expiration(current_date: str, expiration_jalali_date: str) -> float:
+    """
+    Time to expiration in years counted in whole calendar days. Results are memoized per (date, expiry).
+
+    Args:
+        current_date (str): Current date in Jalali calendar (YYYY-MM-DD).
+        expiration_jalali_date (str): Expiration date in Jalali calendar (YYYY-MM-DD).
+
+    Returns:
+        float: Time to expiration in years.
+    """
+    days_to_expiration = (jalali_to_gregorian(expiration_jalali_date) - jalali_to_gregorian(current_date)).days
+    return days_to_expiration / 365  # Convert days to years
+
+
+def is_trading_day(jalali_date: str) -> bool:
+    """
+    Check whether the TSE is open on the given day (TRADING_WEEKDAYS and not in TRADING_HOLIDAYS).
+
+    Args:
+        jalali_date (str): Date in Jalali calendar (YYYY-MM-DD).
+
+    Returns:
+        bool: True if it is a trading day.
+    """
+    config = get_config()
+    return (jalali_to_gregorian(jalali_date).weekday() in config.TRADING_WEEKDAYS
+            and jalali_date not in config.TRADING_HOLIDAYS)
+
+
+@lru_cache(maxsize=4096)
+def trading_days_until_expiration(current_date: str, expiration_jalali_date: str) -> int:
+    """
+    Count the trading days strictly between the current date and the expiration date.
+
+    Args:
+        current_date (str): Current date in Jalali calendar (YYYY-MM-DD).
+        expiration_jalali_date (str): Expiration date in Jalali calendar (YYYY-MM-DD).
+
+    Returns:
+        int: Number of full trading sessions left after today and before expiration.
+    """
+    config = get_config()
+    holidays = {jalali_to_gregorian(day) for day in config.TRADING_HOLIDAYS}
+    day = jalali_to_gregorian(current_date) + datetime.timedelta(days=1)
+    expiration = jalali_to_gregorian(expiration_jalali_date)
+
+    count = 0
+    while day < expiration:
+        if day.weekday() in config.TRADING_WEEKDAYS and day not in holidays:
+            count += 1
+        day += datetime.timedelta(days=1)
+    return count
+
+
+def _session_seconds(current_time):
+    """
+    Seconds since midnight for a time given as datetime.time or 'HH:MM:SS' string.
+    """
+    if isinstance(current_time, str):
+        current_time = datetime.datetime.strptime(current_time, "%H:%M:%S").time()
+    return current_time.hour * 3600 + current_time.minute * 60 + current_time.second
+
+
+def _remaining_session_fraction(seconds):
+    """
+    Fraction of the TRADING_SESSION_START..TRADING_SESSION_END session still ahead at the given second of day.
+    """
+    config = get_config()
+    start = _session_seconds(config.TRADING_SESSION_START)
+    end = _session_seconds(config.TRADING_SESSION_END)
+    return np.clip((end - np.asarray(seconds, dtype=float)) / (end - start), 0.0, 1.0)
+
+
+def trading_time_to_expiration(current_date: str, current_time, expiration_jalali_date: str) -> float:
+    """
+    Intraday time to expiration in trading years.
+
+    Counts the remaining fraction of today's session (if today is a trading day) plus the full trading sessions
+    before the expiration date, divided by TRADING_DAYS_PER_YEAR. Like the calendar version it is 0 on the
+    expiration date itself.
+
+    Args:
+        current_date (str): Current date in Jalali calendar (YYYY-MM-DD).
+        current_time (datetime.time or str): Current time of day ('HH:MM:SS' if a string).
+        expiration_jalali_date (str): Expiration date in Jalali calendar (YYYY-MM-DD).
+
+    Returns:
+        float: Time to expiration in trading years.
+    """
+    if jalali_to_gregorian(current_date) >= jalali_to_gregorian(expiration_jalali_date):
+        return 0.0
+
+    sessions = trading_days_until_expiration(current_date, expiration_jalali_date)
+    if is_trading_day(current_date):
+        sessions += float(_remaining_session_fraction(_session_seconds(current_time)))
+    return sessions / get_config().TRADING_DAYS_PER_YEAR
+
+
+def time_to_expiration(current_date: str, expiration_jalali_date: str, current_time=None) -> float:
+    """
+    Time to expiration in years according to config.TIME_TO_EXPIRATION_MODE.
+
+    The trading-day mode is used only when current_time is given; otherwise the calendar-day value is returned.
+
+    Args:
+        current_date (str): Current date in Jalali calendar (YYYY-MM-DD).
+        expiration_jalali_date (str): Expiration date in Jalali calendar (YYYY-MM-DD).
+        current_time (datetime.time or str, optional): Current time of day.
+
+    Returns:
+        float: Time to expiration in years.
+    """
+    if current_time is not None and get_config().TIME_TO_EXPIRATION_MODE == 'trading':
+        return trading_time_to_expiration(current_date, current_time, expiration_jalali_date)
+    return calendar_time_to_expiration(current_date, expiration_jalali_date)
+
+
+def time_to_expiration_array(dates, expiration_jalali_date: str, times=None) -> np.ndarray:
+    """
+    Vectorized time to expiration for a whole column of Jalali dates (and optionally times).
+
+    Every distinct date is parsed only once. Dates that cannot be parsed get 0.0, as in
+    helpers.calculate_time_to_expiration.
+
+    Args:
+        dates (array-like): Jalali dates (YYYY-MM-DD).
+        expiration_jalali_date (str): Expiration date in Jalali calendar (YYYY-MM-DD).
+        times (array-like, optional): Times of day ('HH:MM:SS'), used in the 'trading' mode.
+
+    Returns:
+        np.ndarray: Time to expiration in years for every row.
+    """
+    config = get_config()
+    unique_dates, inverse = np.unique(np.asarray(dates, dtype=str), return_inverse=True)
+    trading_mode = times is not None and config.TIME_TO_EXPIRATION_MODE == 'trading'
+
+    per_date = np.zeros(len(unique_dates))
+    open_today = np.zeros(len(unique_dates), dtype=bool)
+    for i, date in enumerate(unique_dates):
+        try:
+            if trading_mode:
+                if jalali_to_gregorian(date) < jalali_to_gregorian(expiration_jalali_date):
+                    per_date[i] = trading_days_until_expiration(date, expiration_jalali_date)
+                    open_today[i] = is_trading_day(date)
+            else:
+                per_date[i] = calendar_time_to_expiration(date, expiration_jalali_date)
+        except Exception as e:
+            print(f"ERROR: Error calculating time to expiration: {e}")
+
+    if not trading_mode:
+        return per_date[inverse]
+
+    seconds = pd.to_timedelta(pd.Series(times, dtype=str)).dt.total_seconds().to_numpy()
+    sessions = per_date[inverse] + np.where(open_today[inverse], _remaining_session_fraction(seconds), 0.0)
+    return sessions / config.TRADING_DAYS_PER_YEAR
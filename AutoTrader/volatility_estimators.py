@@ -0,0 +1,287 @@
+# volatility_estimators.py
+
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+from config import get_config
+from rolling_window import RollingWindow
+
+
+def smoothing_alpha(smoothing_param) -> float:
+    """
+    EMA smoothing factor for a SMOOTHING_PARAM value.
+
+    As in the old analysis tool, a value in (0, 1] is used as alpha directly. A window length N > 1 is converted
+    to the EMA with the same center of mass as an N-point SMA, alpha = 2 / (N + 1).
+
+    Args:
+        smoothing_param (float): Alpha in (0, 1] or a window length > 1.
+
+    Returns:
+        float: The smoothing factor.
+    """
+    if 0 < smoothing_param <= 1:
+        return float(smoothing_param)
+    if smoothing_param > 1:
+        return 2.0 / (smoothing_param + 1.0)
+    raise ValueError("smoothing_param must be a float (0 < smoothing_param <= 1) or a window length > 1.")
+
+
+class VolatilityEstimator(ABC):
+    """
+    Base class of the incremental estimators of volatility from past implied volatilities.
+
+    Every estimator follows the "estimate from past values only" contract of
+    helpers.calculate_estimated_volatility: estimate() only reflects values passed to append() before, and NaN
+    values are skipped. Appending costs O(1).
+
+    Estimators behave like the deque of implied volatilities they replace: iterating yields the values that
+    rebuild the estimator through clear() and extend() (so they can be snapshotted by state_store), len() is the
+    number of those values and [-1] the most recent one.
+    """
+
+    @abstractmethod
+    def estimate(self) -> float:
+        """
+        Current estimate, NaN before the first value.
+        """
+
+    @abstractmethod
+    def append(self, implied_vol):
+        """
+        Add an implied volatility.
+        """
+
+    @abstractmethod
+    def state(self) -> np.ndarray:
+        """
+        Values that rebuild the estimator through extend().
+        """
+
+    @abstractmethod
+    def clear(self):
+        """
+        Forget all values.
+        """
+
+    @abstractmethod
+    def estimate_batch(self, implied_vols) -> np.ndarray:
+        """
+        Columnar replay of a series of implied volatilities.
+
+        Equivalent to calling estimate() and then append() for every element, but computed as whole-column
+        operations.
+
+        Args:
+            implied_vols (np.ndarray): Implied volatilities in time order (NaN values are skipped).
+
+        Returns:
+            np.ndarray: The estimate before each element.
+        """
+
+    def extend(self, implied_vols):
+        """
+        Add several implied volatilities in order.
+        """
+        for implied_vol in implied_vols:
+            self.append(implied_vol)
+
+    def __len__(self):
+        return len(self.state())
+
+    def __iter__(self):
+        return iter(self.state())
+
+    def __getitem__(self, index):
+        return self.state()[index]
+
+
+class SMAVolatilityEstimator(VolatilityEstimator):
+    """
+    Simple moving average of the last window_size implied volatilities.
+    """
+
+    def __init__(self, window_size):
+        """
+        Args:
+            window_size (int): Number of past implied volatilities averaged.
+        """
+        self.window = RollingWindow(maxlen=window_size)
+
+    def estimate(self) -> float:
+        return self.window.mean()
+
+    def append(self, implied_vol):
+        if not pd.isnull(implied_vol):
+            self.window.append(implied_vol)
+
+    def state(self) -> np.ndarray:
+        return self.window.values()
+
+    def clear(self):
+        self.window.clear()
+
+    def estimate_batch(self, implied_vols) -> np.ndarray:
+        implied_vols = np.asarray(implied_vols, dtype=float)
+        present = ~np.isnan(implied_vols)
+        history = np.concatenate([self.state(), implied_vols[present]])
+        if len(history) == 0:
+            return np.full(implied_vols.shape, np.nan)
+        means = pd.Series(history).rolling(self.window.maxlen, min_periods=1).mean().to_numpy()
+
+        # Index of the last value before each element; -1 while there is none.
+        last = len(self.window) + np.cumsum(present) - present - 1
+        estimates = np.where(last >= 0, means[np.maximum(last, 0)], np.nan)
+
+        self.window.clear()
+        self.window.extend(history[-self.window.maxlen:])
+        return estimates
+
+
+class EMAVolatilityEstimator(VolatilityEstimator):
+    """
+    Exponential moving average of implied volatilities, initialized with the first value.
+    """
+
+    def __init__(self, alpha):
+        """
+        Args:
+            alpha (float): Smoothing factor in (0, 1].
+        """
+        self.alpha = alpha
+        self.level = np.nan
+
+    def estimate(self) -> float:
+        return self.level
+
+    def append(self, implied_vol):
+        if pd.isnull(implied_vol):
+            return
+        if np.isnan(self.level):
+            self.level = float(implied_vol)
+        else:
+            self.level = self.alpha * implied_vol + (1 - self.alpha) * self.level
+
+    def state(self) -> np.ndarray:
+        return np.array([] if np.isnan(self.level) else [self.level])
+
+    def clear(self):
+        self.level = np.nan
+
+    def estimate_batch(self, implied_vols) -> np.ndarray:
+        levels = _ewm_levels(np.asarray(implied_vols, dtype=float), self.alpha, self.level)
+        self.level = float(levels[-1])
+        return levels[:-1]
+
+
+class EWMAVarianceEstimator(VolatilityEstimator):
+    """
+    Exponentially weighted moving average of implied variances (RiskMetrics-style): the estimate is the square root
+    of the EWMA of squared implied volatilities, i.e. volatilities are averaged in variance space.
+    """
+
+    def __init__(self, alpha):
+        """
+        Args:
+            alpha (float): Smoothing factor in (0, 1].
+        """
+        self.alpha = alpha
+        self.variance = np.nan
+
+    def estimate(self) -> float:
+        return math.sqrt(self.variance) if not np.isnan(self.variance) else np.nan
+
+    def append(self, implied_vol):
+        if pd.isnull(implied_vol):
+            return
+        if np.isnan(self.variance):
+            self.variance = float(implied_vol) ** 2
+        else:
+            self.variance = self.alpha * implied_vol ** 2 + (1 - self.alpha) * self.variance
+
+    def state(self) -> np.ndarray:
+        return np.array([] if np.isnan(self.variance) else [self.estimate()])
+
+    def clear(self):
+        self.variance = np.nan
+
+    def estimate_batch(self, implied_vols) -> np.ndarray:
+        variances = _ewm_levels(np.asarray(implied_vols, dtype=float) ** 2, self.alpha, self.variance)
+        self.variance = float(variances[-1])
+        return np.sqrt(variances[:-1])
+
+
+class SmileVolatilityEstimator(EMAVolatilityEstimator):
+    """
+    Volatility read off the underlying's VolatilitySmile, which the feed fits to the whole option chain once per
+    tick (see market_feed.UnderlyingFeed), so the option keeps no window of implied volatilities of its own and an
+    illiquid strike still gets an estimate.
+
+    The smile's value for a tick is passed in with set_smile_vol() right before estimate() and is used for that
+    tick only. Without one (before the smile has been fitted, on ticks the chain could not price, and in the
+    historical warm-up) the estimate is an EMA of the option's own implied volatilities, which is also what is
+    snapshotted.
+    """
+
+    def __init__(self, alpha):
+        """
+        Args:
+            alpha (float): Smoothing factor in (0, 1] of the fallback EMA.
+        """
+        super().__init__(alpha)
+        self.smile_vol = np.nan
+
+    def set_smile_vol(self, smile_vol):
+        """
+        Set the smile's volatility for the current tick, fitted to past ticks only.
+        """
+        self.smile_vol = np.nan if smile_vol is None else float(smile_vol)
+
+    def estimate(self) -> float:
+        return self.smile_vol if np.isfinite(self.smile_vol) else self.level
+
+    def append(self, implied_vol):
+        self.smile_vol = np.nan
+        super().append(implied_vol)
+
+
+def _ewm_levels(values, alpha, initial) -> np.ndarray:
+    """
+    EMA level before each value and after the last one, continuing from initial (NaN when there is none yet).
+    NaN values leave the level unchanged.
+    """
+    seed = [] if np.isnan(initial) else [initial]
+    history = np.concatenate([seed, values])
+    after = pd.Series(history).ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy()
+    return np.concatenate([[initial], after[len(seed):]])
+
+
+# Estimators selectable through config.VOLATILITY_ESTIMATOR; each factory takes SMOOTHING_PARAM.
+VOLATILITY_ESTIMATORS = {
+    'sma': lambda smoothing_param: SMAVolatilityEstimator(int(smoothing_param)),
+    'ema': lambda smoothing_param: EMAVolatilityEstimator(smoothing_alpha(smoothing_param)),
+    'ewma_variance': lambda smoothing_param: EWMAVarianceEstimator(smoothing_alpha(smoothing_param)),
+    'smile': lambda smoothing_param: SmileVolatilityEstimator(smoothing_alpha(smoothing_param)),
+}
+
+
+def create_volatility_estimator(name=None, smoothing_param=None) -> VolatilityEstimator:
+    """
+    Build a volatility estimator from the registry.
+
+    Args:
+        name (str, optional): Key of VOLATILITY_ESTIMATORS. Defaults to config.VOLATILITY_ESTIMATOR.
+        smoothing_param (float, optional): SMA window, or EMA window/alpha. Defaults to config.SMOOTHING_PARAM.
+
+    Returns:
+        VolatilityEstimator: The estimator.
+    """
+    config = get_config()
+    name = config.VOLATILITY_ESTIMATOR if name is None else name
+    smoothing_param = config.SMOOTHING_PARAM if smoothing_param is None else smoothing_param
+    if name not in VOLATILITY_ESTIMATORS:
+        raise ValueError(f"Unknown volatility estimator '{name}', expected one of {sorted(VOLATILITY_ESTIMATORS)}.")
+    return VOLATILITY_ESTIMATORS[name](smoothing_param)
@@ -0,0 +1,100 @@
+# volatility_smile.py
+
+import numpy as np
+
+from config import get_config
+
+
+class VolatilitySmile:
+    """
+    Per-underlying implied volatility smile, refitted incrementally from the chain's live implied volatilities.
+
+    The smile is a polynomial in standardized moneyness k = ln(K / F) / sqrt(T), fitted by exponentially weighted
+    least squares. Only the normal equations (a (degree + 1) x (degree + 1) matrix and a vector) are kept; each
+    update decays them by the forgetting factor and adds the new observations, so refitting costs the same no
+    matter how long the history is. Evaluating the smile gives an estimated volatility for every contract,
+    including illiquid strikes that have no implied volatility of their own.
+    """
+
+    def __init__(self, degree=None, half_life=None):
+        """
+        Args:
+            degree (int, optional): Polynomial degree. Defaults to config.SMILE_DEGREE.
+            half_life (float, optional): Half-life of an observation's weight in updates (ticks).
+                Defaults to config.SMILE_HALF_LIFE.
+        """
+        config = get_config()
+        self.degree = config.SMILE_DEGREE if degree is None else degree
+        half_life = config.SMILE_HALF_LIFE if half_life is None else half_life
+        self.decay = 0.5 ** (1.0 / half_life)
+
+        size = self.degree + 1
+        self._normal_matrix = np.zeros((size, size))
+        self._normal_vector = np.zeros(size)
+        self._observations = 0
+        self.coefficients = None
+
+    @staticmethod
+    def moneyness(avg_price_underlying, strike_prices, time_to_expiration, risk_free_rate):
+        """
+        Standardized log-moneyness ln(K / F) / sqrt(T), NaN where T <= 0.
+
+        Args:
+            avg_price_underlying (float): Average price of the underlying asset.
+            strike_prices (array-like): Strike prices.
+            time_to_expiration (array-like): Times to expiration in years.
+            risk_free_rate (float): Risk-free interest rate.
+
+        Returns:
+            np.ndarray: Moneyness per contract.
+        """
+        T = np.asarray(time_to_expiration, dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            forward = avg_price_underlying * np.exp(risk_free_rate * T)
+            k = np.log(np.asarray(strike_prices, dtype=float) / forward) / np.sqrt(T)
+        return np.where(T > 0, k, np.nan)
+
+    def _design(self, k):
+        return np.vander(k, self.degree + 1, increasing=True)
+
+    def update(self, k, implied_vols) -> None:
+        """
+        Decay the fit and add the current observations (NaN values are skipped).
+
+        Args:
+            k (array-like): Moneyness per contract.
+            implied_vols (array-like): Implied volatility per contract.
+        """
+        k = np.asarray(k, dtype=float)
+        implied_vols = np.asarray(implied_vols, dtype=float)
+        valid = np.isfinite(k) & np.isfinite(implied_vols)
+
+        self._normal_matrix *= self.decay
+        self._normal_vector *= self.decay
+        if valid.any():
+            X = self._design(k[valid])
+            self._normal_matrix += X.T @ X
+            self._normal_vector += X.T @ implied_vols[valid]
+            self._observations += int(valid.sum())
+
+        if self._observations > self.degree:
+            ridge = 1e-10 * max(np.trace(self._normal_matrix), 1e-300)
+            self.coefficients = np.linalg.lstsq(
+                self._normal_matrix + ridge * np.eye(self.degree + 1), self._normal_vector, rcond=None
+            )[0]
+
+    def evaluate(self, k) -> np.ndarray:
+        """
+        Evaluate the smile, NaN before the first successful fit.
+
+        Args:
+            k (array-like): Moneyness per contract.
+
+        Returns:
+            np.ndarray: Estimated volatility per contract.
+        """
+        k = np.asarray(k, dtype=float)
+        if self.coefficients is None:
+            return np.full(k.shape, np.nan)
+        vols = self._design(np.atleast_1d(k)) @ self.coefficients
+        return np.where(vols > 0, vols, np.nan).reshape(k.shape)
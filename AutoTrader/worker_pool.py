@@ -0,0 +1,451 @@
+# worker_pool.py
+#
+# Process-pool mode (main.py --mode pool): like supervisor mode, but the instruments are sharded over
+# POOL_WORKERS worker processes, so pricing and the rolling statistics run on several cores. The coordinator
+# process owns the market data feeds, the portfolio monitor and the order routing; each worker owns the rolling
+# state, the TickProcessor, the risk-file sync and the output workbook of its instruments. Ticks travel to the
+# workers, and signals back, as fixed-width records in shared-memory rings; nothing is pickled after start-up.
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Event
+
+import jdatetime
+import numpy as np
+import pandas as pd
+
+from channels import TickQueue, STOP_CHECK_INTERVAL
+from config import get_config, the_config
+from config_syncing import config_sync_thread
+from data_merging import merge_historical_and_live_data
+from data_processing import TickProcessor
+from error_counters import ErrorCounters
+from historical_data import UnderlyingHistoryCache, historical_data_thread
+from main import RESULT_COLUMNS, create_rolling_state
+from market_feed import OrderBookFetcher, UnderlyingFeed, underlying_feed_thread
+from net_worth_monitor import monitor_net_worth
+from result_handling import log_result, results_excel_filename
+from signal_handling import signal_handling_thread
+from state_store import signal_counts, advance_signal_counts
+from supervisor import latest_today_running_file, load_instrument_configs
+from trading_api import TradingAPI
+
+# Tick record: date as YYYYMMDD, time as seconds since midnight, then the underlying and option order books
+# ([sell_volume, sell_price, buy_price, buy_volume], all NaN for a missing book), then the implied and smile
+# volatility from the feed's OptionChain (NaN if there is none).
+TICK_WIDTH = 12
+# Signal record: time as seconds since midnight and the index of the signal in SIGNALS.
+SIGNAL_WIDTH = 2
+SIGNALS = ('hold', 'buy', 'sell')
+
+# Instrument fields passed to the workers, rebuilt there with the_config.for_instrument.
+INSTRUMENT_FIELDS = {
+    "underlying_name": "UNDERLYING_NAME",
+    "underlying_ticker": "UNDERLYING_TICKER",
+    "option_name": "OPTION_NAME",
+    "option_ticker": "OPTION_TICKER",
+    "expiration_date": "EXPIRATION_DATE",
+    "strike_price": "STRIKE_PRICE",
+    "call_put": "CALL_PUT",
+    "can_trade_in_same_direction": "CAN_TRADE_IN_SAME_DIRECTION",
+}
+
+
+class SharedRing:
+    """
+    One ring of fixed-width float64 records per instrument in shared memory, each with a single writer process
+    and a single reader process.
+
+    Column 0 of every slot holds the sequence number of its record. The writer invalidates the slot, writes the
+    record, then publishes the sequence number; the reader copies the record and only accepts it if the sequence
+    number is unchanged afterwards, so a record overwritten while being read is never returned. When the writer
+    laps the reader, the oldest records are dropped, as with deque(maxlen=depth).
+    """
+
+    def __init__(self, n_rows, depth, width, buffer=None):
+        """
+        Args:
+            n_rows (int): Number of instruments.
+            depth (int): Records kept per instrument.
+            width (int): Values per record.
+            buffer (multiprocessing.RawArray, optional): The shared buffer of an existing ring, when attaching to
+                it from another process. A new one is allocated by default.
+        """
+        self.shape = (n_rows, depth, width + 1)
+        self.buffer = multiprocessing.RawArray('d', int(np.prod(self.shape))) if buffer is None else buffer
+        self.records = np.frombuffer(self.buffer, dtype=np.float64).reshape(self.shape)
+        self.written = np.zeros(n_rows, dtype=np.int64)  # writer side
+        self.read = np.zeros(n_rows, dtype=np.int64)  # reader side
+        self.dropped = 0
+
+    def __getstate__(self):
+        return {"shape": self.shape, "buffer": self.buffer}
+
+    def __setstate__(self, state):
+        n_rows, depth, width = state["shape"]
+        self.__init__(n_rows, depth, width - 1, state["buffer"])
+
+    def write(self, row, values):
+        """
+        Append a record to the ring of an instrument.
+        """
+        sequence = self.written[row] + 1
+        slot = self.records[row, (sequence - 1) % self.shape[1]]
+        slot[0] = -1.0
+        slot[1:] = values
+        slot[0] = sequence
+        self.written[row] = sequence
+
+    def read_new(self, row):
+        """
+        Records of an instrument written since the last call, oldest first.
+
+        Returns:
+            list: The records (np.ndarray of width values).
+        """
+        depth = self.shape[1]
+        ring = self.records[row]
+        newest = int(ring[:, 0].max())
+        if newest - self.read[row] > depth:
+            self.dropped += newest - self.read[row] - depth
+            self.read[row] = newest - depth
+
+        records = []
+        while self.read[row] < newest:
+            sequence = self.read[row] + 1
+            slot = ring[(sequence - 1) % depth]
+            values = slot[1:].copy()
+            if slot[0] != sequence:
+                break  # overwritten while reading; the next call resynchronizes
+            records.append(values)
+            self.read[row] = sequence
+        return records
+
+
+def _seconds(time_string):
+    hours, minutes, seconds = (int(part) for part in str(time_string).split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _time_string(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def encode_tick(current_date, current_time, underlying_data, option_data, implied_vol=None, smile_vol=None):
+    """
+    Tick tuple of the data queues, and the chain's implied and smile volatility, as a TICK_WIDTH record.
+    """
+    record = np.full(TICK_WIDTH, np.nan)
+    record[0] = int(current_date.replace("-", ""))
+    record[1] = _seconds(current_time)
+    if underlying_data is not None:
+        record[2:6] = underlying_data
+    if option_data is not None:
+        record[6:10] = option_data
+    if implied_vol is not None:
+        record[10] = implied_vol
+    if smile_vol is not None:
+        record[11] = smile_vol
+    return record
+
+
+def decode_tick(record):
+    """
+    TICK_WIDTH record back to the (date, time, underlying_data, option_data) tuple of the data queues.
+    """
+    date = int(record[0])
+    current_date = f"{date // 10000:04d}-{date // 100 % 100:02d}-{date % 100:02d}"
+    underlying_data = None if np.isnan(record[2:6]).all() else record[2:6].tolist()
+    option_data = None if np.isnan(record[6:10]).all() else record[6:10].tolist()
+    return current_date, _time_string(record[1]), underlying_data, option_data
+
+
+def decode_chain_vols(record):
+    """
+    The chain's implied and smile volatility of a TICK_WIDTH record, as TickProcessor.process keyword arguments.
+    """
+    return {"implied_vol": None if np.isnan(record[10]) else float(record[10]),
+            "smile_vol": None if np.isnan(record[11]) else float(record[11])}
+
+
+class RingPublisher:
+    """
+    Data queue stand-in subscribed to an UnderlyingFeed: every appended tick is written to the instrument's row
+    of the tick ring and the owning worker is woken.
+    """
+
+    def __init__(self, ring, row, tick_event):
+        self.ring = ring
+        self.row = row
+        self.tick_event = tick_event
+
+    def append(self, tick):
+        self.ring.write(self.row, encode_tick(*tick, implied_vol=tick.implied_vol, smile_vol=tick.smile_vol))
+        self.tick_event.set()
+
+
+class ShardInstrument:
+    """
+    State of one instrument inside a worker process.
+    """
+
+    def __init__(self, row, config):
+        self.row = row
+        self.config = config
+        self.counters = ErrorCounters()
+        (self.rolling_vols, self.price_diff_window, self.snapshotter, self.restored_state,
+         self.resume_after) = create_rolling_state(config)
+        self.processor = None
+        self.data = pd.DataFrame(columns=RESULT_COLUMNS)
+        self.rows = []
+
+    def warm_up(self, tick_ring, tick_event, stop_event, history_cache=None):
+        """
+        Merges the historical data into the rolling state like main() does, then creates the TickProcessor. If the
+        merge fails, the error is counted and the instrument starts from live data only, as in supervisor mode.
+        """
+        try:
+            if self.config.USE_HISTORICAL:
+                historical_data_container = {}
+                historical_data_thread(Event(), historical_data_container, stop_event, self.config, history_cache)
+
+                # The merge trims the history at the first live tick
+                live_ticks = TickQueue()
+                while not live_ticks and not stop_event.is_set():
+                    tick_event.clear()
+                    for record in tick_ring.read_new(self.row):
+                        live_ticks.append(decode_tick(record))
+                    if not live_ticks:
+                        tick_event.wait(STOP_CHECK_INTERVAL)
+                if stop_event.is_set():
+                    return
+                merged = merge_historical_and_live_data(
+                    live_ticks, historical_data_container, RESULT_COLUMNS, self.rolling_vols,
+                    self.price_diff_window, Event(), self.counters, self.resume_after, self.config,
+                    signal_counts(self.restored_state)
+                )
+                if merged is not None:
+                    self.data, under_negative_one_count, over_positive_one_count = merged
+                    advance_signal_counts(self.restored_state, under_negative_one_count, over_positive_one_count)
+        except Exception as e:
+            self.counters.try_except_counter += 1
+            print(f"ERROR: Warm-up of {self.config.OPTION_NAME} failed: {e}")
+        tick_ring.read_new(self.row)  # start fresh, as main() clears its data_queue
+        # Publishing the processor hands the instrument over to the worker's processing loop
+        self.processor = TickProcessor(self.counters, self.rolling_vols, self.price_diff_window, self.snapshotter,
+                                       self.restored_state, self.config)
+
+    def close(self):
+        """
+        Writes the final snapshot, the shadow signals and the output workbook.
+        """
+        if self.processor is not None:
+            self.processor.close()
+        if self.rows:
+            self.data = pd.concat([self.data, pd.DataFrame(self.rows)], ignore_index=True)
+        self.data.to_excel(results_excel_filename(self.config), index=False)
+        print(f"INFO: Counters of {self.config.OPTION_NAME}:")
+        self.counters.report()
+
+
+def process_records(state, tick_ring, signal_ring, accounts, signal_event):
+    """
+    Prices the new ticks of one instrument and writes its signals to the signal ring.
+    """
+    state.config.NET_WORTH, state.config.VOLUME = accounts[state.row]
+    records = tick_ring.read_new(state.row)
+    if state.config.TICK_HANDOFF == 'latest' and len(records) > 1:
+        state.counters.dropped_tick_counter += len(records) - 1
+        records = records[-1:]
+    for record in records:
+        dequeued = time.monotonic()
+        result = state.processor.process(*decode_tick(record), **decode_chain_vols(record))
+        state.counters.latency.record("processing", time.monotonic() - dequeued)
+        if state.processor.expired:
+            print(f"WARNING: {state.config.OPTION_NAME}: Expiration date reached or passed.")
+            break
+        if result is None:
+            continue
+        state.rows.append(result)
+        log_result(result, state.config)
+        signal_ring.write(state.row, [_seconds(result["Time"]), SIGNALS.index(result["signal"])])
+        signal_event.set()
+
+
+def worker_main(shard, instruments, tick_ring, signal_ring, accounts, tick_event, signal_event, stop_event,
+                underlying_history=None):
+    """
+    Worker process: prices the ticks of its shard of instruments and sends their signals back.
+
+    Args:
+        shard (int): Worker number.
+        instruments (list): (row, instrument fields) pairs owned by this worker.
+        tick_ring (SharedRing): Ticks from the coordinator.
+        signal_ring (SharedRing): Signals to the coordinator.
+        accounts (multiprocessing.RawArray): NET_WORTH and VOLUME per row, written by the coordinator.
+        tick_event, signal_event, stop_event (multiprocessing.Event): Wake-ups and shutdown.
+        underlying_history (dict, optional): Underlying histories downloaded by the coordinator, see
+            UnderlyingHistoryCache.
+    """
+    accounts = np.frombuffer(accounts, dtype=np.float64).reshape(-1, 2)
+    history_cache = UnderlyingHistoryCache(underlying_history)
+    states = [ShardInstrument(row, the_config.for_instrument(**fields)) for row, fields in instruments]
+    print(f"INFO: Worker {shard} (pid {os.getpid()}) owns {[state.config.OPTION_NAME for state in states]}.")
+
+    os.makedirs("exels", exist_ok=True)
+    thread_stop = Event()
+    config_syncing = Thread(target=config_sync_thread, args=(thread_stop, [state.config for state in states]))
+    config_syncing.start()
+
+    try:
+        # The instruments warm up concurrently; each is processed as soon as its warm-up is done. The merge waits
+        # for the first live tick, so it may never return; do not let it block the shutdown.
+        for state in states:
+            Thread(target=state.warm_up, args=(tick_ring, tick_event, stop_event, history_cache),
+                   name=f"{state.config.OPTION_NAME}-warm-up", daemon=True).start()
+
+        while not stop_event.is_set():
+            tick_event.wait(STOP_CHECK_INTERVAL)
+            tick_event.clear()
+            for state in states:
+                if state.processor is None or state.processor.expired:
+                    continue
+                try:
+                    process_records(state, tick_ring, signal_ring, accounts, signal_event)
+                except Exception as e:
+                    # One failing instrument must not stop the others of the shard
+                    state.counters.try_except_counter += 1
+                    print(f"ERROR: Exception while processing {state.config.OPTION_NAME}: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        thread_stop.set()
+        config_syncing.join()
+        for state in states:
+            state.close()
+        if tick_ring.dropped:
+            print(f"WARNING: Worker {shard} dropped {tick_ring.dropped} ticks it could not keep up with.")
+        print(f"INFO: Worker {shard} is shutting down gracefully.")
+
+
+def signal_routing_thread(signal_ring, signal_event, signal_queues, stop_event):
+    """
+    Moves the signals written by the workers to the signal queue of each instrument.
+    """
+    while not stop_event.is_set():
+        signal_event.wait(STOP_CHECK_INTERVAL)
+        signal_event.clear()
+        for row, signal_queue in enumerate(signal_queues):
+            for record in signal_ring.read_new(row):
+                signal_queue.append({"Time": _time_string(record[0]), "signal": SIGNALS[int(record[1])]})
+
+
+def run_worker_pool(today_running_path=None, workers=None):
+    """
+    Runs all instruments of a today-running table on a pool of worker processes until VALID_TIME_END or Ctrl+C.
+
+    Args:
+        today_running_path (str, optional): Today-running Excel file, the newest one by default.
+        workers (int, optional): Number of worker processes, config.POOL_WORKERS by default.
+    """
+    config = get_config()
+    path = today_running_path or latest_today_running_file()
+    if path is None or not os.path.exists(path):
+        print(f"ERROR: No today-running table found (run FIND_MARKETS.py first): {path}")
+        return
+    configs = load_instrument_configs(path)
+    if not configs:
+        print(f"ERROR: No instruments to run in {path}.")
+        return
+
+    workers = workers or config.POOL_WORKERS or os.cpu_count() or 1
+    workers = min(workers, len(configs))
+    print(f"INFO: Worker pool running {len(configs)} instruments from {path} on {workers} processes.")
+
+    tick_ring = SharedRing(len(configs), config.MAX_SIZE, TICK_WIDTH)
+    signal_ring = SharedRing(len(configs), config.MAX_SIZE, SIGNAL_WIDTH)
+    accounts_buffer = multiprocessing.RawArray('d', 2 * len(configs))
+    accounts = np.frombuffer(accounts_buffer, dtype=np.float64).reshape(-1, 2)
+    tick_events = [multiprocessing.Event() for _ in range(workers)]
+    signal_event = multiprocessing.Event()
+    process_stop = multiprocessing.Event()
+    stop_event = Event()
+
+    # Each underlying's history is downloaded once here, concurrently, and handed to the workers of its options
+    history_cache = UnderlyingHistoryCache()
+    if config.USE_HISTORICAL:
+        keys = {(c.UNDERLYING_NAME, c.HISTORICAL_DATA_START_DATE, c.HISTORICAL_DATA_END_DATE) for c in configs}
+        with ThreadPoolExecutor(max_workers=len(keys), thread_name_prefix="underlying-history") as executor:
+            downloads = {key: executor.submit(history_cache.get, *key) for key in keys}
+        for key, download in downloads.items():
+            if download.exception() is not None:
+                print(f"ERROR: Downloading the history of {key[0]} failed: {download.exception()}")
+
+    # Round-robin shards, so every worker gets options of several underlyings
+    processes = []
+    for shard in range(workers):
+        instruments = [(row, {field: getattr(configs[row], name) for field, name in INSTRUMENT_FIELDS.items()})
+                       for row in range(shard, len(configs), workers)]
+        underlyings = {configs[row].UNDERLYING_NAME for row in range(shard, len(configs), workers)}
+        underlying_history = {key: frame for key, frame in history_cache.frames.items() if key[0] in underlyings}
+        process = multiprocessing.Process(
+            target=worker_main, name=f"pricing-worker-{shard}",
+            args=(shard, instruments, tick_ring, signal_ring, accounts_buffer, tick_events[shard], signal_event,
+                  process_stop, underlying_history))
+        process.start()
+        processes.append(process)
+
+    api = TradingAPI()
+    fetcher = OrderBookFetcher(api)
+    feeds = {}
+    for row, instrument in enumerate(configs):
+        ticker = instrument.UNDERLYING_TICKER
+        if ticker not in feeds:
+            feeds[ticker] = UnderlyingFeed(api, ticker, fetcher)
+        feeds[ticker].subscribe(instrument.OPTION_TICKER, RingPublisher(tick_ring, row, tick_events[row % workers]),
+                                instrument)
+    feed_counters = ErrorCounters()
+    threads = [Thread(target=underlying_feed_thread, args=(feed, feed_counters, stop_event),
+                      name=f"{ticker}-feed") for ticker, feed in feeds.items()]
+
+    signal_queues = [TickQueue(maxlen=config.MAX_SIZE) for _ in configs]
+    threads.append(Thread(target=signal_routing_thread, args=(signal_ring, signal_event, signal_queues, stop_event),
+                          name="SignalRoutingThread"))
+    threads += [Thread(target=signal_handling_thread, args=(signal_queue, stop_event, instrument, api),
+                       name=f"{instrument.OPTION_NAME}-signals")
+                for signal_queue, instrument in zip(signal_queues, configs)]
+    threads.append(Thread(target=monitor_net_worth, args=(stop_event, configs, api), name="NetWorthMonitorThread"))
+    for thread in threads:
+        thread.start()
+
+    try:
+        while not stop_event.is_set():
+            # Hand the portfolio positions over to the workers for update_signal
+            for row, instrument in enumerate(configs):
+                accounts[row] = instrument.NET_WORTH, instrument.VOLUME
+            if jdatetime.datetime.now().time() > config.VALID_TIME_END:
+                print("INFO: Current time has passed VALID_TIME_END, initiating graceful shutdown.")
+                break
+            if not any(process.is_alive() for process in processes):
+                print("ERROR: All pricing workers have exited.")
+                break
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("INFO: Processing stopped by user, initiating graceful shutdown.")
+    finally:
+        stop_event.set()
+        process_stop.set()
+        for signal_queue in signal_queues:
+            signal_queue.close()
+        for thread in threads:
+            thread.join()
+        fetcher.close()
+        for process in processes:
+            process.join()
+        print(f"INFO: Errors in the market feeds: {feed_counters.try_except_counter}")
+        if fetcher.late_legs:
+            print(f"WARNING: {fetcher.late_legs} order books missed the fetch deadline.")
+        print("INFO: Program terminated gracefully.")